@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark - blank and near-duplicate page analysis against full grid composition"""
+
+import argparse
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+import numpy as np
+
+from concat_pdf import ThumbnailCache, process_pdf
+from concat_pdf.analysis import analyze_pages, select_pages
+
+SCAN_DPI = 100
+
+
+def _scan(page: fitz.Page, rng: np.random.Generator) -> bytes:
+    """Grayscale JPEG of a page on tinted, noisy paper with an edge shadow, like a scanner"""
+    pix = page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY)
+    samples = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    paper = rng.normal(rng.uniform(225, 245), 4, samples.shape)
+    scan = np.minimum(samples.astype(np.float64), paper).clip(0, 255).astype(np.uint8)
+    scan[:, :8] = 110
+    return fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, scan.tobytes(), False).tobytes("jpeg", jpg_quality=75)
+
+
+def make_input(sheets: int, path: Path) -> None:
+    """Duplex scan: every sheet has a front (a text page or one of a few forms) and a blank back"""
+    rng = np.random.default_rng(0)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+    doc = fitz.open()
+    for sheet in range(sheets):
+        source = fitz.open()
+        page = source.new_page()
+        if sheet % 3 == 0:
+            # Form with a filled-in name, the same layout every time
+            page.insert_text((72, 60), "APPLICATION FORM", fontsize=18)
+            for row in range(20):
+                page.draw_rect(fitz.Rect(72, 100 + row * 30, 520, 122 + row * 30))
+                page.insert_text((76, 116 + row * 30), f"Field {row}:", fontsize=9)
+            page.insert_text((200, 116), f"Applicant {sheet}", fontsize=10)
+        else:
+            text = " ".join(rng.choice(words) for _ in range(450))
+            page.insert_textbox(fitz.Rect(50, 50, 545, 790), f"Page {sheet}\n\n{text}", fontsize=9)
+        source.new_page()
+        for scanned in source:
+            output = doc.new_page()
+            output.insert_image(output.rect, stream=_scan(scanned, rng))
+    doc.save(path, garbage=3, deflate=True)
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page analysis with grid composition")
+    parser.add_argument("--sheets", type=int, default=100, help="Duplex sheets, two pages each (default: 100)")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--dpi", type=int, default=100, help="Raster DPI (default: 100)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = Path(tmp_dir) / "scans.pdf"
+        make_input(args.sheets, input_path)
+        doc = fitz.open(input_path)
+        cache = ThumbnailCache(Path(tmp_dir) / "cache")
+        digest = cache.file_digest(input_path)
+
+        cold, analysis = timed(analyze_pages, doc, cache, digest)
+        cached, _ = timed(analyze_pages, doc, cache, digest)
+        select, (kept, blank, similar) = timed(select_pages, analysis, True, "skip")
+        print(f"{len(doc)} pages: {blank} blank, {similar} near-duplicates, {len(kept)} kept")
+        print(f"  analysis            {cold:8.2f} s")
+        print(f"  analysis, cached    {cached:8.2f} s")
+        print(f"  selection           {select:8.2f} s")
+        doc.close()
+
+        output_path = Path(tmp_dir) / "output.pdf"
+        print(f"\n{'Composition':<20} {'All pages (s)':>14} {'Skipping (s)':>13} {'Output pages':>13}")
+        for render_mode in ("vector", "raster"):
+            times = []
+            for skip in (False, True):
+                # Cold runs: the analysis and rendered thumbnails of a previous run would be reused
+                cache.clear()
+                options = dict(render_mode=render_mode, dpi=args.dpi, cache=cache)
+                if skip:
+                    options.update(skip_blank=True, near_duplicates="skip")
+                with redirect_stdout(sys.stderr):
+                    elapsed, _ = timed(process_pdf, input_path, output_path, args.columns, args.rows,
+                                       **options)
+                times.append((elapsed, len(fitz.open(output_path))))
+            print(f"{render_mode:<20} {times[0][0]:>14.2f} {times[1][0]:>13.2f} "
+                  f"{times[0][1]:>6} -> {times[1][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark - the asyncio API: event loop responsiveness, time to first page, cancellation
+
+A ticker task sleeps 10 ms at a time and records how late it wakes up; that delay is
+how long other requests of an asyncio service would have to wait.
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+
+from concat_pdf import GridRenderer, process_pdf
+
+TICK = 0.01
+
+
+def report(line: str) -> None:
+    """Table rows go to the real stdout, process_pdf's messages are redirected to stderr"""
+    print(line, file=sys.__stdout__, flush=True)
+
+
+def make_input(pages: int, path: Path) -> None:
+    doc = fitz.open()
+    for idx in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {idx + 1}", fontsize=24)
+        page.insert_textbox(fitz.Rect(72, 120, 523, 770), "Lorem ipsum dolor sit amet. " * 60,
+                            fontsize=10)
+    doc.save(path)
+
+
+async def measure(job) -> tuple:
+    """Run a coroutine while ticking, returns (seconds, longest event loop stall in ms, result)"""
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(TICK)
+            now = time.perf_counter()
+            stalls.append(now - last - TICK)
+            last = now
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    result = await job
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick_task
+    return elapsed, max(stalls, default=0) * 1000, result
+
+
+async def run(args: argparse.Namespace, input_path: Path, tmp_dir: Path) -> None:
+    options = dict(m=args.rows, render_mode="raster", dpi=args.dpi)
+    output_path = tmp_dir / "output.pdf"
+
+    async def blocking():
+        # What a service does without the asyncio API: call process_pdf on the loop
+        process_pdf(input_path, output_path, args.columns, **options)
+
+    report(f"{'Scenario':<40} {'Time (s)':>9} {'Loop stall (ms)':>16}")
+    elapsed, stall, _ = await measure(blocking())
+    report(f"{'process_pdf on the event loop':<40} {elapsed:>9.2f} {stall:>16.1f}")
+
+    async with GridRenderer(max_jobs=args.jobs) as renderer:
+        elapsed, stall, _ = await measure(renderer.render_grid(input_path, output_path,
+                                                               args.columns, **options))
+        report(f"{'await render_grid':<40} {elapsed:>9.2f} {stall:>16.1f}")
+
+        async def first_page():
+            start = time.perf_counter()
+            async for _ in renderer.iter_pages(input_path, args.columns, **options):
+                return time.perf_counter() - start
+
+        elapsed, stall, first = await measure(first_page())
+        report(f"{'iter_pages, first page':<40} {first:>9.2f} {stall:>16.1f}")
+
+        jobs = [renderer.render_grid(input_path, tmp_dir / f"job_{idx}.pdf", args.columns, **options)
+                for idx in range(args.concurrent)]
+        elapsed, stall, _ = await measure(asyncio.gather(*jobs))
+        name = f"{args.concurrent} jobs, at most {args.jobs} at a time"
+        report(f"{name:<40} {elapsed:>9.2f} {stall:>16.1f}")
+
+        task = asyncio.create_task(renderer.render_grid(input_path, output_path, args.columns,
+                                                        **options))
+        await asyncio.sleep(args.cancel_after)
+        start = time.perf_counter()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        stopped = time.perf_counter() - start
+        report(f"{'cancel: rendering stopped after':<40} {stopped:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the asyncio API")
+    parser.add_argument("--pages", type=int, default=200, help="Input pages (default: 200)")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--dpi", type=int, default=72, help="Raster DPI (default: 72)")
+    parser.add_argument("--jobs", type=int, default=2, help="GridRenderer max_jobs (default: 2)")
+    parser.add_argument("--concurrent", type=int, default=4, help="Jobs submitted at once (default: 4)")
+    parser.add_argument("--cancel-after", type=float, default=0.5,
+                        help="Seconds before the cancellation test cancels its job (default: 0.5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = Path(tmp_dir) / "input.pdf"
+        make_input(args.pages, input_path)
+        # Keep process_pdf's status messages out of the table
+        with redirect_stdout(sys.stderr):
+            asyncio.run(run(args, input_path, Path(tmp_dir)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark - cell borders drawn one draw_rect per cell vs one Shape per output page
+
+Only the borders are drawn, on empty output pages, so the numbers are the border cost alone.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+
+from concat_pdf.layout import compute_layout, to_page_cells
+from concat_pdf.render import draw_borders
+
+
+def per_cell_borders(page: fitz.Page, rects: list, width: float, color: tuple) -> None:
+    """The previous approach: one draw_rect, and so one content stream, per cell"""
+    for rect in rects:
+        page.draw_rect(rect, color=color, width=width)
+
+
+def content_stats(doc: fitz.Document) -> tuple:
+    """Content streams per page and total content stream bytes (uncompressed)"""
+    streams = sum(len(page.get_contents()) for page in doc) / len(doc)
+    size = sum(len(doc.xref_stream(xref)) for page in doc for xref in page.get_contents())
+    return streams, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-cell and batched border drawing on dense grids")
+    parser.add_argument("--grids", type=str, nargs="+", default=["10x15", "20x30", "30x45"],
+                        help="Grid sizes as COLUMNSxROWS (default: 10x15 20x30 30x45)")
+    parser.add_argument("--pages", type=int, default=5, help="Output pages per grid (default: 5)")
+    args = parser.parse_args()
+
+    print(f"{'Grid':>7} {'Method':<10} {'Borders (ms)':>13} {'Streams/page':>13} "
+          f"{'Content (KB)':>13} {'Saved (KB)':>11}")
+    for grid in args.grids:
+        columns, rows = (int(v) for v in grid.lower().split("x"))
+        sizes = [(595.0, 842.0)] * (columns * rows * args.pages)
+        layout = compute_layout(sizes, columns, rows, None, 3, 10)
+        page_cells, page_size = to_page_cells(layout), layout.page_size
+
+        for method, draw in (("per-cell", per_cell_borders), ("batched", draw_borders)):
+            doc = fitz.open()
+            start = time.perf_counter()
+            for cells in page_cells:
+                page = doc.new_page(width=page_size[0], height=page_size[1])
+                draw(page, [fitz.Rect(rect) for _, rect in cells], 0.5, (0, 0, 0))
+            elapsed = time.perf_counter() - start
+            streams, size = content_stats(doc)
+            saved = len(doc.tobytes(garbage=4, deflate=True))
+            print(f"{grid:>7} {method:<10} {elapsed * 1000:>13.1f} {streams:>13.0f} "
+                  f"{size / 1024:>13.1f} {saved / 1024:>11.1f}")
+            doc.close()
+
+
+if __name__ == "__main__":
+    main()
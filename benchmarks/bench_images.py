@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark - image-heavy documents: vector mode with and without image downsampling
+
+Every input page carries a full-page photo (a distinct 2400 x 1800 JPEG), a logo shared
+by all pages and text. "View" is the time a viewer needs to draw all output pages at
+screen resolution.
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+import numpy as np
+from PIL import Image
+
+from concat_pdf import process_pdf
+
+
+def make_input(pages: int, path: Path) -> None:
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:1800, 0:2400]
+    logo = Image.fromarray(((xx[:400, :1200] + yy[:400, :1200]) % 200 > 100).astype(np.uint8) * 255)
+    buffer = io.BytesIO()
+    logo.save(buffer, "PNG")
+    logo_data = buffer.getvalue()
+
+    doc = fitz.open()
+    for idx in range(pages):
+        # Smooth gradients with some grain, compresses like a photo
+        phase = idx * 0.3
+        photo = np.stack([128 + 100 * np.sin(xx / (300 + 20 * idx) + phase),
+                          128 + 100 * np.cos(yy / 250 - phase),
+                          128 + 100 * np.sin((xx + yy) / 400)], axis=-1)
+        photo += rng.normal(0, 6, photo.shape)
+        buffer = io.BytesIO()
+        Image.fromarray(photo.clip(0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(72, 40, 240, 96), stream=logo_data)
+        page.insert_image(fitz.Rect(72, 120, 523, 458), stream=buffer.getvalue())
+        page.insert_textbox(fitz.Rect(72, 480, 523, 770),
+                            f"Photo {idx + 1}. " + "Lorem ipsum dolor sit amet. " * 40, fontsize=10)
+    doc.save(path)
+
+
+def view_time(path: Path) -> float:
+    """Draw every page at 96 DPI, like a viewer showing the document"""
+    doc = fitz.open(path)
+    start = time.perf_counter()
+    for page in doc:
+        page.get_pixmap(dpi=96)
+    elapsed = time.perf_counter() - start
+    doc.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure image downsampling in vector mode")
+    parser.add_argument("--pages", type=int, default=40, help="Input pages (default: 40)")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--dpi", type=int, default=150, help="Target DPI (default: 150)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = Path(tmp_dir) / "photos.pdf"
+        make_input(args.pages, input_path)
+        output_path = Path(tmp_dir) / "output.pdf"
+        print(f"Input: {args.pages} pages, {input_path.stat().st_size / 1e6:.1f} MB")
+
+        print(f"{'Mode':<28} {'Time (s)':>9} {'Size (MB)':>10} {'View (s)':>9}")
+        scenarios = [
+            ("vector", dict(render_mode="vector")),
+            ("vector --downsample-images", dict(render_mode="vector", downsample_images=True)),
+            ("raster", dict(render_mode="raster")),
+        ]
+        for name, options in scenarios:
+            start = time.perf_counter()
+            with redirect_stdout(sys.stderr):
+                process_pdf(input_path, output_path, args.columns, args.rows, dpi=args.dpi,
+                            **options)
+            elapsed = time.perf_counter() - start
+            size = output_path.stat().st_size / 1e6
+            print(f"{name:<28} {elapsed:>9.2f} {size:>10.2f} {view_time(output_path):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
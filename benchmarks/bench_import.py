@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark - start-up time of the command line tool and the package, with a budget
+
+Every scenario runs in a fresh interpreter under "python -X importtime". Wall times include
+the interpreter's own start-up (about 15-20 ms), -X importtime adds a little overhead too.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be loaded just to print help or report an argument error
+HEAVY_MODULES = ("fitz", "pymupdf", "numpy", "PIL")
+
+# "import time: self [us] | cumulative | imported package" lines of python -X importtime
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+SCENARIOS = {
+    "cli --help": [str(ROOT / "concat_pdf.py"), "--help"],
+    "cli bad arguments": [str(ROOT / "concat_pdf.py"), "missing.pdf", "out.pdf"],
+    "pyramid --help": [str(ROOT / "concat_pdf.py"), "pyramid", "--help"],
+    "import concat_pdf": ["-c", "import concat_pdf"],
+}
+
+
+def run_once(args: list) -> tuple:
+    """Wall time in ms and {module: cumulative import ms} of one fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"), PYMUPDF_MESSAGE="fd:2")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args,
+                            capture_output=True, text=True, env=env, cwd=ROOT / "benchmarks")
+    wall = (time.perf_counter() - start) * 1000
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1000
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure start-up time and check it against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per scenario, the best is reported (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=100,
+                        help="Fail if a scenario takes longer, in ms (default: 100)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports listed (default: 5)")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'Scenario':<20} {'Best (ms)':>10} {'Heavy modules loaded':<24}")
+    for name, scenario_args in SCENARIOS.items():
+        runs = [run_once(scenario_args) for _ in range(args.runs)]
+        wall, modules = min(runs, key=lambda run: run[0])
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        status = "" if wall <= args.budget_ms else "  OVER BUDGET"
+        print(f"{name:<20} {wall:>10.1f} {', '.join(heavy) or '-':<24}{status}")
+        # Cumulative time of the package modules and any heavy dependency they pulled in
+        slowest = sorted(((ms, module) for module, ms in modules.items() if module.startswith("concat_pdf")
+                          or module in HEAVY_MODULES), reverse=True)[:args.top]
+        for ms, module in slowest:
+            print(f"    {module:<28} {ms:>8.1f}")
+        over_budget |= wall > args.budget_ms or (name.startswith("cli") and bool(heavy))
+
+    print(f"\nBudget: {args.budget_ms:.0f} ms per scenario, no {'/'.join(HEAVY_MODULES)} for the CLI")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Benchmark - layout time for very large page counts"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from concat_pdf.layout import compute_layout, to_page_cells
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure compute_layout on synthetic page sizes")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("-n", "--columns", type=int, default=10, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=10, help="Number of grid rows")
+    args = parser.parse_args()
+
+    # Mixed A4/A3/Letter pages in both orientations
+    choices = np.array([(595.276, 841.890), (841.890, 1190.551), (612, 792),
+                        (841.890, 595.276), (1190.551, 841.890)])
+    rng = np.random.default_rng(0)
+
+    print(f"{'Pages':>8} {'Mode':<7} {'Layout (ms)':>12} {'+ cells (ms)':>13}")
+    for pages in args.pages:
+        sizes = choices[rng.integers(0, len(choices), pages)]
+        for pack_rows in (False, True):
+            start = time.perf_counter()
+            layout = compute_layout(sizes, args.columns, args.rows, pack_rows=pack_rows)
+            layout_ms = (time.perf_counter() - start) * 1000
+            to_page_cells(layout)
+            total_ms = (time.perf_counter() - start) * 1000
+            mode = "packed" if pack_rows else "grid"
+            print(f"{pages:>8} {mode:<7} {layout_ms:>12.2f} {total_ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Benchmark - peak RSS against page count, in-memory vs streaming output"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+def make_input(pages: int, path: Path) -> None:
+    """Synthetic input, every page has text and its own small image"""
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 400),
+                            f"Page {i} " + "Lorem ipsum dolor sit amet. " * 30, fontsize=10)
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 200), False)
+        pix.clear_with((i * 37) % 256)
+        page.insert_image(fitz.Rect(100, 420, 495, 790), pixmap=pix)
+    doc.save(path, garbage=3, deflate=True)
+
+
+def child(args) -> None:
+    """Run one process_pdf call and report peak RSS, in a fresh process per measurement"""
+    import resource
+    from concat_pdf import process_pdf
+
+    start = time.perf_counter()
+    process_pdf(args.input, args.output, args.columns, args.rows, dpi=args.dpi,
+                render_mode=args.render_mode, stream_batch=args.stream_batch)
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024  # Linux reports kilobytes
+    print(json.dumps({"seconds": elapsed, "peak_rss": peak, "size": args.output.stat().st_size}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak RSS of process_pdf against page count")
+    parser.add_argument("--pages", type=int, nargs="+", default=[500, 1000, 2000, 4000],
+                        help="Input page counts (default: 500 1000 2000 4000)")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--render-mode", type=str, default="raster", choices=["vector", "raster"],
+                        help="Raster output grows with page count, vector output barely does (default: raster)")
+    parser.add_argument("--dpi", type=int, default=100, help="Raster DPI (default: 100)")
+    parser.add_argument("--stream-batch", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=10, help="Streaming batch size (default: 10)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--input", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{'Pages':>6} {'Mode':<10} {'Peak RSS (MB)':>14} {'Time (s)':>9} {'Size (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for pages in args.pages:
+            input_path = Path(tmp_dir) / f"input_{pages}.pdf"
+            make_input(pages, input_path)
+            for label, stream_args in [("in-memory", []), ("streaming", ["--stream-batch", str(args.batch)])]:
+                cmd = [sys.executable, __file__, "--child",
+                       "--input", str(input_path), "--output", str(Path(tmp_dir) / "output.pdf"),
+                       "-n", str(args.columns), "-m", str(args.rows),
+                       "--render-mode", args.render_mode, "--dpi", str(args.dpi)] + stream_args
+                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+                stats = json.loads(result.stdout.strip().splitlines()[-1])
+                print(f"{pages:>6} {label:<10} {stats['peak_rss'] / 2**20:>14.1f} "
+                      f"{stats['seconds']:>9.2f} {stats['size'] / 2**20:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark - the metadata index: page counts and page sizes without reparsing files
+
+"Cold" scans the files, "warm (disk)" is a new process finding the stored entries (a fresh
+MetadataIndex on the same directory), "warm (memory)" a repeated lookup in the same process,
+like the GUI's row calculation followed by Generate.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+
+from concat_pdf import MetadataIndex, Profiler, process_pdf
+
+
+def make_file(pages: int, path: Path) -> None:
+    doc = fitz.open()
+    for idx in range(pages):
+        # Mixed sizes and rotations, so the sizes matter for the layout
+        page = doc.new_page(width=595 if idx % 3 else 842, height=842 if idx % 3 else 595)
+        page.insert_text((72, 72), f"Page {idx + 1}", fontsize=24)
+        if idx % 5 == 0:
+            page.set_rotation(90)
+    doc.save(path, garbage=1)
+
+
+def page_counts_directly(paths) -> int:
+    """What the GUI did before: open every file for its page count"""
+    total = 0
+    for path in paths:
+        with fitz.open(path) as doc:
+            total += len(doc)
+    return total
+
+
+def layout_time(inputs, index: MetadataIndex, output_path: Path, args: argparse.Namespace) -> float:
+    """Seconds spent opening the inputs and computing the layout (stages "open" and "layout")"""
+    profiler = Profiler()
+    with redirect_stdout(sys.stderr):
+        process_pdf(inputs, output_path, args.columns, args.rows, metadata=index,
+                    save_profile="fast", profiler=profiler)
+    return profiler.stages.get("open", 0) + profiler.stages.get("layout", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the document metadata index")
+    parser.add_argument("--files", type=int, default=300, help="Input files (default: 300)")
+    parser.add_argument("--file-pages", type=int, default=10, help="Pages per file (default: 10)")
+    parser.add_argument("--long-pages", type=int, default=20000,
+                        help="Pages of the single long file (default: 20000)")
+    parser.add_argument("-n", "--columns", type=int, default=10, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=10, help="Number of grid rows")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        paths = [tmp_dir / f"file_{idx:04d}.pdf" for idx in range(args.files)]
+        make_file(args.file_pages, paths[0])
+        for path in paths[1:]:
+            path.write_bytes(paths[0].read_bytes())
+        long_path = tmp_dir / "long.pdf"
+        make_file(args.long_pages, long_path)
+        output_path = tmp_dir / "output.pdf"
+
+        print(f"{'Scenario':<44} {'Cold (s)':>9} {'Disk (s)':>9} {'Memory (s)':>11}")
+
+        start = time.perf_counter()
+        page_counts_directly(paths)
+        direct = time.perf_counter() - start
+        print(f"{f'page counts, {args.files} files, fitz.open':<44} {direct:>9.3f}")
+
+        index_dir = tmp_dir / "index"
+        for name, inputs in ((f"page counts, {args.files} files, index", paths),
+                             (f"page count, {args.long_pages} pages, index", [long_path])):
+            times = []
+            for index in (MetadataIndex(index_dir), MetadataIndex(index_dir)):
+                start = time.perf_counter()
+                index.page_counts(inputs)
+                times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.page_counts(inputs)
+            times.append(time.perf_counter() - start)
+            print(f"{name:<44} {times[0]:>9.3f} {times[1]:>9.3f} {times[2]:>11.4f}")
+
+        index_dir = tmp_dir / "layout_index"
+        for name, inputs in ((f"open + layout, {args.files} files", paths),
+                             (f"open + layout, {args.long_pages} pages", long_path)):
+            cold = layout_time(inputs, MetadataIndex(index_dir), output_path, args)
+            index = MetadataIndex(index_dir)
+            disk = layout_time(inputs, index, output_path, args)
+            memory = layout_time(inputs, index, output_path, args)
+            print(f"{name:<44} {cold:>9.3f} {disk:>9.3f} {memory:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
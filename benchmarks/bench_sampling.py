@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Benchmark - overview of a very long document: all pages against a page sample"""
+
+import argparse
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+
+from concat_pdf import process_pdf
+
+
+def make_input(pages: int, path: Path) -> None:
+    """Text pages, built from a block of distinct pages copied until the count is reached"""
+    block = fitz.open()
+    for idx in range(min(pages, 500)):
+        page = block.new_page()
+        page.insert_text((72, 72), f"Page {idx + 1}", fontsize=24)
+        page.insert_textbox(fitz.Rect(72, 120, 523, 770), "Lorem ipsum dolor sit amet. " * 60,
+                            fontsize=10)
+    doc = fitz.open()
+    while len(doc) < pages:
+        doc.insert_pdf(block, to_page=min(len(block), pages - len(doc)) - 1)
+    doc.save(path, garbage=1)
+
+
+def run(input_path: Path, output_path: Path, args: argparse.Namespace, **options) -> float:
+    start = time.perf_counter()
+    with redirect_stdout(sys.stderr):
+        process_pdf(input_path, output_path, args.columns, args.rows, **options)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full processing with page sampling")
+    parser.add_argument("--pages", type=int, default=20000, help="Input pages (default: 20000)")
+    parser.add_argument("--sample", type=int, default=40, help="Sampled pages (default: 40)")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--skip-full-raster", action="store_true",
+                        help="Do not render all pages in raster mode, which takes minutes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = Path(tmp_dir) / "long.pdf"
+        make_input(args.pages, input_path)
+        output_path = Path(tmp_dir) / "output.pdf"
+        every = max(1, args.pages // args.sample)
+
+        print(f"{'Mode':<8} {'Selection':<32} {'Time (s)':>9}")
+        for render_mode in ("vector", "raster"):
+            selections = [
+                (f"all {args.pages} pages", {}),
+                (f"--sample {args.sample}", dict(sample_pages=args.sample)),
+                (f"--every {every}", dict(page_stride=every)),
+                (f"--pages 1-{args.sample}", dict(page_ranges=f"1-{args.sample}")),
+            ]
+            for name, options in selections:
+                if render_mode == "raster" and not options and args.skip_full_raster:
+                    continue
+                elapsed = run(input_path, output_path, args, render_mode=render_mode, dpi=72,
+                              **options)
+                print(f"{render_mode:<8} {name:<32} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Benchmark - time and output size of each save profile"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from concat_pdf import SAVE_PROFILES, process_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time and output size of each save profile")
+    parser.add_argument("input", type=Path, help="Input PDF file path")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--render-mode", type=str, default="vector", choices=["vector", "raster"])
+    parser.add_argument("--profiles", type=str, nargs="+", default=list(SAVE_PROFILES),
+                        choices=list(SAVE_PROFILES), help="Profiles to measure (default: all)")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = Path(tmp_dir) / "output.pdf"
+        for profile in args.profiles:
+            start = time.perf_counter()
+            process_pdf(args.input, output_path, args.columns, args.rows,
+                        render_mode=args.render_mode, save_profile=profile)
+            rows.append((profile, time.perf_counter() - start, output_path.stat().st_size))
+
+    print(f"\n| Profile | Time (s) | Size (MB) |")
+    print(f"|---------|----------|-----------|")
+    for profile, seconds, size in rows:
+        print(f"| {profile} | {seconds:.2f} | {size / 2**20:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Benchmark suite - process_pdf over the synthetic corpus, with baseline comparison
+
+Every case runs in a fresh process, so peak RSS belongs to that case alone. Results are
+written as JSON; pass an earlier results file as --baseline to fail on regressions.
+
+    python benchmarks/bench_suite.py --suite quick --output base.json
+    ... change something ...
+    python benchmarks/bench_suite.py --suite quick --baseline base.json
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from corpus import DEFAULT_CORPUS_DIR, KINDS, corpus_file
+
+# Measured metrics, lower is better for all of them
+METRICS = ("seconds", "peak_rss", "size")
+
+# Timer noise on very short cases, smaller time differences are never regressions
+MIN_SECONDS_DELTA = 0.05
+
+GRIDS = ((4, 4), (8, 10))
+
+
+def _cases(kinds, pages, grids, render_modes, save_profiles):
+    return [
+        {"kind": kind, "pages": count, "columns": n, "rows": m,
+         "render_mode": render_mode, "save_profile": save_profile}
+        for kind, count, (n, m), render_mode, save_profile
+        in itertools.product(kinds, pages, grids, render_modes, save_profiles)
+    ]
+
+
+SUITES = {
+    # A few minutes, for checking a change before committing
+    "quick": _cases(KINDS, [10, 100], GRIDS[:1], ["vector", "raster"], ["standard"])
+             + _cases(["text"], [100], GRIDS[:1], ["vector"], ["fast", "smallest"]),
+    # Everything, up to 10,000 pages; the first run spends a while generating the corpus
+    "full": _cases(KINDS, [10, 1000], GRIDS, ["vector", "raster"], ["fast", "standard", "smallest"])
+            + _cases(["text", "vector", "mixed"], [10000], GRIDS, ["vector"], ["standard"])
+            + _cases(["scanned"], [10000], GRIDS[1:], ["raster"], ["standard"]),
+}
+
+
+def case_name(case: dict) -> str:
+    return (f"{case['kind']}-{case['pages']}-{case['columns']}x{case['rows']}"
+            f"-{case['render_mode']}-{case['save_profile']}")
+
+
+def child(args) -> None:
+    """Run one process_pdf call and report time, peak RSS and output size"""
+    import resource
+    from concat_pdf import process_pdf
+
+    # Keep process_pdf's status messages out of the JSON on stdout
+    with redirect_stdout(sys.stderr):
+        start = time.perf_counter()
+        process_pdf(args.input, args.output, args.columns, args.rows,
+                    render_mode=args.render_mode, save_profile=args.save_profile)
+        elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024  # Linux reports kilobytes
+    print(json.dumps({"seconds": elapsed, "peak_rss": peak, "size": args.output.stat().st_size}))
+
+
+def run_case(case: dict, input_path: Path, output_path: Path, repeat: int) -> dict:
+    """Best time and highest peak RSS of repeat runs"""
+    cmd = [sys.executable, __file__, "--child",
+           "--input", str(input_path), "--output", str(output_path),
+           "-n", str(case["columns"]), "-m", str(case["rows"]),
+           "--render-mode", case["render_mode"], "--save-profile", case["save_profile"]]
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        "seconds": min(run["seconds"] for run in runs),
+        "peak_rss": max(run["peak_rss"] for run in runs),
+        "size": runs[-1]["size"],
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Regressions of results against baseline
+
+    Args:
+        results: Case name to metrics, as written by this script
+        baseline: Same, from an earlier run
+        threshold: Allowed relative increase, 0.1 means 10% slower or larger is still fine
+
+    Returns (case, metric, baseline value, new value) for every metric over the threshold.
+    """
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        for metric in METRICS:
+            old, new = baseline[name].get(metric), stats.get(metric)
+            if not old or not new or new <= old * (1 + threshold):
+                continue
+            if metric != "seconds" or new - old >= MIN_SECONDS_DELTA:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process_pdf over a synthetic corpus")
+    parser.add_argument("--suite", type=str, default="quick", choices=sorted(SUITES),
+                        help="Set of cases to run (default: quick)")
+    parser.add_argument("--filter", type=str, default=None,
+                        help="Only run cases whose name contains this text, e.g. scanned-100")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case, best time is kept")
+    parser.add_argument("--corpus-dir", type=Path, default=DEFAULT_CORPUS_DIR,
+                        help="Where generated input documents are kept")
+    parser.add_argument("--output", type=Path, default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Earlier results JSON; exit with status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed relative regression against the baseline (default: 0.10)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--input", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("-n", "--columns", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("-m", "--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--render-mode", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--save-profile", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.output = Path(args.output)
+        child(args)
+        return 0
+
+    import fitz
+
+    cases = [case for case in SUITES[args.suite]
+             if args.filter is None or args.filter in case_name(case)]
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else {}
+
+    results = {}
+    print(f"{'Case':<44} {'Time (s)':>9} {'Peak RSS (MB)':>14} {'Size (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for case in cases:
+            name = case_name(case)
+            input_path = corpus_file(case["kind"], case["pages"], args.corpus_dir)
+            stats = run_case(case, input_path, Path(tmp_dir) / "output.pdf", args.repeat)
+            results[name] = dict(case, **stats)
+
+            line = (f"{name:<44} {stats['seconds']:>9.2f} {stats['peak_rss'] / 2**20:>14.1f} "
+                    f"{stats['size'] / 2**20:>10.2f}")
+            if name in baseline:
+                line += f"  ({stats['seconds'] / baseline[name]['seconds'] - 1:+.0%} time)"
+            print(line, flush=True)
+
+    if args.output:
+        report = {
+            "meta": {
+                "suite": args.suite,
+                "python": platform.python_version(),
+                "pymupdf": fitz.VersionBind,
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Results written to: {args.output}")
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, old, new in regressions:
+        print(f"REGRESSION {name}: {metric} {old:.4g} -> {new:.4g} ({new / old - 1:+.0%})")
+    if args.baseline:
+        print(f"{len(regressions)} regressions over {args.threshold:.0%} "
+              f"in {len(set(results) & set(baseline))} compared cases")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Benchmark - speedup of process_pdf with 1, 2, 4 and 8 worker processes"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from concat_pdf import process_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure process_pdf speedup with worker processes")
+    parser.add_argument("input", type=Path, help="Input PDF file path")
+    parser.add_argument("-n", "--columns", type=int, default=5, help="Number of grid columns")
+    parser.add_argument("-m", "--rows", type=int, default=4, help="Number of grid rows")
+    parser.add_argument("--render-mode", type=str, default="vector", choices=["vector", "raster"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker counts to measure (default: 1 2 4 8)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per worker count, best is kept")
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"{'Workers':>8} {'Time (s)':>10} {'Speedup':>8}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = Path(tmp_dir) / "output.pdf"
+        for workers in args.workers:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                process_pdf(args.input, output_path, args.columns, args.rows,
+                            render_mode=args.render_mode, workers=workers)
+                best = min(best, time.perf_counter() - start)
+            if baseline is None:
+                baseline = best
+            print(f"{workers:>8} {best:>10.2f} {baseline / best:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic PDF corpus for benchmarks
+
+Every document is generated from a fixed seed, so the same kind and page count always
+produce the same content on every machine. Generated files are kept in a corpus
+directory and reused by later runs.
+
+Kinds:
+    text     Dense text pages
+    vector   Many stroked and filled paths per page
+    scanned  Full-page grayscale JPEG images, like a 200 dpi scanner produces
+    mixed    A4/A3/Letter pages in both orientations with text and a small image
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+import fitz
+import numpy as np
+
+KINDS = ("text", "vector", "scanned", "mixed")
+
+DEFAULT_CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+         "exercitation ullamco laboris nisi aliquip ex ea commodo consequat").split()
+
+A4 = (595.276, 841.890)
+A3 = (841.890, 1190.551)
+LETTER = (612, 792)
+
+SCAN_DPI = 200
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _text_page(doc: fitz.Document, rng: random.Random, idx: int, size=A4) -> fitz.Page:
+    page = doc.new_page(width=size[0], height=size[1])
+    page.insert_textbox(fitz.Rect(50, 50, size[0] - 50, size[1] - 50),
+                        f"Page {idx + 1}\n\n" + _paragraph(rng, 450), fontsize=9)
+    return page
+
+
+def _vector_page(doc: fitz.Document, rng: random.Random, idx: int) -> fitz.Page:
+    page = doc.new_page(width=A4[0], height=A4[1])
+    shape = page.new_shape()
+    for _ in range(300):
+        p1 = fitz.Point(rng.uniform(30, 565), rng.uniform(30, 810))
+        p2 = fitz.Point(rng.uniform(30, 565), rng.uniform(30, 810))
+        if rng.random() < 0.5:
+            shape.draw_line(p1, p2)
+        else:
+            shape.draw_bezier(p1, fitz.Point(rng.uniform(30, 565), rng.uniform(30, 810)),
+                              fitz.Point(rng.uniform(30, 565), rng.uniform(30, 810)), p2)
+        shape.finish(color=(rng.random(), rng.random(), rng.random()), width=rng.uniform(0.2, 2))
+    for _ in range(40):
+        x, y = rng.uniform(30, 500), rng.uniform(30, 750)
+        shape.draw_rect(fitz.Rect(x, y, x + rng.uniform(10, 60), y + rng.uniform(10, 60)))
+        shape.finish(color=(0, 0, 0), fill=(rng.random(), rng.random(), rng.random()), width=0.5)
+    shape.commit()
+    page.insert_text((40, 25), f"Page {idx + 1}", fontsize=10)
+    return page
+
+
+class _ScanSource:
+    """Renders a few text pages once, then derives unique scans from them cheaply"""
+
+    def __init__(self, rng: random.Random, variants: int = 4):
+        self.templates = []
+        for idx in range(variants):
+            text_doc = fitz.open()
+            page = _text_page(text_doc, rng, idx)
+            self.templates.append(page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY))
+
+    def jpeg(self, rng: random.Random, idx: int) -> bytes:
+        template = self.templates[idx % len(self.templates)]
+        width, height = template.width, template.height
+        samples = np.frombuffer(template.samples, dtype=np.uint8).reshape(height, width).copy()
+        # Page number stripe and speckles make every scan unique
+        samples[height - 60:height - 40, 40:40 + (idx % 97 + 1) * 12] = 0
+        speckles = np.random.default_rng(rng.randrange(2**32)).integers(0, 256, (3, 200))
+        samples[speckles[0] * height // 256, speckles[1] * width // 256] = speckles[2]
+        pix = fitz.Pixmap(fitz.csGRAY, width, height, samples.tobytes(), False)
+        return pix.tobytes("jpeg", jpg_quality=80)
+
+
+def generate(kind: str, pages: int, path: Path, seed: int = 0) -> Path:
+    """
+    Write a synthetic document
+
+    Args:
+        kind: One of KINDS
+        pages: Number of pages
+        path: Output PDF file path
+        seed: Random seed, the same seed always gives the same content
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+
+    rng = random.Random(f"{kind}:{pages}:{seed}")
+    doc = fitz.open()
+    scans = _ScanSource(rng) if kind == "scanned" else None
+
+    for idx in range(pages):
+        if kind == "text":
+            _text_page(doc, rng, idx)
+        elif kind == "vector":
+            _vector_page(doc, rng, idx)
+        elif kind == "scanned":
+            page = doc.new_page(width=A4[0], height=A4[1])
+            page.insert_image(page.rect, stream=scans.jpeg(rng, idx))
+        else:
+            width, height = rng.choice((A4, A3, LETTER))
+            if rng.random() < 0.3:
+                width, height = height, width
+            page = doc.new_page(width=width, height=height)
+            page.insert_textbox(fitz.Rect(40, 40, width - 40, height / 2),
+                                f"Page {idx + 1}\n\n" + _paragraph(rng, 150), fontsize=9)
+            pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 120, 90), False)
+            pix.clear_with(rng.randrange(256))
+            page.insert_image(fitz.Rect(40, height / 2 + 10, width - 40, height - 40), pixmap=pix)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.set_metadata({})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return path
+
+
+def corpus_file(kind: str, pages: int, corpus_dir: Path = DEFAULT_CORPUS_DIR) -> Path:
+    """Path of a corpus document, generated on first use"""
+    path = corpus_dir / f"{kind}_{pages}.pdf"
+    if not path.exists():
+        tmp_path = path.with_name(path.name + ".part")
+        generate(kind, pages, tmp_path)
+        tmp_path.replace(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument("--kinds", type=str, nargs="+", default=list(KINDS), choices=KINDS)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--corpus-dir", type=Path, default=DEFAULT_CORPUS_DIR)
+    args = parser.parse_args()
+
+    for kind in args.kinds:
+        for pages in args.pages:
+            path = corpus_file(kind, pages, args.corpus_dir)
+            print(f"{path} ({path.stat().st_size / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Convenient entry script for PDF Thumbnail Grid Tool"""
 
+import os
 import sys
 from pathlib import Path
 
@@ -8,8 +9,11 @@ from pathlib import Path
 src_path = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_path))
 
+# PyMuPDF prints its warnings to stdout, which may carry the output PDF ("-")
+os.environ.setdefault("PYMUPDF_MESSAGE", "fd:2")
+
 # Import the module directly
 from concat_pdf import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,210 +1,302 @@
 import argparse
-import io
-import math
 import sys
+from contextlib import nullcontext, redirect_stdout
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Optional
+
+# Only modules free of PyMuPDF, NumPy and Pillow are imported here, so that "--help",
+# argument errors and the GUI window do not wait for them. The processing API is
+# loaded from the submodules on first use, see __getattr__ below.
+from .cache import DEFAULT_CACHE_SIZE, ThumbnailCache, default_cache_dir
+from .metadata import DocumentInfo, MetadataIndex, default_metadata_index
+from .options import (DEFAULT_BLANK_COVERAGE, DEFAULT_BORDER_WIDTH, DEFAULT_DUPLICATE_DIFFERENCE,
+                      DEFAULT_MAX_OPEN, DEFAULT_SAVE_PROFILE, IMAGE_FORMATS, NEAR_DUPLICATE_MODES,
+                      RENDER_MODES, SAVE_PROFILES, SHEET_FORMATS, is_sheet_output)
+from .profiling import Profiler, profile_stage
+from .progress import (CancelToken, PageCallback, ProcessingCancelled, ProgressCallback,
+                       ProgressTracker)
+from .selection import parse_page_ranges, select_page_indices
+
+# Public names provided by heavier submodules, imported when first accessed
+_LAZY_EXPORTS = {
+    "GridPage": ".aio",
+    "GridRenderer": ".aio",
+    "iter_grid_pages": ".aio",
+    "render_grid": ".aio",
+    "analyze_pages": ".analysis",
+    "select_pages": ".analysis",
+    "calculate_grid_size": ".core",
+    "process_pdf": ".core",
+    "process_pdf_bytes": ".core",
+    "canonical_pages": ".dedup",
+    "page_fingerprints": ".dedup",
+    "ImageDownsampler": ".images",
+    "compute_layout": ".layout",
+    "page_sizes": ".layout",
+    "to_page_cells": ".layout",
+    "DocumentSet": ".multi",
+    "expand_inputs": ".multi",
+    "render_page_image": ".render",
+    "draw_borders": ".render",
+    "parse_color": ".render",
+    "render_pages": ".render",
+    "save_document": ".saving",
+    "render_sheets": ".sheets",
+    "Source": ".sources",
+    "Target": ".sources",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
+
+def _configure_console() -> None:
+    """Set console encoding to UTF-8"""
+    if sys.platform == 'win32':
+        import locale
+        try:
+            locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
+        except:
+            try:
+                locale.setlocale(locale.LC_ALL, 'English_United States.1252')
+            except:
+                pass
+
+
+# Page size mapping
+PAGE_SIZES = {
+    "auto": None,
+    "A4": (595.276, 841.890),
+    "A3": (841.890, 1190.551),
+    "A5": (419.528, 595.276),
+    "Letter": (612, 792)
+}
 
-import fitz
-import numpy as np
-from PIL import Image
 
-# Set console encoding to UTF-8
-if sys.platform == 'win32':
-    import locale
+def _page_ranges_argument(value: str) -> str:
+    """Check a --pages expression while parsing arguments, before any file is opened"""
     try:
-        locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
-    except:
-        try:
-            locale.setlocale(locale.LC_ALL, 'English_United States.1252')
-        except:
-            pass
-
-
-def calculate_grid_size(total_pages: int, n: int, m: Optional[int] = None) -> Tuple[int, int]:
-    """Calculate grid size"""
-    if m is None:
-        m = math.ceil(total_pages / n)
-    return n, m
-
-
-def process_pdf(
-    input_path: Path,
-    output_path: Path,
-    n: int,
-    m: Optional[int] = None,
-    page_size: Optional[Tuple[float, float]] = None,  # None means auto-calculate
-    orientation: str = "landscape",  # Default landscape for better multi-page display
-    dpi: int = 150,
-    gap: float = 3,  # Spacing between thumbnails (points), smaller to save space
-    padding: float = 10,  # Page margins
-) -> None:
-    """
-    Process PDF file to generate N×M grid merged thumbnail PDF
-
-    Args:
-        input_path: Input PDF file path
-        output_path: Output PDF file path
-        n: Number of grid columns
-        m: Number of grid rows (optional, auto-calculated if not provided)
-        page_size: Output PDF page size (width, height) in points, None means auto-calculate
-        orientation: Page orientation "portrait" or "landscape"
-        dpi: Thumbnail DPI
-        gap: Spacing between thumbnails (points)
-        padding: Page margins (points)
-    """
-    # Open input PDF
-    doc = fitz.open(input_path)
-    total_pages = len(doc)
-
-    # Calculate grid size
-    n, m = calculate_grid_size(total_pages, n, m)
-
-    # Calculate total pages (how many output pages are needed)
-    thumbnails_per_page = n * m
-    output_pages = math.ceil(total_pages / thumbnails_per_page)
-
-    # If no page size specified, automatically calculate the optimal page size based on content and layout
-    if page_size is None:
-        # Get the aspect ratio of the first page as reference
-        first_page = doc[0]
-        src_rect = first_page.rect
-        aspect_ratio = src_rect.width / src_rect.height
-
-        # Set appropriate thumbnail height (based on DPI)
-        # Use larger size for better viewing, but avoid excessive size
-        base_thumb_height = 300  # Base thumbnail height
-        base_thumb_width = base_thumb_height * aspect_ratio
-
-        # Calculate page size - use compact layout to reduce whitespace
-        # Reduce spacing and margins to better utilize space
-        effective_gap = gap * 0.5  # Use smaller spacing
-        effective_padding = padding * 0.8  # Use smaller margins
-
-        page_width = n * base_thumb_width + (n - 1) * effective_gap + 2 * effective_padding
-        page_height = m * base_thumb_height + (m - 1) * effective_gap + 2 * effective_padding
-
-        page_size = (page_width, page_height)
-        print(f"Auto-calculated page size: {page_width:.2f} x {page_height:.2f} points")
-        print(f"In inches: {page_width/72:.2f} x {page_height/72:.2f} inches")
-    else:
-        print(f"Using specified page size: {page_size}")
-        # Adjust page orientation
-        if orientation == "landscape":
-            page_size = (page_size[1], page_size[0])
-
-    # Calculate available space for each thumbnail
-    # If auto-calculating page size, use actual effective spacing
-    if page_size is None:
-        effective_gap = gap * 0.5
-        effective_padding = padding * 0.8
-    else:
-        effective_gap = gap
-        effective_padding = padding
-
-    available_width = page_size[0] - 2 * effective_padding - (n - 1) * effective_gap
-    available_height = page_size[1] - 2 * effective_padding - (m - 1) * effective_gap
-    thumbnail_width = available_width / n
-    thumbnail_height = available_height / m
-
-    # Create output PDF
-    output_doc = fitz.open()
-
-    for page_idx in range(output_pages):
-        # Create new page
-        page = output_doc.new_page(width=page_size[0], height=page_size[1])
-
-        # Calculate thumbnail range for current page
-        start_idx = page_idx * thumbnails_per_page
-        end_idx = min(start_idx + thumbnails_per_page, total_pages)
-
-        for idx in range(start_idx, end_idx):
-            # Calculate position in grid
-            grid_idx = idx - start_idx
-            row = grid_idx // n
-            col = grid_idx % n
-
-            # Calculate thumbnail position on page
-            x = effective_padding + col * (thumbnail_width + effective_gap)
-            y = effective_padding + row * (thumbnail_height + effective_gap)
-
-            # Get original page
-            src_page = doc[idx]
-
-            # Get original page aspect ratio
-            src_rect = src_page.rect
-            aspect_ratio = src_rect.width / src_rect.height
-
-            # Calculate thumbnail rectangle, maintaining aspect ratio
-            if aspect_ratio > thumbnail_width / thumbnail_height:
-                # Width limited
-                thumb_width_final = thumbnail_width
-                thumb_height_final = thumbnail_width / aspect_ratio
-                # Center align
-                y_offset = (thumbnail_height - thumb_height_final) / 2
-                img_rect = fitz.Rect(x, y + y_offset, x + thumb_width_final, y + y_offset + thumb_height_final)
-            else:
-                # Height limited
-                thumb_height_final = thumbnail_height
-                thumb_width_final = thumbnail_height * aspect_ratio
-                # Center align
-                x_offset = (thumbnail_width - thumb_width_final) / 2
-                img_rect = fitz.Rect(x + x_offset, y, x + x_offset + thumb_width_final, y + thumb_height_final)
-
-            # Draw page directly to new position (more efficient and maintains quality)
-            page.show_pdf_page(img_rect, doc, idx)
-
-            # Draw black border
-            page.draw_rect(img_rect, color=fitz.utils.getColor("black"), width=0.5)
-
-    # Save output PDF
-    output_doc.save(output_path, garbage=4, deflate=True)
-    output_doc.close()
-    doc.close()
-
-
-def main():
-    parser = argparse.ArgumentParser(description="PDF Thumbnail Grid Tool - Auto-calculate page size")
-    parser.add_argument("input", type=Path, help="Input PDF file path")
-    parser.add_argument("output", type=Path, help="Output PDF file path")
+        parse_page_ranges(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def add_layout_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the grid and rendering options shared by all commands"""
     parser.add_argument("-n", "--columns", type=int, required=True, help="Number of grid columns")
     parser.add_argument("-m", "--rows", type=int, help="Number of grid rows (optional, auto-calculated)")
     parser.add_argument("--page-size", type=str, default="auto",
-                       choices=["auto", "A4", "A3", "A5", "Letter"],
+                       choices=list(PAGE_SIZES),
                        help="Output page size, 'auto' means auto-calculate based on content")
     parser.add_argument("--orientation", type=str, default="landscape",
                        choices=["portrait", "landscape"],
                        help="Page orientation (default: landscape)")
-    parser.add_argument("--dpi", type=int, default=150, help="Thumbnail DPI")
+    parser.add_argument("--dpi", type=int, default=150, help="Thumbnail DPI (used by raster mode)")
+    parser.add_argument("--render-mode", type=str, default="vector", choices=RENDER_MODES,
+                       help="'vector' embeds source pages, 'raster' embeds rendered images (default: vector)")
+    parser.add_argument("--image-format", type=str, default="jpeg", choices=IMAGE_FORMATS,
+                       help="Image encoding for raster mode (default: jpeg)")
+    parser.add_argument("--image-quality", type=int, default=85,
+                       help="JPEG quality for raster mode, 1-100 (default: 85)")
     parser.add_argument("--gap", type=float, default=3, help="Spacing between thumbnails (points)")
+    parser.add_argument("--pack-rows", action="store_true",
+                       help="Justify rows so mixed portrait/landscape pages share rows efficiently")
     parser.add_argument("--padding", type=float, default=10, help="Page margins (points)")
-
-    args = parser.parse_args()
-
-    # Page size mapping
-    page_sizes = {
-        "auto": None,
-        "A4": (595.276, 841.890),
-        "A3": (841.890, 1190.551),
-        "A5": (419.528, 595.276),
-        "Letter": (612, 792)
-    }
-
-    process_pdf(
-        input_path=args.input,
-        output_path=args.output,
+    parser.add_argument("--no-border", action="store_true", help="Do not outline the thumbnails")
+    parser.add_argument("--border-width", type=float, default=DEFAULT_BORDER_WIDTH, metavar="PT",
+                       help=f"Thumbnail border width in points (default: {DEFAULT_BORDER_WIDTH})")
+    parser.add_argument("--border-color", type=str, default="black", metavar="COLOR",
+                       help="Thumbnail border color, a name like 'gray50' or #rrggbb (default: black)")
+    parser.add_argument("--cache", type=Path, nargs="?", const=default_cache_dir(), default=None,
+                       metavar="DIR",
+                       help=f"Reuse rendered thumbnails across runs (raster mode), "
+                            f"optionally in DIR (default: {default_cache_dir()})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                       metavar="MB", help="Thumbnail cache size limit in MB (default: 1024)")
+    parser.add_argument("--save-profile", type=str, default=DEFAULT_SAVE_PROFILE,
+                       choices=list(SAVE_PROFILES),
+                       help="Output cleanup and compression: 'fast' for drafts, 'smallest' for "
+                            f"archiving (default: {DEFAULT_SAVE_PROFILE})")
+    parser.add_argument("--dedup-pages", action="store_true",
+                       help="Embed identical source pages (blank separators, boilerplate) only once")
+    parser.add_argument("--downsample-images", action="store_true",
+                       help="Vector mode: shrink embedded photos and scans to --dpi at their "
+                            "thumbnail size, keeping text and vector graphics sharp")
+    parser.add_argument("--skip-blank", action="store_true",
+                       help="Leave blank pages (e.g. the empty backs of scanned sheets) out of the grid")
+    parser.add_argument("--near-duplicates", type=str, default=None,
+                       choices=[mode for mode in NEAR_DUPLICATE_MODES if mode],
+                       help="'skip' leaves out pages that look nearly like an earlier page, "
+                            "'collapse' only those that look like the page before them")
+    parser.add_argument("--blank-coverage", type=float, default=DEFAULT_BLANK_COVERAGE,
+                       metavar="FRACTION",
+                       help=f"Ink coverage below which a page is blank (default: {DEFAULT_BLANK_COVERAGE})")
+    parser.add_argument("--duplicate-difference", type=float, default=DEFAULT_DUPLICATE_DIFFERENCE,
+                       metavar="FRACTION",
+                       help="Largest fraction of differing ink for near-duplicates "
+                            f"(default: {DEFAULT_DUPLICATE_DIFFERENCE})")
+    parser.add_argument("--pages", type=_page_ranges_argument, default=None, metavar="RANGES",
+                       help="Only these pages, numbered from 1, e.g. '1-50,100,200-' "
+                            "('200-' runs to the last page)")
+    parser.add_argument("--every", type=int, default=1, metavar="K",
+                       help="Only every K-th page (of the --pages selection)")
+    parser.add_argument("--sample", type=int, default=None, metavar="N",
+                       help="Only N evenly spaced pages, for a quick overview of a long document")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Rebuild only output pages whose source pages changed, using a "
+                            "manifest stored next to the output (needs -m)")
+
+
+def layout_options(args: argparse.Namespace) -> dict:
+    """Convert parsed layout arguments to process_pdf keyword arguments"""
+    return dict(
         n=args.columns,
         m=args.rows,
-        page_size=page_sizes[args.page_size],
+        page_size=PAGE_SIZES[args.page_size],
         orientation=args.orientation,
         dpi=args.dpi,
         gap=args.gap,
-        padding=args.padding
+        padding=args.padding,
+        pack_rows=args.pack_rows,
+        render_mode=args.render_mode,
+        image_format=args.image_format,
+        image_quality=args.image_quality,
+        cache=ThumbnailCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None,
+        save_profile=args.save_profile,
+        dedup_pages=args.dedup_pages,
+        downsample_images=args.downsample_images,
+        incremental=args.incremental,
+        border=not args.no_border,
+        border_width=args.border_width,
+        border_color=args.border_color,
+        skip_blank=args.skip_blank,
+        near_duplicates=args.near_duplicates,
+        blank_coverage=args.blank_coverage,
+        duplicate_difference=args.duplicate_difference,
+        page_ranges=args.pages,
+        page_stride=args.every,
+        sample_pages=args.sample,
     )
 
-    print(f"Successfully generated thumbnail PDF: {args.output}")
+
+def main(argv: Optional[list] = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    _configure_console()
+
+    # Subcommands, the default command keeps the original "input output" form
+    if argv and argv[0] == "batch":
+        from .batch import batch_main
+        return batch_main(argv[1:])
+    if argv and argv[0] == "pyramid":
+        from .pyramid_cli import pyramid_main
+        return pyramid_main(argv[1:])
+    if argv and argv[0] == "serve":
+        from .serve import serve_main
+        return serve_main(argv[1:])
+    if argv and argv[0] == "watch":
+        from .watch import watch_main
+        return watch_main(argv[1:])
+
+    parser = argparse.ArgumentParser(
+        description="PDF Thumbnail Grid Tool - Auto-calculate page size",
+        epilog="Run 'batch --help' to process many PDF files in one run, "
+               "'pyramid --help' for a zoomable Deep Zoom tile pyramid, "
+               "'serve --help' for the HTTP thumbnail service, "
+               "'watch --help' to process files as they arrive in a folder",
+    )
+    parser.add_argument("inputs", nargs="+", metavar="input",
+                       help="Input PDF file path, '-' reads from stdin; several files, directories, "
+                            "glob patterns or @list files (one path per line) are concatenated "
+                            "into one grid")
+    parser.add_argument("output", type=Path,
+                       help="Output PDF file path, '-' writes to stdout (messages go to stderr), "
+                            "or an image path (" + ", ".join(SHEET_FORMATS)
+                            + ") to write the grid pages as images")
+    add_layout_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes for rendering output pages in parallel (default: 1)")
+    parser.add_argument("--stream-batch", type=int, default=None, metavar="PAGES",
+                       help="Write output pages to disk in batches of PAGES to bound memory use")
+    parser.add_argument("--max-open", type=int, default=DEFAULT_MAX_OPEN, metavar="FILES",
+                       help="With several inputs, how many files are kept open at once "
+                            f"(default: {DEFAULT_MAX_OPEN})")
+    parser.add_argument("--tile-size", type=int, default=None, metavar="PX",
+                       help="Image output: split grid pages into tiles of at most PX × PX pixels")
+    parser.add_argument("--profile", type=Path, nargs="?", const=True, default=None,
+                       metavar="REPORT",
+                       help="Print stage timings and write a JSON report to REPORT "
+                            "(default: <output>.profile.json)")
+    parser.add_argument("--profile-stats", type=Path, default=None, metavar="FILE",
+                       help="Also run cProfile and dump pstats data to FILE")
+
+    args = parser.parse_args(argv)
+
+    # Deferred until the arguments are valid, "--help" does not need them
+    import fitz
+    from .core import process_pdf
+    from .multi import expand_inputs
+
+    profiler = None
+    if args.profile or args.profile_stats:
+        profiler = Profiler(cprofile=args.profile_stats is not None)
+
+    # "-" for shell pipelines; with the PDF on stdout, status messages move to stderr
+    from_stdin = args.inputs == ["-"]
+    if from_stdin:
+        input_path = sys.stdin.buffer
+    else:
+        inputs = expand_inputs(args.inputs)
+        if not inputs:
+            parser.error("no input files found")
+        input_path = inputs[0] if len(inputs) == 1 else inputs
+    to_stdout = str(args.output) == "-"
+    output = sys.stdout.buffer if to_stdout else args.output
+    if to_stdout and hasattr(fitz, "set_messages"):
+        fitz.set_messages(stream=sys.stderr)  # MuPDF warnings would corrupt the PDF
+
+    with redirect_stdout(sys.stderr) if to_stdout else nullcontext():
+        process_pdf(
+            input_path=input_path,
+            output_path=output,
+            workers=args.workers,
+            stream_batch=args.stream_batch,
+            max_open_documents=args.max_open,
+            profiler=profiler,
+            tile_size=args.tile_size,
+            metadata=default_metadata_index(),
+            **layout_options(args)
+        )
+        if to_stdout:
+            output.flush()
+            print("Successfully generated thumbnail PDF on stdout")
+        elif not is_sheet_output(args.output):
+            print(f"Successfully generated thumbnail PDF: {args.output}")
+
+        if profiler is not None:
+            print(profiler.summary())
+            report_path = args.profile
+            if report_path is True or report_path is None:
+                report_path = (Path("concat_pdf.profile.json") if to_stdout
+                               else args.output.with_suffix(".profile.json"))
+            profiler.write_json(report_path)
+            print(f"Profile report: {report_path}")
+            if args.profile_stats:
+                profiler.dump_stats(args.profile_stats)
+                print(f"cProfile stats: {args.profile_stats}")
 
 
 if __name__ == "__main__":
-    import io
-    main()
\ No newline at end of file
+    sys.exit(main())
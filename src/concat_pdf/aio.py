@@ -0,0 +1,273 @@
+"""asyncio API - grid generation for event-loop services, in warm worker processes"""
+
+import asyncio
+import contextlib
+import functools
+import io
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Sequence, Union
+
+from .parallel import _warm_up
+from .progress import FileCancelToken, ProcessingCancelled
+from .sources import Source, Target, is_path, source_buffer
+
+# A worker waiting for the consumer to take a page checks for cancellation this often (seconds)
+_PUT_WAIT = 0.1
+# How long the parent waits for a message before checking whether the job has failed (seconds)
+_GET_WAIT = 0.2
+# Progress is sent to the parent at most this often (seconds), and once at the end
+PROGRESS_INTERVAL = 0.1
+
+
+class GridPage(NamedTuple):
+    """An output page yielded by GridRenderer.iter_pages"""
+    number: int  # 0-based output page number
+    pdf: bytes  # The page as a one-page PDF
+
+
+def _send(messages, cancel: FileCancelToken, message: tuple) -> None:
+    """Worker: queue a message for the parent, waiting while the consumer is behind"""
+    while True:
+        try:
+            messages.put(message, timeout=_PUT_WAIT)
+            return
+        except queue.Full:
+            if cancel.is_set():
+                raise ProcessingCancelled("Processing cancelled")
+
+
+def _run_job(input_path, output_path, n: int, options: dict, cancel_path: str, messages,
+             send_pages: bool, send_progress: bool) -> Optional[bytes]:
+    """
+    Worker: one process_pdf call
+
+    output_path None builds the output in memory and returns it, False saves nothing (only
+    the pages are wanted). Pages, throttled progress and a final "end" message go to the
+    messages queue.
+    """
+    from .core import process_pdf
+    cancel = FileCancelToken(cancel_path)
+    options = dict(options, cancel=cancel)
+    if send_pages:
+        options["page_callback"] = lambda number, pdf: _send(messages, cancel, ("page", number, pdf))
+    if send_progress:
+        last_sent = [0.0]
+
+        def on_progress(done: int, total: int) -> None:
+            now = time.monotonic()
+            if done >= total or now - last_sent[0] >= PROGRESS_INTERVAL:
+                last_sent[0] = now
+                _send(messages, cancel, ("progress", done, total))
+        options["progress"] = on_progress
+
+    output = io.BytesIO() if output_path is None else output_path or None
+    # process_pdf reports progress on stdout, which is of no use here
+    with contextlib.redirect_stdout(io.StringIO()):
+        process_pdf(input_path, output, n, **options)
+    if messages is not None:
+        _send(messages, cancel, ("end", None, None))
+    return output.getvalue() if output_path is None else None
+
+
+def _receive(messages) -> Optional[tuple]:
+    """Next message from the worker, None if there was none for a while"""
+    try:
+        return messages.get(timeout=_GET_WAIT)
+    except queue.Empty:
+        return None
+
+
+class GridRenderer:
+    """
+    Runs process_pdf jobs in warm worker processes for asyncio code
+
+    PyMuPDF does not support concurrent use from several threads, so every job runs in a
+    process of the renderer's pool, like the jobs of the HTTP service; the event loop only
+    waits. At most max_jobs jobs render at the same time, further jobs wait in the loop.
+
+    Cancelling the awaiting task stops the job at its next grid cell, removes any partial
+    output and then re-raises CancelledError, so a cancelled job never keeps rendering in
+    the background. A progress callback is called in the event loop, throttled.
+
+    Args:
+        max_jobs: Jobs rendering at the same time, one worker process each
+            (default: number of CPUs)
+
+    Use as "async with GridRenderer() as renderer", or await close() when done.
+    """
+
+    def __init__(self, max_jobs: Optional[int] = None):
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        # Created in the running loop by _job_slots, a renderer may outlive its first loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Serves the queues that carry pages and progress from the workers
+        self._manager = None
+        # Jobs in the pool and their cancel tokens, stopped by close()
+        self._running: Dict[asyncio.Future, FileCancelToken] = {}
+
+    async def __aenter__(self) -> "GridRenderer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Stop running jobs (e.g. of a page loop left early) and the worker processes"""
+        for cancel in self._running.values():
+            cancel.set()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(pool.shutdown, wait=True, cancel_futures=True))
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Processes start with the first jobs and stay for the next ones
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_jobs, initializer=_warm_up)
+        return self._pool
+
+    def _job_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_jobs)
+            self._slots_loop = loop
+        return self._slots
+
+    def _message_queue(self, size: int):
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        return self._manager.Queue(size)
+
+    async def _job(self, input_path, output_path, n: int, options: dict,
+                   send_pages: bool = False,
+                   max_pending: int = 4) -> AsyncIterator[Union[GridPage, bytes]]:
+        """Run one job, yield its pages (with send_pages), then its output if built in memory"""
+        if "cancel" in options or "page_callback" in options:
+            raise TypeError("GridRenderer jobs are cancelled by cancelling their task")
+        options = dict(options)
+        progress = options.pop("progress", None)
+        if not is_path(input_path) and not isinstance(input_path, (bytes, list, tuple)):
+            # Buffers and file objects cannot be sent to a worker process
+            input_path = bytes(source_buffer(input_path))
+
+        async with self._job_slots():
+            loop = asyncio.get_running_loop()
+            messages = None
+            if send_pages or progress is not None:
+                messages = self._message_queue(max_pending)
+            with tempfile.TemporaryDirectory(prefix="concat_pdf_") as tmp_dir:
+                cancel = FileCancelToken(os.path.join(tmp_dir, "cancel"))
+                job = loop.run_in_executor(
+                    self._executor(), _run_job, input_path, output_path, n, options,
+                    cancel.path, messages, send_pages, progress is not None)
+                self._running[job] = cancel
+                try:
+                    while messages is not None:
+                        message = await loop.run_in_executor(None, _receive, messages)
+                        if message is None:
+                            if job.done():
+                                break  # Failed before its "end" message
+                            continue
+                        kind, first, second = message
+                        if kind == "end":
+                            break
+                        if kind == "progress":
+                            progress(first, second)
+                        else:
+                            yield GridPage(first, second)
+                    output = await asyncio.shield(job)
+                except BaseException:
+                    # Cancelled, failed, or the consumer stopped iterating: stop the worker
+                    # at its next cell and wait until it has removed its partial output
+                    cancel.set()
+                    await asyncio.gather(job, return_exceptions=True)
+                    if not job.cancelled() and isinstance(job.exception(), BrokenProcessPool):
+                        # A worker died (e.g. out of memory), start fresh ones for the next job
+                        self._pool = None
+                    raise
+                finally:
+                    self._running.pop(job, None)
+        if output is not None:
+            yield output
+
+    async def render_grid(self, input_path: Union[Source, Sequence[Path]], output_path: Target,
+                          n: int, **options) -> None:
+        """
+        Build the grid, like process_pdf, without blocking the event loop
+
+        Args:
+            input_path: Input PDF file path(s) or in-memory PDF, see process_pdf
+            output_path: Output file path or writable binary file object
+            n: Number of grid columns
+            options: Further process_pdf keyword arguments
+        """
+        in_memory = not is_path(output_path)
+        async for output in self._job(input_path, None if in_memory else output_path, n, options):
+            output_path.write(output)
+
+    async def render_grid_bytes(self, data: Union[Source, Sequence[Path]], n: int,
+                                **options) -> bytes:
+        """Build the grid in memory and return the output PDF, see process_pdf_bytes"""
+        output = io.BytesIO()
+        await self.render_grid(data, output, n, **options)
+        return output.getvalue()
+
+    async def iter_pages(self, input_path: Union[Source, Sequence[Path]], n: int,
+                         output_path: Optional[Union[str, os.PathLike]] = None,
+                         max_pending: int = 4, **options) -> AsyncIterator[GridPage]:
+        """
+        Yield output pages as one-page PDFs while the rest of the grid is still rendering
+
+        Rendering pauses while max_pending finished pages are waiting to be consumed, so a
+        slow consumer (an upload, say) bounds memory use. Leaving the loop early or
+        cancelling the consuming task stops the job.
+
+        Args:
+            input_path: Input PDF file path(s) or in-memory PDF, see process_pdf
+            n: Number of grid columns
+            output_path: Also write the complete output to this file, None only yields pages
+            max_pending: Finished pages buffered ahead of the consumer
+            options: Further process_pdf keyword arguments (PDF output only)
+        """
+        # Closing this generator closes the job's right away, not when it is garbage collected
+        async with contextlib.aclosing(self._job(input_path, output_path or False, n, options,
+                                                 send_pages=True, max_pending=max_pending)) as pages:
+            async for page in pages:
+                yield page
+
+
+# Shared by the module-level functions, created on first use
+_default_renderer: Optional[GridRenderer] = None
+
+
+def default_renderer() -> GridRenderer:
+    """The GridRenderer behind render_grid and iter_grid_pages, one job per CPU"""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = GridRenderer()
+    return _default_renderer
+
+
+async def render_grid(input_path: Union[Source, Sequence[Path]], output_path: Target, n: int,
+                      **options) -> None:
+    """await-able process_pdf, see GridRenderer.render_grid"""
+    await default_renderer().render_grid(input_path, output_path, n, **options)
+
+
+def iter_grid_pages(input_path: Union[Source, Sequence[Path]], n: int,
+                    **options) -> AsyncIterator[GridPage]:
+    """Output pages as they are finished, see GridRenderer.iter_pages"""
+    return default_renderer().iter_pages(input_path, n, **options)
@@ -0,0 +1,306 @@
+"""Blank and near-duplicate page detection from tiny renders of every page"""
+
+import hashlib
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import fitz
+import numpy as np
+
+from .cache import ThumbnailCache
+from .multi import DocumentSet
+from .options import DEFAULT_BLANK_COVERAGE, DEFAULT_DUPLICATE_DIFFERENCE, NEAR_DUPLICATE_MODES
+
+# Side of the square grayscale image every page is rendered to, a multiple of 64
+ANALYSIS_SIZE = 128
+
+# Bump when the analysis output changes, so stale cached results are never reused
+ANALYSIS_VERSION = 1
+
+# A pixel is ink when it is this much darker than the page background (0-255)
+INK_CONTRAST = 32
+
+# Pixels along each edge left out of the ink mask, where scanners leave shadows
+EDGE_MARGIN = 5
+
+# Perceptual hash: DCT of a 32 x 32 image, lowest 8 x 8 frequencies
+HASH_SIZE = 8
+
+# Pages whose hashes differ in more bits are not compared pixel by pixel. Rendering noise
+# moves the hash of the same text page by up to about 10 bits.
+CANDIDATE_DISTANCE = 16
+
+# Below this coverage the hash is mostly noise, such pages are always compared
+SPARSE_COVERAGE = 0.01
+
+
+class PageAnalysis(NamedTuple):
+    """Result of analyze_pages, one entry per source page"""
+    coverage: np.ndarray  # (N,) float32 fraction of the page covered by ink
+    hashes: np.ndarray  # (N,) uint64 perceptual hashes
+    masks: np.ndarray  # (N, ANALYSIS_SIZE**2 / 64) uint64 packed ink masks
+
+
+def render_small(doc: fitz.Document, size: int = ANALYSIS_SIZE,
+                 pages: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    (N, size, size) uint8 grayscale renders of all pages, each stretched to the square
+
+    MuPDF decodes scanned images at a reduced resolution for a target this small, so this
+    costs a fraction of rendering thumbnails. pages limits the renders to those pages.
+    """
+    if pages is None:
+        pages = range(len(doc))
+    images = np.full((len(pages), size, size), 255, dtype=np.uint8)
+    for idx, pno in enumerate(pages):
+        page = doc[pno]
+        rect = page.rect
+        pix = page.get_pixmap(matrix=fitz.Matrix(size / rect.width, size / rect.height),
+                              colorspace=fitz.csGRAY, alpha=False)
+        samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+        # Rounding can add a row or column
+        height, width = min(pix.height, size), min(pix.width, size)
+        images[idx, :height, :width] = samples[:height, :width]
+    return images
+
+
+def ink_masks(images: np.ndarray) -> np.ndarray:
+    """
+    (N, size, size) bool, pixels clearly darker than their page's background
+
+    The background is the page's 95th brightness percentile, so tinted paper and light
+    scanner noise do not count as ink. A page of one uniform color has none.
+    """
+    background = np.percentile(images.reshape(len(images), -1), 95, axis=1)
+    masks = images.astype(np.int16) < (background - INK_CONTRAST)[:, None, None]
+    masks[:, :EDGE_MARGIN] = masks[:, -EDGE_MARGIN:] = False
+    masks[:, :, :EDGE_MARGIN] = masks[:, :, -EDGE_MARGIN:] = False
+    return masks
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix, D @ x transforms the columns of x"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def perceptual_hashes(images: np.ndarray) -> np.ndarray:
+    """(N,) uint64 DCT hashes (pHash) of all pages, computed in one batch"""
+    side = HASH_SIZE * 4
+    count, size = len(images), images.shape[1]
+    factor = size // side
+    small = images.reshape(count, side, factor, side, factor).mean(axis=(2, 4))
+    dct = _dct_matrix(side)
+    low = (dct @ small @ dct.T)[:, :HASH_SIZE, :HASH_SIZE].reshape(count, -1)
+    # Median without the DC term, which only says how dark the page is overall
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def _analyze_document(doc: fitz.Document, pages: Optional[Sequence[int]] = None) -> PageAnalysis:
+    images = render_small(doc, pages=pages)
+    masks = ink_masks(images)
+    interior = (ANALYSIS_SIZE - 2 * EDGE_MARGIN) ** 2
+    coverage = (masks.sum(axis=(1, 2)) / interior).astype(np.float32)
+    packed = np.packbits(masks.reshape(len(masks), -1), axis=1).view(np.uint64)
+    return PageAnalysis(coverage, perceptual_hashes(images), packed)
+
+
+def _mask_words() -> int:
+    return ANALYSIS_SIZE * ANALYSIS_SIZE // 64
+
+
+def _to_bytes(analysis: PageAnalysis) -> bytes:
+    return (analysis.coverage.astype("<f4").tobytes() + analysis.hashes.astype("<u8").tobytes()
+            + analysis.masks.tobytes())
+
+
+def _from_bytes(data: bytes, count: int) -> Optional[PageAnalysis]:
+    words = _mask_words()
+    if len(data) != count * (4 + 8 + 8 * words):
+        return None
+    coverage = np.frombuffer(data, dtype="<f4", count=count).astype(np.float32)
+    hashes = np.frombuffer(data, dtype="<u8", count=count, offset=count * 4).astype(np.uint64)
+    masks = np.frombuffer(data, dtype=np.uint64, offset=count * 12).reshape(count, words)
+    return PageAnalysis(coverage, hashes, masks)
+
+
+def analyze_pages(
+    doc: Union[fitz.Document, DocumentSet],
+    cache: Optional[ThumbnailCache] = None,
+    source_digest: Union[str, Sequence[str], None] = None,
+    pages: Optional[Sequence[int]] = None,
+) -> PageAnalysis:
+    """
+    Ink coverage, perceptual hash and ink mask of every page (of the selected pages)
+
+    Results are cached per document (per file for a DocumentSet) when a cache and the
+    content digest are given, so later runs with other thresholds or grids skip the
+    rendering entirely.
+
+    Args:
+        doc: Source document or DocumentSet
+        cache: Store for the per-document results, e.g. the thumbnail cache
+        source_digest: Content hash of the source file, one per file for a DocumentSet
+        pages: Analyze only these pages (in ascending order), the result has one entry
+            per selected page; None means all pages
+    """
+    if isinstance(doc, DocumentSet):
+        digests = source_digest if source_digest is not None else [None] * len(doc.paths)
+        if pages is None:
+            parts = [analyze_pages(part, cache, digest)
+                     for part, digest in zip(doc.documents(), digests)]
+        else:
+            # Files without selected pages are not opened
+            parts = [analyze_pages(doc.document(number), cache, digests[number], local)
+                     for number, local in enumerate(doc.pages_by_file(pages)) if local]
+        return PageAnalysis(*(np.concatenate(arrays) for arrays in zip(*parts)))
+
+    if cache is None or source_digest is None:
+        return _analyze_document(doc, pages)
+
+    # One entry for the whole document (page index -1), or for one selection of its pages
+    selection = "all" if pages is None else hashlib.sha256(
+        np.asarray(pages, dtype="<i8").tobytes()).hexdigest()
+    key = cache.make_key(source_digest, -1, "analysis", ANALYSIS_VERSION, ANALYSIS_SIZE, selection)
+    data = cache.get(key)
+    count = len(doc) if pages is None else len(pages)
+    analysis = _from_bytes(data, count) if data is not None else None
+    if analysis is None:
+        analysis = _analyze_document(doc, pages)
+        cache.put(key, _to_bytes(analysis))
+    return analysis
+
+
+def _bit_count(values: np.ndarray) -> np.ndarray:
+    """Set bits of every uint64 value"""
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+        return np.bitwise_count(values)
+    bytes_view = values.view(np.uint8).reshape(*values.shape, 8)
+    return np.unpackbits(bytes_view, axis=-1).sum(axis=-1)
+
+
+def mask_difference(masks: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Fraction of the inked pixels that differ, for the page pairs (first[k], second[k])
+
+    0 for identical pages and for two blank pages, 1 for pages without common ink.
+    """
+    a, b = masks[first], masks[second]
+    differing = _bit_count(a ^ b).sum(axis=1)
+    inked = _bit_count(a | b).sum(axis=1)
+    return differing / np.maximum(inked, 1)
+
+
+def _close_pairs(analysis: PageAnalysis, rows: np.ndarray, columns: np.ndarray,
+                 max_difference: float, earlier_only: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Near-duplicate page pairs (rows[i], columns[j]), sorted by row page, then column page
+
+    Pairs with close perceptual hashes and similar coverage are candidates, their ink
+    masks decide. Both steps work on whole blocks of pairs at once.
+    """
+    coverage, hashes, masks = analysis
+    cov_a, cov_b = coverage[rows][:, None], coverage[columns][None, :]
+    similar = ((_bit_count(hashes[rows][:, None] ^ hashes[columns][None, :]) <= CANDIDATE_DISTANCE)
+               | (np.maximum(cov_a, cov_b) < SPARSE_COVERAGE))
+    # Masks differing in at most max_difference of their ink differ at most that much
+    # in coverage
+    candidate = similar & (np.abs(cov_a - cov_b) <= max_difference * (cov_a + cov_b))
+    if earlier_only:
+        candidate &= columns[None, :] < rows[:, None]
+    first, second = np.nonzero(candidate)
+    first, second = rows[first], columns[second]
+
+    close = np.zeros(len(first), dtype=bool)
+    for start in range(0, len(first), 4096):
+        pairs = slice(start, start + 4096)
+        close[pairs] = mask_difference(masks, first[pairs], second[pairs]) <= max_difference
+    return first[close], second[close]
+
+
+def near_duplicate_of(analysis: PageAnalysis, max_difference: float, consecutive: bool = False,
+                      chunk: int = 256) -> np.ndarray:
+    """
+    For every page, the earliest kept page it nearly duplicates, or -1
+
+    Pages are only compared with pages that are kept themselves, so a run of thousands of
+    similar pages costs about as much as thousands of unique ones.
+
+    Args:
+        analysis: Result of analyze_pages
+        max_difference: Largest fraction of differing ink pixels, see mask_difference
+        consecutive: Only compare each page with the one before it, so runs of similar
+            pages collapse to their first page while later repeats are kept
+        chunk: Pages compared against the kept pages at a time, bounds memory
+    """
+    count = len(analysis.hashes)
+    original = np.full(count, -1, dtype=np.int64)
+    if count < 2:
+        return original
+    if consecutive:
+        pages = np.arange(1, count)
+        close = mask_difference(analysis.masks, pages, pages - 1) <= max_difference
+        original[pages[close]] = pages[close] - 1
+        return original
+
+    kept = np.empty(0, dtype=np.int64)
+    for start in range(0, count, chunk):
+        pages = np.arange(start, min(start + chunk, count))
+        # Against the pages kept so far, the first pair of a page holds its earliest match
+        first, second = _close_pairs(analysis, pages, kept, max_difference)
+        matched, position = np.unique(first, return_index=True)
+        original[matched] = second[position]
+
+        # The remaining pages of the chunk among themselves, in page order
+        rest = pages[original[pages] < 0]
+        first, second = _close_pairs(analysis, rest, rest, max_difference, earlier_only=True)
+        matches = {}
+        for page, earlier in zip(first.tolist(), second.tolist()):
+            matches.setdefault(page, []).append(earlier)
+        for page, candidates in matches.items():
+            original[page] = next((earlier for earlier in candidates if original[earlier] < 0), -1)
+        kept = np.concatenate([kept, rest[original[rest] < 0]])
+    return original
+
+
+def select_pages(
+    analysis: PageAnalysis,
+    skip_blank: bool = False,
+    near_duplicates: Optional[str] = None,
+    blank_coverage: float = DEFAULT_BLANK_COVERAGE,
+    duplicate_difference: float = DEFAULT_DUPLICATE_DIFFERENCE,
+) -> Tuple[List[int], int, int]:
+    """
+    Source pages to keep after dropping blank pages and near-duplicates
+
+    Args:
+        analysis: Result of analyze_pages
+        skip_blank: Drop pages with less ink than blank_coverage
+        near_duplicates: None keeps them, "skip" drops every page that nearly duplicates
+            any earlier page, "collapse" only drops pages nearly duplicating the page right
+            before them
+        blank_coverage: Ink fraction below which a page is blank; a page number or a short
+            "intentionally left blank" notice stays below the default
+        duplicate_difference: Largest fraction of differing ink pixels for near-duplicates
+
+    Returns:
+        (kept page indices, blank pages dropped, near-duplicates dropped)
+    """
+    if near_duplicates not in NEAR_DUPLICATE_MODES:
+        raise ValueError(f"Unknown near-duplicate handling: {near_duplicates}")
+    keep = np.ones(len(analysis.coverage), dtype=bool)
+    blank_dropped = duplicates_dropped = 0
+    if skip_blank:
+        keep = analysis.coverage >= blank_coverage
+        blank_dropped = int((~keep).sum())
+
+    if near_duplicates is not None:
+        candidates = np.flatnonzero(keep)
+        original = near_duplicate_of(PageAnalysis(*(array[candidates] for array in analysis)),
+                                     duplicate_difference, consecutive=near_duplicates == "collapse")
+        keep[candidates[original >= 0]] = False
+        duplicates_dropped = int((original >= 0).sum())
+    return np.flatnonzero(keep).tolist(), blank_dropped, duplicates_dropped
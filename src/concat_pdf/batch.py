@@ -0,0 +1,196 @@
+"""Batch mode - process many PDF files with one long-lived process pool"""
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import add_layout_arguments, layout_options
+
+
+def collect_inputs(sources: Sequence[str]) -> List[Path]:
+    """
+    Expand directories and glob patterns to a sorted list of unique PDF files
+
+    Args:
+        sources: Directories (searched for *.pdf, not recursively), glob patterns or file paths
+    """
+    found = set()
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            matches = [str(p) for p in path.iterdir() if p.suffix.lower() == ".pdf"]
+        else:
+            matches = glob.glob(source, recursive=True)
+        for match in matches:
+            if Path(match).is_file():
+                found.add(Path(match).resolve())
+    return sorted(found)
+
+
+def output_path_for(input_path: Path, out_dir: Path, suffix: str) -> Path:
+    """Output file path for an input, named like the GUI default"""
+    return out_dir / f"{input_path.stem}{suffix}.pdf"
+
+
+def output_paths(inputs: Sequence[Path], out_dir: Path, suffix: str) -> Dict[Path, Path]:
+    """
+    Output file path of every input, unique even if inputs share a file name
+
+    Inputs whose names collide (a/doc.pdf and b/doc.pdf, or Doc.pdf and doc.pdf on a
+    case-insensitive file system) are prefixed with their directories below the deepest
+    directory they share: a_doc_thumbnails.pdf and b_doc_thumbnails.pdf.
+    """
+    by_name: Dict[str, List[Path]] = {}
+    for input_path in inputs:
+        by_name.setdefault(output_path_for(input_path, out_dir, suffix).name.casefold(),
+                           []).append(input_path)
+
+    outputs = {}
+    for group in by_name.values():
+        if len(group) == 1:
+            outputs[group[0]] = output_path_for(group[0], out_dir, suffix)
+            continue
+        common = Path(os.path.commonpath([input_path.resolve().parent for input_path in group]))
+        for input_path in group:
+            relative = input_path.resolve().parent.relative_to(common)
+            outputs[input_path] = out_dir / "_".join(relative.parts + (f"{input_path.stem}{suffix}.pdf",))
+
+    names: Dict[str, Path] = {}
+    for input_path, output_path in outputs.items():
+        other = names.setdefault(output_path.name.casefold(), input_path)
+        if other != input_path:
+            raise ValueError(f"{other} and {input_path} would both be written to {output_path}")
+    return outputs
+
+
+def is_up_to_date(input_path: Path, output_path: Path) -> bool:
+    """True if the output exists and is not older than its input"""
+    try:
+        return output_path.stat().st_mtime >= input_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _process_one(input_path: Path, output_path: Path, options: dict) -> Tuple[float, Optional[str]]:
+    """Worker: process a single file, returning (seconds, error message or None)"""
+    start = time.perf_counter()
+    # Write next to the final name and rename, so an interrupted run never leaves
+    # a truncated output that looks up to date. Incremental mode does the same itself,
+    # and needs the final name to find the previous output and its manifest
+    incremental = options.get("incremental", False)
+    tmp_path = output_path.with_name(output_path.name + ".part")
+    try:
+        from .core import process_pdf
+        process_pdf(input_path=input_path, output_path=output_path if incremental else tmp_path,
+                    **options)
+        if not incremental:
+            os.replace(tmp_path, output_path)
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        return time.perf_counter() - start, str(e)
+    return time.perf_counter() - start, None
+
+
+def run_batch(
+    inputs: Sequence[Path],
+    out_dir: Path,
+    jobs: Optional[int] = None,
+    suffix: str = "_thumbnails",
+    force: bool = False,
+    **options,
+) -> List[Tuple[Path, str, float]]:
+    """
+    Process many PDF files through one shared process pool
+
+    Largest files are submitted first so a big file never starts last and holds up the
+    whole batch. Outputs newer than their input are skipped unless force is set. Inputs
+    sharing a file name get unique output names (see output_paths).
+
+    Args:
+        inputs: Input PDF file paths
+        out_dir: Directory receiving the output files
+        jobs: Number of worker processes (default: number of CPUs)
+        suffix: Appended to the input file name stem to form the output name
+        force: Regenerate outputs even if they are up to date
+        **options: Keyword arguments for process_pdf
+
+    Returns:
+        One (input path, status, seconds) tuple per input, status is "done", "skipped"
+        or "failed: <reason>"
+    """
+    outputs = output_paths(inputs, out_dir, suffix)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    pending = []
+    for input_path, output_path in outputs.items():
+        if not force and is_up_to_date(input_path, output_path):
+            results.append((input_path, "skipped", 0.0))
+        else:
+            pending.append((input_path, output_path))
+
+    # Largest first to cut tail latency
+    pending.sort(key=lambda item: item[0].stat().st_size, reverse=True)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(_process_one, input_path, output_path, options): input_path
+                for input_path, output_path in pending
+            }
+            for future in as_completed(futures):
+                input_path = futures[future]
+                seconds, error = future.result()
+                status = "done" if error is None else f"failed: {error}"
+                print(f"[{len(results) + 1}/{len(inputs)}] {input_path.name}: {status} ({seconds:.2f}s)")
+                results.append((input_path, status, seconds))
+
+    return results
+
+
+def print_summary(results: Sequence[Tuple[Path, str, float]], wall_time: float) -> None:
+    """Print per-file timings, slowest first"""
+    print()
+    print(f"{'Seconds':>9}  {'Status':<8}  File")
+    for input_path, status, seconds in sorted(results, key=lambda r: r[2], reverse=True):
+        print(f"{seconds:>9.2f}  {status.split(':')[0]:<8}  {input_path}")
+
+    done = sum(1 for r in results if r[1] == "done")
+    skipped = sum(1 for r in results if r[1] == "skipped")
+    failed = len(results) - done - skipped
+    print(f"\n{done} done, {skipped} skipped, {failed} failed in {wall_time:.2f}s")
+
+
+def batch_main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="concat_pdf batch",
+        description="PDF Thumbnail Grid Tool - Process many PDF files with a shared worker pool",
+    )
+    parser.add_argument("sources", nargs="+", help="Input directories, glob patterns or PDF files")
+    parser.add_argument("--out-dir", type=Path, required=True, help="Output directory")
+    add_layout_arguments(parser)
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                       help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--suffix", type=str, default="_thumbnails",
+                       help="Output file name suffix (default: _thumbnails)")
+    parser.add_argument("--force", action="store_true", help="Regenerate up-to-date outputs")
+
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.sources)
+    if not inputs:
+        parser.error("no PDF files found")
+
+    start = time.perf_counter()
+    try:
+        results = run_batch(inputs, args.out_dir, jobs=args.jobs, suffix=args.suffix,
+                            force=args.force, **layout_options(args))
+    except ValueError as e:
+        parser.error(str(e))
+    print_summary(results, time.perf_counter() - start)
+
+    return 1 if any(status.startswith("failed") for _, status, _ in results) else 0
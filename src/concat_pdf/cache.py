@@ -0,0 +1,171 @@
+"""Persistent on-disk cache of rendered page thumbnails"""
+
+import hashlib
+import itertools
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+# Bump when the rendering output changes, so stale thumbnails are never reused
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024  # 1 GiB
+
+
+def default_cache_dir() -> Path:
+    """Per-user cache directory"""
+    if sys.platform == 'win32':
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "concat_pdf"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write data to path so readers (or other processes) never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class ThumbnailCache:
+    """
+    Content-addressed store of encoded page images with LRU eviction
+
+    Entries are keyed by the SHA-256 of the source file, the page index and the render
+    settings, so moving or renaming a file keeps its thumbnails valid while any change
+    to its content invalidates them. Access time is tracked through the entry mtime,
+    and the least recently used entries are deleted once the cache exceeds max_bytes.
+
+    Instances are picklable, worker processes can share one cache directory.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # Bytes on disk, scanned on first write
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / "thumbs" / key[:2] / f"{key}.bin"
+
+    def file_digest(self, path: Path) -> str:
+        """
+        SHA-256 of a file's content
+
+        Digests are remembered per (path, size, mtime), so unchanged files are hashed once;
+        the remembered digests count towards max_bytes and are evicted like thumbnails.
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        stamp = f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")
+        stamp_path = self.directory / "digests" / f"{hashlib.sha256(stamp).hexdigest()}.txt"
+
+        try:
+            result = stamp_path.read_text(encoding="ascii")
+        except OSError:
+            pass
+        else:
+            try:
+                os.utime(stamp_path)
+            except OSError:
+                pass
+            return result
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        result = digest.hexdigest()
+        self._add(stamp_path, result.encode("ascii"))
+        return result
+
+    @staticmethod
+    def make_key(source_digest: str, page_index: int, *settings) -> str:
+        """Cache key for one page rendered with the given settings"""
+        parts = [str(CACHE_VERSION), source_digest, str(page_index)] + [str(s) for s in settings]
+        return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached data for key, or None; a hit marks the entry as recently used"""
+        path = self._entry_path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store data under key, evicting old entries if the cache grows over budget"""
+        self._add(self._entry_path(key), data)
+
+    def _add(self, path: Path, data: bytes) -> None:
+        _write_atomic(path, data)
+        if self._size is None:
+            self._size = self.total_size()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.trim()
+
+    def _entries(self) -> list:
+        entries = []
+        paths = itertools.chain((self.directory / "thumbs").glob("*/*.bin"),
+                                (self.directory / "digests").glob("*.txt"))
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Evicted by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def total_size(self) -> int:
+        """Bytes used by cached thumbnails and file digests"""
+        return sum(size for _, size, _ in self._entries())
+
+    def trim(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Delete least recently used entries until the cache fits in max_bytes
+
+        Evicts down to 90% of the budget, so a cache at its limit is not rescanned on
+        every write. Returns the number of deleted entries.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        target = int(max_bytes * 0.9)
+
+        entries = self._entries()
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+        for _, entry_size, path in sorted(entries):
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            removed += 1
+
+        self._size = size
+        return removed
+
+    def clear(self) -> None:
+        """Delete all cached thumbnails and file digests"""
+        self.trim(0)
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
@@ -0,0 +1,425 @@
+"""PDF processing - the grid generation pipeline behind process_pdf"""
+
+import io
+import math
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+import fitz
+
+from .analysis import analyze_pages, select_pages
+from .cache import ThumbnailCache
+from .dedup import canonical_pages, page_fingerprints
+from .images import ImageDownsampler
+from .incremental import build_manifest, load_manifest, render_incremental, reusable_pages, write_manifest
+from .layout import compute_layout, page_sizes, to_page_cells
+from .metadata import MetadataIndex
+from .multi import DocumentSet
+from .options import (DEFAULT_BLANK_COVERAGE, DEFAULT_BORDER_COLOR, DEFAULT_BORDER_WIDTH,
+                      DEFAULT_DUPLICATE_DIFFERENCE, DEFAULT_MAX_OPEN, IMAGE_FORMATS,
+                      NEAR_DUPLICATE_MODES, RENDER_MODES)
+from .parallel import render_parallel
+from .profiling import Profiler, profile_stage
+from .progress import CancelToken, PageCallback, ProgressCallback, ProgressTracker
+from .saving import DEFAULT_SAVE_PROFILE, save_document
+from .sheets import is_sheet_output, render_sheets
+from .sources import Source, Target, buffer_digest, is_path, source_buffer, source_name
+from .streaming import render_streaming
+from .render import parse_color, render_pages
+from .selection import select_page_indices
+
+
+def calculate_grid_size(total_pages: int, n: int, m: Optional[int] = None) -> Tuple[int, int]:
+    """Calculate grid size"""
+    if m is None:
+        m = math.ceil(total_pages / n)
+    return n, m
+
+
+def process_pdf(
+    input_path: Union[Source, Sequence[Path]],
+    output_path: Optional[Target],
+    n: int,
+    m: Optional[int] = None,
+    page_size: Optional[Tuple[float, float]] = None,  # None means auto-calculate
+    orientation: str = "landscape",  # Default landscape for better multi-page display
+    dpi: int = 150,
+    gap: float = 3,  # Spacing between thumbnails (points), smaller to save space
+    padding: float = 10,  # Page margins
+    render_mode: str = "vector",  # "vector" embeds source pages, "raster" embeds rendered images
+    image_format: str = "jpeg",  # Image encoding for raster mode
+    image_quality: int = 85,  # JPEG quality for raster mode
+    workers: int = 1,  # Number of worker processes, 1 renders in this process
+    cache: Optional[ThumbnailCache] = None,  # Rendered thumbnail cache for raster mode
+    stream_batch: Optional[int] = None,  # Write output in batches of this many pages
+    save_profile: str = DEFAULT_SAVE_PROFILE,  # Cleanup/compression effort of the final save
+    progress: Optional[ProgressCallback] = None,  # Called with (pages done, total pages)
+    cancel: Optional[CancelToken] = None,  # e.g. threading.Event, checked between cells
+    dedup_pages: bool = False,  # Share one XObject/image between identical source pages
+    pack_rows: bool = False,  # Justified rows for documents with mixed page shapes
+    profiler: Optional[Profiler] = None,  # Collects stage timings and counters
+    tile_size: Optional[int] = None,  # Split image output into tiles of this many pixels
+    incremental: bool = False,  # Reuse unchanged pages of the previous output
+    max_open_documents: int = DEFAULT_MAX_OPEN,  # Input files open at once (several inputs)
+    border: bool = True,  # Outline every thumbnail
+    border_width: float = DEFAULT_BORDER_WIDTH,  # Border line width (points)
+    border_color: Union[str, Sequence[float]] = DEFAULT_BORDER_COLOR,  # Name, "#rrggbb" or RGB
+    skip_blank: bool = False,  # Leave out pages without ink
+    near_duplicates: Optional[str] = None,  # "skip" or "collapse" near-identical pages
+    blank_coverage: float = DEFAULT_BLANK_COVERAGE,  # Ink fraction below which a page is blank
+    duplicate_difference: float = DEFAULT_DUPLICATE_DIFFERENCE,  # Near-duplicate tolerance
+    page_ranges: Optional[str] = None,  # e.g. "1-50,100,200-", None means all pages
+    page_stride: int = 1,  # Keep every k-th selected page
+    sample_pages: Optional[int] = None,  # Keep this many evenly spaced pages
+    page_callback: Optional[PageCallback] = None,  # Called with every finished output page
+    downsample_images: bool = False,  # Shrink embedded images to dpi (vector mode)
+    metadata: Optional[MetadataIndex] = None,  # Page count and size index, None for this call only
+) -> None:
+    """
+    Process PDF file to generate N×M grid merged thumbnail PDF
+
+    Args:
+        input_path: Input PDF file path, or the PDF itself as bytes, bytearray, memoryview,
+            mmap or a binary file object (opened in place where possible, see
+            sources.source_buffer); in-memory input is rendered in a single process.
+            A list or tuple of file paths concatenates their pages into one grid without
+            merging them first (see multi.expand_inputs for globs and list files)
+        output_path: Output PDF file path, or a writable binary file object receiving the
+            PDF; a .png, .jpg/.jpeg or .webp path writes the grid pages as images at dpi
+            instead, one file per grid page (see sheets.sheet_paths). None saves nothing,
+            for callers that only want the pages passed to page_callback
+        n: Number of grid columns
+        m: Number of grid rows (optional, auto-calculated if not provided)
+        page_size: Output PDF page size (width, height) in points, None means auto-calculate
+        orientation: Page orientation "portrait" or "landscape"
+        dpi: Thumbnail DPI (source pages are rendered at this resolution in raster mode)
+        gap: Spacing between thumbnails (points)
+        padding: Page margins (points)
+        render_mode: "vector" (show_pdf_page, default) or "raster" (compressed page images)
+        image_format: Raster image encoding, "jpeg", "png" or "bilevel"
+        image_quality: JPEG quality (1-100) for raster mode
+        workers: Worker processes; output pages are split into chunks rendered in parallel
+        cache: Thumbnail cache, lets raster mode reuse pages rendered by earlier runs
+        stream_batch: Output pages per batch in streaming mode, which keeps memory bounded
+            by saving batches incrementally; None builds the whole output in memory
+        save_profile: "fast", "balanced", "standard" (default) or "smallest", see SAVE_PROFILES
+        progress: Callback receiving (done, total) source pages as cells are placed
+        cancel: Cancellation token with an is_set() method; once set, processing stops
+            at the next cell, no output file is left behind and ProcessingCancelled is raised
+        dedup_pages: Detect byte-identical source pages (blank separators, boilerplate,
+            repeated cover sheets) and embed their content only once
+        pack_rows: Give the pages of a row a common height and let each take the width it
+            needs, so landscape and portrait pages share rows without wasted space
+        profiler: Records per-stage durations, per-source-page cost and counters such as
+            XObjects created and bytes written, see profiling.Profiler
+        tile_size: Image output only, write every grid page as tiles of at most
+            tile_size × tile_size pixels, so huge grids never have to fit in memory
+        incremental: Copy output pages whose cells and source pages are unchanged from the
+            previous output (output.pdf.manifest.json), render only the others; needs a fixed m
+        max_open_documents: With several input files, how many are kept open at the same
+            time; the others are opened when their pages are drawn
+        border: Draw a border around every thumbnail; the borders of an output page are
+            drawn together as one shape (see render.draw_borders)
+        border_width: Border line width in points
+        border_color: Border color, a name such as "black" or "gray50", "#rrggbb" or RGB
+            components from 0 to 1
+        skip_blank: Leave blank pages (blank scan backs, separator sheets) out of the grid.
+            An analysis pass renders every page at 128 x 128 pixels first, see
+            analysis.analyze_pages; with a cache its results are kept per document
+        near_duplicates: "skip" leaves out pages that look nearly the same as an earlier
+            page (repeated forms, reprinted cover sheets), "collapse" only pages that look
+            like the page right before them; None keeps them
+        blank_coverage: Fraction of the page covered by ink below which it counts as blank
+        duplicate_difference: Largest fraction of differing ink pixels for two pages to
+            count as near-duplicates
+        page_ranges: Pages to include, numbered from 1: "1-50,100,200-" ("200-" runs to
+            the last page); with several inputs the numbers run through all files
+        page_stride: Keep every page_stride-th page of the selection, starting with the first
+        sample_pages: Keep this many evenly spaced pages of the selection (first and last
+            included), for a quick overview of a huge document. Pages that are not
+            selected are never loaded, so the time taken follows the number of pages shown
+        page_callback: Called with (output page number, the page as a one-page PDF) as soon
+            as each output page is complete, in order, so callers can start uploading or
+            displaying pages before the document is done; PDF output only
+        downsample_images: Vector mode only, resample embedded images much sharper than dpi
+            at their cell size down to dpi, see images.ImageDownsampler
+        metadata: Page count and size index (see metadata.MetadataIndex), None keeps one in
+            memory for this call; default_metadata_index() shares the user's stored index
+    """
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render_mode}")
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {image_format}")
+    if border_width < 0:
+        raise ValueError(f"Border width must not be negative: {border_width}")
+    border_width = border_width if border else 0
+    border_color = parse_color(border_color)
+    if near_duplicates not in NEAR_DUPLICATE_MODES:
+        raise ValueError(f"Unknown near-duplicate handling: {near_duplicates}")
+    output_is_path = is_path(output_path)
+    sheet_output = output_is_path and is_sheet_output(output_path)
+    if not output_is_path and (stream_batch is not None or incremental):
+        raise ValueError("Streaming and incremental mode need an output file path")
+    if sheet_output and stream_batch is not None:
+        raise ValueError("Streaming output is not supported for image output")
+    if incremental and (sheet_output or stream_batch is not None):
+        raise ValueError("Incremental mode needs PDF output without streaming")
+    if page_callback is not None and sheet_output:
+        raise ValueError("Page callbacks are not supported for image output")
+    if metadata is None:
+        metadata = MetadataIndex()
+    # With a page selection, files that are not indexed yet are not scanned page by page
+    selecting = page_ranges is not None or page_stride != 1 or sample_pages is not None
+
+    with profiler.session() if profiler is not None else nullcontext():
+        # Open input PDF
+        with profile_stage(profiler, "open"):
+            source = None
+            if isinstance(input_path, (list, tuple)):
+                # Workers receive the DocumentSet itself, it pickles as its file list
+                doc = input_path = DocumentSet(input_path, max_open_documents,
+                                               metadata.page_counts(input_path, scan=not selecting))
+                print(f"Inputs: {len(doc.paths)} files, {len(doc)} pages")
+            elif is_path(input_path):
+                doc = fitz.open(input_path)
+            else:
+                source = source_buffer(input_path)
+                doc = fitz.open(stream=source, filetype="pdf")
+            total_pages = len(doc)
+        output_doc = old_doc = None
+        try:
+            if total_pages == 0:
+                name = "all input files" if isinstance(doc, DocumentSet) else source_name(input_path)
+                raise ValueError(f"Input PDF has no pages: {name}")
+            if source is not None and workers > 1:
+                # Worker processes open the input by path
+                print("In-memory input is rendered in a single process")
+                workers = 1
+
+            source_digest = None
+            if cache is not None and (render_mode == "raster" or skip_blank or near_duplicates):
+                if isinstance(doc, DocumentSet):
+                    source_digest = tuple(cache.file_digest(path) for path in doc.paths)
+                elif source is None:
+                    source_digest = cache.file_digest(input_path)
+                else:
+                    source_digest = buffer_digest(source)
+
+            # Source pages to place, all of them unless a selection or the analysis leaves some out
+            pages = select_page_indices(total_pages, page_ranges, page_stride, sample_pages)
+
+            # Page sizes of files seen before; otherwise all pages are scanned once and indexed,
+            # unless only a selection of them is going to be loaded
+            known_sizes = None
+            with profile_stage(profiler, "layout"):
+                if isinstance(doc, DocumentSet):
+                    if pages is None:
+                        known_sizes = [size for path in doc.paths for size in metadata.info(path).sizes]
+                    else:
+                        infos = [metadata.lookup(path) for path in doc.paths]
+                        if all(info is not None for info in infos):
+                            known_sizes = [size for info in infos for size in info.sizes]
+                elif source is None:
+                    info = (metadata.info(input_path, doc) if pages is None
+                            else metadata.lookup(input_path))
+                    if info is not None:
+                        known_sizes = info.sizes
+            if pages is not None:
+                print(f"Page selection: {len(pages)} of {total_pages} pages")
+            left_out = None  # (blank, near-duplicate, considered pages) when analyzed
+            if skip_blank or near_duplicates:
+                with profile_stage(profiler, "analyze"):
+                    analysis = analyze_pages(doc, cache, source_digest, pages)
+                    kept, blank, similar = select_pages(analysis, skip_blank, near_duplicates,
+                                                        blank_coverage, duplicate_difference)
+                # The analysis covers the selected pages only, map back to source pages
+                considered = total_pages if pages is None else len(pages)
+                pages = kept if pages is None else [pages[idx] for idx in kept]
+                left_out = (blank, similar, considered)
+                if not pages:
+                    raise ValueError("No pages left after leaving out blank and near-duplicate pages")
+            placed_pages = total_pages if pages is None else len(pages)
+
+            # Calculate grid size
+            n, m = calculate_grid_size(placed_pages, n, m)
+
+            # Lay out all pages at once, page sizes can be mixed
+            if page_size is not None:
+                print(f"Using specified page size: {page_size}")
+                # Adjust page orientation
+                if orientation == "landscape":
+                    page_size = (page_size[1], page_size[0])
+
+            with profile_stage(profiler, "layout"):
+                sizes = page_sizes(doc, pages, known_sizes)
+                layout = compute_layout(sizes, n, m, page_size, gap, padding, pack_rows)
+                page_cells = to_page_cells(layout, pages)
+            output_pages = layout.output_pages
+            if left_out is not None:
+                # Counted from the cells that are drawn, in the PDF and in image output alike
+                blank, similar, considered = left_out
+                shown = len({page for cells in page_cells for page, _ in cells})
+                print(f"Page analysis: {blank} blank and {similar} near-duplicate pages left out, "
+                      f"{shown} of {considered} shown")
+
+            if page_size is None:
+                page_width, page_height = layout.page_size
+                print(f"Auto-calculated page size: {page_width:.2f} x {page_height:.2f} points")
+                print(f"In inches: {page_width/72:.2f} x {page_height/72:.2f} inches")
+            page_size = layout.page_size
+
+            render_options = dict(
+                render_mode=render_mode,
+                dpi=dpi,
+                image_format=image_format,
+                image_quality=image_quality,
+                border_width=border_width,
+                border_color=border_color,
+            )
+            fingerprints = None
+            if dedup_pages or incremental:
+                with profile_stage(profiler, "fingerprint"):
+                    fingerprints = page_fingerprints(doc, pages)
+            if dedup_pages:
+                with profile_stage(profiler, "dedup"):
+                    canonical = canonical_pages(doc, fingerprints)
+                duplicates = sum(1 for idx, first in enumerate(canonical) if idx != first)
+                print(f"Duplicate pages: {duplicates} of {placed_pages} share content with an earlier page")
+                if duplicates:
+                    render_options["canonical"] = canonical
+
+            if cache is not None and render_mode == "raster":
+                render_options["cache"] = cache
+                render_options["source_digest"] = source_digest
+                hits, misses = cache.hits, cache.misses
+
+            downsampler = None
+            if downsample_images and render_mode == "vector" and not sheet_output:
+                downsampler = ImageDownsampler(dpi, image_quality)
+                if page_callback is not None:
+                    # Pages are handed out before the whole output is downsampled
+                    page_callback = _downsampled_pages(page_callback, downsampler)
+
+            tracker = None
+            if progress is not None or cancel is not None or page_callback is not None:
+                tracker = ProgressTracker(placed_pages, progress, cancel, page_callback)
+
+            if sheet_output:
+                # Pages are rendered straight into image buffers, render mode and save profile
+                # do not apply
+                if workers > 1:
+                    print("Image output is rendered in a single process")
+                paths = render_sheets(doc, output_path, page_size, page_cells, dpi, image_quality,
+                                      tile_size, tracker, profiler, border_width, border_color)
+                print(f"Wrote {len(paths)} image file(s)")
+            elif stream_batch is not None:
+                render_streaming(output_path, doc, input_path, page_size, page_cells, render_options,
+                                 stream_batch, workers, save_profile, tracker, profiler, downsampler)
+            else:
+                # Create output PDF
+                output_doc = fitz.open()
+
+                # Settings that change how pages look, a change invalidates the previous output
+                settings = dict(render_mode=render_mode, dpi=dpi, image_format=image_format,
+                                image_quality=image_quality, dedup_pages=dedup_pages,
+                                save_profile=save_profile, border_width=border_width,
+                                border_color=list(border_color),
+                                downsample_images=downsampler is not None)
+                old_doc = None
+                if incremental:
+                    reusable = reusable_pages(load_manifest(output_path), settings, fingerprints,
+                                              page_size, page_cells)
+                    print(f"Incremental: reusing {sum(reusable)} of {output_pages} output pages")
+                    if any(reusable):
+                        old_doc = fitz.open(output_path)
+
+                with profile_stage(profiler, "render"):
+                    if old_doc is not None:
+                        render_incremental(output_doc, old_doc, doc, input_path, page_size, page_cells,
+                                           reusable, render_options, workers, tracker, profiler)
+                    elif workers > 1 and output_pages > 1:
+                        render_parallel(output_doc, input_path, page_size, page_cells, render_options,
+                                        workers, tracker=tracker, profiler=profiler)
+                    else:
+                        render_pages(output_doc, doc, page_size, page_cells, tracker=tracker,
+                                     profiler=profiler, **render_options)
+
+                if downsampler is not None:
+                    with profile_stage(profiler, "downsample"):
+                        replaced = downsampler.downsample(output_doc)
+                    print(f"Downsampled {replaced} image(s) to {dpi} DPI")
+                    if profiler is not None:
+                        profiler.count("images_downsampled", replaced)
+
+                # Save output PDF
+                if profiler is not None:
+                    profiler.count("pdf_objects", output_doc.xref_length() - 1)
+                with profile_stage(profiler, "save"):
+                    if output_path is None:
+                        # The pages have been handed to page_callback
+                        size = 0
+                    elif not incremental:
+                        size = save_document(output_doc, output_path, save_profile, dpi)
+                    else:
+                        # The previous output may still be open; write next to it and swap, so
+                        # an interrupted run never leaves a truncated output behind
+                        tmp_path = Path(output_path).with_name(Path(output_path).name + ".part")
+                        try:
+                            # Mostly copied pages are already merged, skip merging them again
+                            size = save_document(output_doc, tmp_path, save_profile, dpi,
+                                                 merged=2 * sum(reusable) >= output_pages)
+                            if old_doc is not None:
+                                old_doc.close()
+                            os.replace(tmp_path, output_path)
+                        except BaseException:
+                            Path(tmp_path).unlink(missing_ok=True)
+                            raise
+                output_doc.close()
+                if profiler is not None:
+                    profiler.count("bytes_written", size)
+
+                if incremental:
+                    write_manifest(output_path, build_manifest(output_path, settings, fingerprints,
+                                                               page_size, page_cells))
+
+            if "cache" in render_options:
+                print(f"Thumbnail cache: {cache.hits - hits} hits, {cache.misses - misses} misses")
+                if profiler is not None:
+                    profiler.count("cache_hits", cache.hits - hits)
+                    profiler.count("cache_misses", cache.misses - misses)
+            if profiler is not None:
+                profiler.count("source_pages", placed_pages)
+                profiler.count("output_pages", output_pages)
+                if stream_batch is not None:
+                    profiler.count("bytes_written", Path(output_path).stat().st_size)
+        finally:
+            # Documents still open when rendering failed or was cancelled
+            for opened in (old_doc, output_doc):
+                if opened is not None and not opened.is_closed:
+                    opened.close()
+            doc.close()
+
+
+def _downsampled_pages(page_callback: PageCallback, downsampler: ImageDownsampler) -> PageCallback:
+    """Wrap a page callback so that it receives pages with downsampled images"""
+    def callback(number: int, pdf: bytes) -> None:
+        page_callback(number, downsampler.downsample_pdf(pdf))
+    return callback
+
+
+def process_pdf_bytes(data: Source, n: int, **options) -> bytes:
+    """
+    Build the grid PDF in memory
+
+    Args:
+        data: Input PDF as bytes, a buffer or a binary file object (or a file path)
+        n: Number of grid columns
+        options: Further process_pdf keyword arguments
+
+    Returns the output PDF.
+    """
+    output = io.BytesIO()
+    process_pdf(data, output, n, **options)
+    return output.getvalue()
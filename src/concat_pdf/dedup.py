@@ -0,0 +1,119 @@
+"""Detection of source pages with identical content"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Sequence
+
+import fitz
+
+from .multi import DocumentSet
+
+# Indirect object reference, e.g. "12 0 R"
+_REFERENCE = re.compile(rb"(\d+) (\d+) R")
+
+
+class _ObjectHasher:
+    """
+    Hashes PDF objects by value rather than by object number
+
+    References are replaced by the hash of the object they point to, so two pages that
+    use separate but byte-identical copies of a font or image hash the same. Results are
+    memoised per xref, shared resources are hashed once per document.
+    """
+
+    def __init__(self, doc: fitz.Document):
+        self.doc = doc
+        self.memo: Dict[int, bytes] = {}
+
+    def _resolve_references(self, source: bytes) -> bytes:
+        return _REFERENCE.sub(lambda match: self.hash_xref(int(match.group(1))).hex().encode(),
+                              source)
+
+    def hash_xref(self, xref: int) -> bytes:
+        if xref in self.memo:
+            return self.memo[xref]
+        # Break reference cycles, objects on the current path hash by number
+        self.memo[xref] = f"xref{xref}".encode()
+
+        digest = hashlib.sha256()
+        digest.update(self._resolve_references(
+            self.doc.xref_object(xref, compressed=True).encode("latin-1")))
+        if self.doc.xref_is_stream(xref):
+            # Raw (still encoded) data, decoding is not needed to compare streams
+            digest.update(self.doc.xref_stream_raw(xref) or b"")
+
+        self.memo[xref] = digest.digest()
+        return self.memo[xref]
+
+    def hash_value(self, value_type: str, value: str) -> bytes:
+        """Hash a value as returned by Document.xref_get_key"""
+        if value_type == "xref":
+            return self.hash_xref(int(value.split()[0]))
+        return hashlib.sha256(self._resolve_references(value.encode("latin-1"))).digest()
+
+
+def _inherited_key(doc: fitz.Document, xref: int, key: str):
+    """Look up a page key, following /Parent for inheritable keys like /Resources"""
+    while xref:
+        value_type, value = doc.xref_get_key(xref, key)
+        if value_type != "null":
+            return value_type, value
+        parent_type, parent = doc.xref_get_key(xref, "Parent")
+        xref = int(parent.split()[0]) if parent_type == "xref" else 0
+    return "null", "null"
+
+
+def page_fingerprints(doc: fitz.Document, pages: Optional[Sequence[int]] = None) -> List[str]:
+    """
+    Content fingerprint of every page
+
+    Pages with equal fingerprints have the same geometry, rotation, content streams and
+    (recursively) the same resources, so they render identically. For a DocumentSet,
+    pages are compared across files too.
+
+    Args:
+        doc: Source document or DocumentSet
+        pages: Only fingerprint these pages (ascending), the others get an empty string
+    """
+    if isinstance(doc, DocumentSet):
+        if pages is None:
+            return [fingerprint for part in doc.documents()
+                    for fingerprint in page_fingerprints(part)]
+        # Files without selected pages are not opened
+        fingerprints = []
+        for number, local in enumerate(doc.pages_by_file(pages)):
+            fingerprints.extend(page_fingerprints(doc.document(number), local) if local
+                                else [""] * doc.page_counts[number])
+        return fingerprints
+
+    hasher = _ObjectHasher(doc)
+    fingerprints = [""] * len(doc)
+    for pno in range(len(doc)) if pages is None else pages:
+        page = doc[pno]
+        digest = hashlib.sha256()
+        digest.update(f"{tuple(page.mediabox)}|{tuple(page.cropbox)}|{page.rotation}".encode())
+        for xref in page.get_contents():
+            digest.update(hasher.hash_xref(xref))
+        digest.update(hasher.hash_value(*_inherited_key(doc, page.xref, "Resources")))
+        fingerprints[pno] = digest.hexdigest()
+    return fingerprints
+
+
+def canonical_pages(doc: fitz.Document, fingerprints: Optional[List[str]] = None) -> List[int]:
+    """
+    Map every page to the first page with identical content
+
+    Returns a list where entry i is the index of the first page identical to page i
+    (i itself for unique pages and pages without a fingerprint). Drawing the canonical
+    page instead of the original lets all copies share one Form XObject and one rendered
+    image in the output.
+
+    Args:
+        doc: Source document
+        fingerprints: Result of page_fingerprints(doc), if already computed
+    """
+    if fingerprints is None:
+        fingerprints = page_fingerprints(doc)
+    first_seen: Dict[str, int] = {}
+    return [first_seen.setdefault(fingerprint, idx) if fingerprint else idx
+            for idx, fingerprint in enumerate(fingerprints)]
@@ -0,0 +1,304 @@
+"""Image downsampling - shrink embedded images to the resolution they are shown at"""
+
+import hashlib
+import io
+import math
+import re
+import zlib
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import fitz
+from PIL import Image
+
+# Images are only resampled once they are this many times sharper than needed, so images
+# slightly above the target are not recompressed for little gain
+DOWNSAMPLE_THRESHOLD = 1.5
+
+# Content stream tokens: comments, strings (one level of nested parentheses), hex strings,
+# dictionary brackets, names, and numbers or operators
+_TOKEN = re.compile(rb"""
+    %[^\r\n]*
+  | \((?:[^()\\]|\\.|\((?:[^()\\]|\\.)*\))*\)
+  | <<|>>|<[0-9A-Fa-f\s]*>
+  | /[^\s/\[\]()<>{}%]*
+  | [^\s/\[\]()<>{}%]+
+  | [\[\]{}]
+""", re.VERBOSE | re.DOTALL)
+# End of inline image data
+_INLINE_END = re.compile(rb"\sEI(?=[\s/\[\]()<>{}%]|$)")
+# "/Name 12 0 R" entries of a resource dictionary
+_REFERENCE = re.compile(r"/([^\s/\[\]()<>{}%]+)\s*(\d+)\s+\d+\s+R")
+_NUMBER = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)$")
+
+# Color spaces a resampled image keeps, others (Indexed) are replaced by a device color space
+_KEPT_COLORSPACES = ("/DeviceGray", "/DeviceRGB", "/DeviceCMYK", "/ICCBased", "/CalGray", "/CalRGB")
+_DEVICE_COLORSPACES = {1: (fitz.csGRAY, "/DeviceGray"), 3: (fitz.csRGB, "/DeviceRGB"),
+                       4: (fitz.csCMYK, "/DeviceCMYK")}
+_JPEG_MODES = {"L": "/DeviceGray", "RGB": "/DeviceRGB"}
+
+Matrix = Tuple[float, float, float, float, float, float]
+
+
+class _Resampled(NamedTuple):
+    width: int
+    height: int
+    stream: bytes
+    jpeg: bool  # DCTDecode stream, otherwise FlateDecode
+    colorspace: Optional[str]  # Replacement color space, None keeps the image's own
+    smask: Optional[bytes]  # FlateDecode soft mask at the same size
+
+
+def _multiply(m1: Matrix, m2: Matrix) -> Matrix:
+    """m1 followed by m2, in PDF's row vector convention"""
+    a, b, c, d, e, f = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a * a2 + b * c2, a * b2 + b * d2, c * a2 + d * c2, c * b2 + d * d2,
+            e * a2 + f * c2 + e2, e * b2 + f * d2 + f2)
+
+
+def _xobjects(doc: fitz.Document, xref: int, inherited: Dict[str, int]) -> Dict[str, int]:
+    """XObject names of a page or form, mapped to their xrefs"""
+    kind, value = doc.xref_get_key(xref, "Resources")
+    if kind == "null":
+        return inherited  # Forms without resources use their page's
+    kind, value = doc.xref_get_key(xref, "Resources/XObject")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    elif kind != "dict":
+        return {}
+    return {name: int(ref) for name, ref in _REFERENCE.findall(value)}
+
+
+def _tokens(content: bytes) -> Iterator[bytes]:
+    """Content stream tokens, with inline image data skipped"""
+    pos = 0
+    while True:
+        for match in _TOKEN.finditer(content, pos):
+            token = match.group()
+            yield token
+            if token == b"ID":
+                end = _INLINE_END.search(content, match.end())
+                if end is None:
+                    return
+                pos = end.end()
+                break
+        else:
+            return
+
+
+def _placements(doc: fitz.Document, content: bytes, resources: Dict[str, int], ctm: Matrix,
+                forms: Dict[int, List[Tuple[int, Matrix]]],
+                depth: int = 0) -> Iterator[Tuple[int, Matrix]]:
+    """(image xref, image matrix) of every image drawn by a content stream, also inside forms"""
+    stack = []
+    operands = []
+    for token in _tokens(content):
+        if token[:1] == b"%":
+            continue
+        if _NUMBER.match(token) or (token[:1] in b"/(<[]{}" and token not in (b"<<", b">>")):
+            operands.append(token)
+            continue
+        if token == b"q":
+            stack.append(ctm)
+        elif token == b"Q":
+            if stack:
+                ctm = stack.pop()
+        elif token == b"cm" and len(operands) >= 6:
+            try:
+                ctm = _multiply(tuple(float(value) for value in operands[-6:]), ctm)
+            except ValueError:
+                pass
+        elif token == b"Do" and operands and operands[-1][:1] == b"/":
+            xref = resources.get(operands[-1][1:].decode("latin-1"))
+            subtype = doc.xref_get_key(xref, "Subtype")[1] if xref is not None else None
+            if subtype == "/Image":
+                yield xref, ctm
+            elif subtype == "/Form" and depth < 10:
+                if xref not in forms:
+                    forms[xref] = []  # Guards against forms that draw themselves
+                    forms[xref] = list(_placements(doc, doc.xref_stream(xref),
+                                                   _xobjects(doc, xref, resources),
+                                                   _form_matrix(doc, xref), forms, depth + 1))
+                for image, matrix in forms[xref]:
+                    yield image, _multiply(matrix, ctm)
+        operands = []
+
+
+def _form_matrix(doc: fitz.Document, xref: int) -> Matrix:
+    kind, value = doc.xref_get_key(xref, "Matrix")
+    if kind == "array":
+        try:
+            matrix = tuple(float(v) for v in value.strip("[]").split())
+            if len(matrix) == 6:
+                return matrix
+        except ValueError:
+            pass
+    return (1, 0, 0, 1, 0, 0)
+
+
+def _remove_keys(doc: fitz.Document, xref: int, names: Tuple[str, ...]) -> None:
+    for name in names:
+        if doc.xref_get_key(xref, name)[0] != "null":
+            doc.xref_set_key(xref, name, "null")
+
+
+class ImageDownsampler:
+    """
+    Downsamples embedded images that are shown much smaller than their resolution
+
+    In vector mode every source page is embedded with its images at their original
+    resolution, while a grid cell shows them only a few centimetres wide. downsample()
+    finds where each image of the output pages is drawn, and resamples images sharper
+    than DOWNSAMPLE_THRESHOLD times dpi at their largest placement down to dpi. Text and
+    vector graphics are not touched. JPEG and JPEG 2000 images are re-encoded as JPEG
+    (JPEG images are decoded at reduced size directly), others are stored losslessly.
+    1-bit images and stencil masks are left alone, they are small already.
+
+    The resampled images are remembered by the digest of their original data, so an
+    image is resampled once, also when it is copied into several documents (parallel
+    chunks, streaming batches, single pages handed to a page callback).
+
+    Args:
+        dpi: Resolution images are resampled to, at their largest placement
+        quality: JPEG quality (1-100) of re-encoded JPEG images
+    """
+
+    def __init__(self, dpi: int, quality: int = 85):
+        self.dpi = dpi
+        self.quality = quality
+        self._resampled: Dict[bytes, _Resampled] = {}
+
+    def downsample(self, doc: fitz.Document, start: int = 0, end: Optional[int] = None) -> int:
+        """
+        Downsample the images shown on pages start to end - 1 (default: all pages)
+
+        Returns the number of images replaced.
+        """
+        # Largest width and height (points) each image is shown at
+        shown: Dict[int, Tuple[float, float]] = {}
+        # Image placements inside each form, relative to the form
+        forms: Dict[int, List[Tuple[int, Matrix]]] = {}
+        for pno in range(start, len(doc) if end is None else end):
+            page = doc[pno]
+            if not page.get_images(full=True):
+                continue  # Cheap check, most text pages have no images
+            resources = _xobjects(doc, page.xref, {})
+            for xref, (a, b, c, d, _, _) in _placements(doc, page.read_contents(), resources,
+                                                        (1, 0, 0, 1, 0, 0), forms):
+                width, height = shown.get(xref, (0.0, 0.0))
+                shown[xref] = (max(width, math.hypot(a, b)), max(height, math.hypot(c, d)))
+
+        replaced = 0
+        for xref, (width, height) in shown.items():
+            if self._downsample_image(doc, xref, width, height):
+                replaced += 1
+        return replaced
+
+    def downsample_pdf(self, pdf: bytes) -> bytes:
+        """Downsample the images of a PDF given as bytes, return it unchanged if there were none"""
+        doc = fitz.open(stream=pdf, filetype="pdf")
+        try:
+            if not self.downsample(doc):
+                return pdf
+            return doc.tobytes(garbage=1, deflate=True)
+        finally:
+            doc.close()
+
+    def _downsample_image(self, doc: fitz.Document, xref: int, shown_width: float,
+                          shown_height: float) -> bool:
+        """Replace one image by a smaller version if it is sharper than needed"""
+        if doc.xref_get_key(xref, "ImageMask")[1] == "true":
+            return False
+        # JPEG 2000 images may leave BitsPerComponent to the image data
+        if doc.xref_get_key(xref, "BitsPerComponent")[1] == "1":
+            return False
+        try:
+            width = int(doc.xref_get_key(xref, "Width")[1])
+            height = int(doc.xref_get_key(xref, "Height")[1])
+        except ValueError:
+            return False
+
+        # Pixels needed at the largest placement, then skip images that are close enough
+        needed = max(shown_width * self.dpi / 72 / width, shown_height * self.dpi / 72 / height)
+        if needed * DOWNSAMPLE_THRESHOLD >= 1:
+            return False
+        target = (max(1, math.ceil(width * needed)), max(1, math.ceil(height * needed)))
+
+        filters = doc.xref_get_key(xref, "Filter")[1]
+        raw = doc.xref_stream_raw(xref)
+        key = hashlib.sha256(raw + filters.encode()).digest()
+        resampled = self._resampled.get(key)
+        if (resampled is None or resampled.width < target[0]
+                or resampled.width > target[0] * DOWNSAMPLE_THRESHOLD):
+            resampled = self._resample(doc, xref, raw, filters, target)
+            if resampled is None:
+                return False
+            self._resampled[key] = resampled
+        if len(resampled.stream) >= len(raw):
+            return False
+
+        doc.update_stream(xref, resampled.stream, compress=False)
+        doc.xref_set_key(xref, "Filter", "/DCTDecode" if resampled.jpeg else "/FlateDecode")
+        _remove_keys(doc, xref, ("DecodeParms", "Decode", "SMaskInData"))
+        doc.xref_set_key(xref, "Width", str(resampled.width))
+        doc.xref_set_key(xref, "Height", str(resampled.height))
+        doc.xref_set_key(xref, "BitsPerComponent", "8")
+        if resampled.colorspace is not None:
+            doc.xref_set_key(xref, "ColorSpace", resampled.colorspace)
+
+        kind, value = doc.xref_get_key(xref, "SMask")
+        if kind == "xref" and resampled.smask is not None:
+            smask = int(value.split()[0])
+            doc.update_stream(smask, resampled.smask, compress=False)
+            doc.xref_set_key(smask, "Filter", "/FlateDecode")
+            _remove_keys(doc, smask, ("DecodeParms", "Decode", "Matte"))
+            doc.xref_set_key(smask, "Width", str(resampled.width))
+            doc.xref_set_key(smask, "Height", str(resampled.height))
+            doc.xref_set_key(smask, "BitsPerComponent", "8")
+        return True
+
+    def _resample(self, doc: fitz.Document, xref: int, raw: bytes, filters: str,
+                  target: Tuple[int, int]) -> Optional[_Resampled]:
+        """Resampled stream of an image, None for images that are left alone"""
+        kind, colorspace = doc.xref_get_key(xref, "ColorSpace")
+        if kind == "xref":
+            colorspace = doc.xref_object(int(colorspace.split()[0]), compressed=True)
+        keep_colorspace = colorspace.lstrip("[ ").startswith(_KEPT_COLORSPACES)
+        jpeg = "DCT" in filters or "JPX" in filters
+
+        smask = None
+        kind, value = doc.xref_get_key(xref, "SMask")
+        if kind == "xref":
+            mask = fitz.Pixmap(doc, int(value.split()[0]))
+            if mask.n != 1:
+                return None
+            smask = zlib.compress(fitz.Pixmap(mask, target[0], target[1], None).samples)
+
+        if filters == "/DCTDecode" and doc.xref_get_key(xref, "Decode")[0] == "null":
+            # JPEG decoders can decode at 1/2, 1/4 or 1/8 size straight away
+            with Image.open(io.BytesIO(raw)) as image:
+                if image.mode in _JPEG_MODES:
+                    image.draft(image.mode, target)
+                    image = image.resize(target, Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    image.save(buffer, "JPEG", quality=self.quality)
+                    colorspace = None if keep_colorspace else _JPEG_MODES[image.mode]
+                    return _Resampled(target[0], target[1], buffer.getvalue(), True, colorspace, smask)
+
+        pix = fitz.Pixmap(doc, xref)
+        if pix.alpha or pix.n not in _DEVICE_COLORSPACES:
+            return None  # Separation, DeviceN and images with built-in transparency
+        if not keep_colorspace or pix.colorspace.n != pix.n:
+            device, name = _DEVICE_COLORSPACES[pix.n]
+            pix = fitz.Pixmap(device, pix)
+            colorspace = name
+        else:
+            colorspace = None
+        pix = fitz.Pixmap(pix, target[0], target[1], None)
+        if jpeg and pix.n != 4:
+            # MuPDF writes CMYK JPEGs inverted (Adobe style), keep those lossless
+            stream = pix.tobytes("jpeg", jpg_quality=self.quality)
+        else:
+            jpeg = False
+            stream = zlib.compress(pix.samples)
+        return _Resampled(target[0], target[1], stream, jpeg, colorspace, smask)
@@ -0,0 +1,162 @@
+"""Incremental regeneration - rebuild only the grid pages whose source pages changed"""
+
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import fitz
+
+from .cache import _write_atomic
+from .multi import DocumentSet
+from .parallel import render_parallel
+from .profiling import Profiler, profile_stage
+from .progress import ProgressTracker
+from .render import PageCells, render_pages, report_pages
+
+# Bump when the manifest layout or the rendering output changes
+MANIFEST_VERSION = 1
+
+# Fingerprints are stored shortened, 128 bits are plenty to tell pages apart
+FINGERPRINT_CHARS = 32
+
+
+def manifest_path(output_path: Path) -> Path:
+    """Sidecar manifest of an output file: output.pdf -> output.pdf.manifest.json"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + ".manifest.json")
+
+
+def _cell_key(cells: PageCells) -> list:
+    # Rounded, so tiny float differences between runs do not force a rebuild
+    return [[idx] + [round(v, 3) for v in rect] for idx, rect in cells]
+
+
+def build_manifest(output_path: Path, settings: dict, fingerprints: Sequence[str],
+                   page_size: Tuple[float, float], page_cells: Sequence[PageCells]) -> dict:
+    """
+    Manifest describing a finished output file
+
+    Args:
+        output_path: The output file, already written
+        settings: Options that change how pages are drawn (render mode, dpi, ...)
+        fingerprints: Content fingerprint of every source page (dedup.page_fingerprints)
+        page_size: Output page size in points
+        page_cells: Cells of every output page
+    """
+    stat = Path(output_path).stat()
+    return {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        # The output must not have been replaced by anything else since
+        "output": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "page_size": [round(v, 3) for v in page_size],
+        "fingerprints": [fp[:FINGERPRINT_CHARS] for fp in fingerprints],
+        "pages": [_cell_key(cells) for cells in page_cells],
+    }
+
+
+def load_manifest(output_path: Path) -> Optional[dict]:
+    """Manifest of an existing output, or None if it is missing, unreadable or stale"""
+    try:
+        manifest = json.loads(manifest_path(output_path).read_text(encoding="utf-8"))
+        stat = Path(output_path).stat()
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    if manifest.get("output") != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}:
+        return None
+    return manifest
+
+
+def write_manifest(output_path: Path, manifest: dict) -> None:
+    _write_atomic(manifest_path(output_path), json.dumps(manifest).encode("utf-8"))
+
+
+def reusable_pages(manifest: Optional[dict], settings: dict, fingerprints: Sequence[str],
+                   page_size: Tuple[float, float], page_cells: Sequence[PageCells]) -> List[bool]:
+    """
+    For every new output page, whether the existing output has an identical page
+
+    A page is reused when the settings and the output page size are unchanged, it holds
+    the same source pages in the same cells, and none of those source pages changed.
+    """
+    if (manifest is None or manifest["settings"] != settings
+            or manifest["page_size"] != [round(v, 3) for v in page_size]):
+        return [False] * len(page_cells)
+
+    old_fingerprints = manifest["fingerprints"]
+    old_pages = manifest["pages"]
+    reusable = []
+    for page, cells in enumerate(page_cells):
+        reusable.append(
+            page < len(old_pages)
+            and old_pages[page] == _cell_key(cells)
+            and all(idx < len(old_fingerprints)
+                    and old_fingerprints[idx] == fingerprints[idx][:FINGERPRINT_CHARS]
+                    for idx, _ in cells)
+        )
+    return reusable
+
+
+def _runs(flags: Sequence[bool]) -> List[Tuple[bool, int, int]]:
+    """Split flags into (value, start, end) runs of equal values"""
+    runs = []
+    start = 0
+    for idx in range(1, len(flags) + 1):
+        if idx == len(flags) or flags[idx] != flags[start]:
+            runs.append((flags[start], start, idx))
+            start = idx
+    return runs
+
+
+def render_incremental(
+    output_doc: fitz.Document,
+    old_doc: fitz.Document,
+    doc: fitz.Document,
+    input_path: Union[Path, DocumentSet],
+    page_size: Tuple[float, float],
+    page_cells: Sequence[PageCells],
+    reusable: Sequence[bool],
+    render_options: dict,
+    workers: int = 1,
+    tracker: Optional[ProgressTracker] = None,
+    profiler: Optional[Profiler] = None,
+) -> None:
+    """
+    Append output pages to output_doc, copying reusable pages from old_doc
+
+    Runs of reusable pages are copied with one insert_pdf call each, the other pages are
+    rendered as usual (in worker processes if workers > 1).
+
+    Args:
+        output_doc: Document receiving the new pages
+        old_doc: Previous output
+        doc: Source document
+        input_path: Input PDF file path or DocumentSet, opened by worker processes
+        page_size: Output page size (width, height) in points
+        page_cells: Cells of each output page, in order
+        reusable: See reusable_pages
+        render_options: Keyword arguments for render_pages
+        workers: Number of worker processes for rebuilt pages
+        tracker: Progress and cancellation
+        profiler: Records copying as "render.copy" and the pages_reused/pages_rebuilt counters
+    """
+    for reuse, start, end in _runs(reusable):
+        if reuse:
+            with profile_stage(profiler, "render.copy"):
+                first = len(output_doc)
+                output_doc.insert_pdf(old_doc, from_page=start, to_page=end - 1)
+            report_pages(tracker, output_doc, first, len(output_doc))
+            if tracker is not None:
+                tracker.check()
+                tracker.advance(sum(len(cells) for cells in page_cells[start:end]))
+        elif workers > 1 and end - start > 1:
+            render_parallel(output_doc, input_path, page_size, page_cells[start:end],
+                            render_options, workers, tracker=tracker, profiler=profiler)
+        else:
+            render_pages(output_doc, doc, page_size, page_cells[start:end], tracker=tracker,
+                         profiler=profiler, **render_options)
+        if profiler is not None:
+            profiler.count("pages_reused" if reuse else "pages_rebuilt", end - start)
+
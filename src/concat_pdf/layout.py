@@ -0,0 +1,198 @@
+"""Vectorized grid layout - cell rectangles for all pages in one pass"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import fitz
+import numpy as np
+
+from .render import PageCells
+
+# Height of one thumbnail (points) when the output page size is auto-calculated
+BASE_THUMB_HEIGHT = 300
+
+
+class Layout(NamedTuple):
+    """Result of compute_layout"""
+    page_size: Tuple[float, float]  # Output page size (width, height) in points
+    page_index: np.ndarray  # (N,) output page of every source page
+    rects: np.ndarray  # (N, 4) fitted thumbnail rectangles (x0, y0, x1, y1)
+    output_pages: int
+
+
+def page_sizes(doc: fitz.Document, pages: Optional[Sequence[int]] = None,
+               known: Optional[Sequence[Tuple[float, float]]] = None) -> np.ndarray:
+    """
+    (N, 2) array of displayed page sizes (width, height), rotation applied
+
+    Args:
+        doc: Source document or DocumentSet
+        pages: Only load these pages, in this order; None means all pages
+        known: Sizes of all pages of doc, e.g. from the metadata index; no page is
+            loaded then
+    """
+    if known is not None:
+        sizes = np.asarray(known, dtype=np.float64).reshape(-1, 2)
+        return sizes if pages is None else sizes[np.asarray(pages, dtype=np.intp)]
+    if pages is None:
+        pages = range(len(doc))
+    sizes = np.empty((len(pages), 2), dtype=np.float64)
+    for row, idx in enumerate(pages):
+        rect = doc[idx].rect
+        sizes[row] = rect.width, rect.height
+    return sizes
+
+
+def _representative_aspect(sizes: np.ndarray) -> float:
+    """Aspect ratio used to shape cells, the median so a few odd pages do not skew it"""
+    return float(np.median(sizes[:, 0] / sizes[:, 1]))
+
+
+def _auto_page_width(sizes: np.ndarray, n: int, gap: float, padding: float) -> float:
+    base_thumb_width = BASE_THUMB_HEIGHT * _representative_aspect(sizes)
+    # Compact spacing for sizing the page, cells are then laid out with the full spacing
+    effective_gap = gap * 0.5
+    effective_padding = padding * 0.8
+    return n * base_thumb_width + (n - 1) * effective_gap + 2 * effective_padding
+
+
+def _grid_layout(sizes: np.ndarray, n: int, m: int, page_size: Tuple[float, float],
+                 gap: float, padding: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Uniform n×m cells, every page fitted and centered in its cell"""
+    thumbnail_width = (page_size[0] - 2 * padding - (n - 1) * gap) / n
+    thumbnail_height = (page_size[1] - 2 * padding - (m - 1) * gap) / m
+
+    k = np.arange(len(sizes))
+    page_index, grid_idx = np.divmod(k, n * m)
+    row, col = np.divmod(grid_idx, n)
+    x = padding + col * (thumbnail_width + gap)
+    y = padding + row * (thumbnail_height + gap)
+
+    aspect = sizes[:, 0] / sizes[:, 1]
+    width_limited = aspect > thumbnail_width / thumbnail_height
+    fit_width = np.where(width_limited, thumbnail_width, thumbnail_height * aspect)
+    fit_height = np.where(width_limited, thumbnail_width / aspect, thumbnail_height)
+
+    x0 = x + (thumbnail_width - fit_width) / 2
+    y0 = y + (thumbnail_height - fit_height) / 2
+    rects = np.column_stack((x0, y0, x0 + fit_width, y0 + fit_height))
+    return page_index, rects
+
+
+def _exclusive_cumsum(values: np.ndarray, group_starts: np.ndarray, group_of: np.ndarray) -> np.ndarray:
+    """Running sum of values before each element, restarting at every group start"""
+    total = np.cumsum(values) - values
+    return total - total[group_starts][group_of]
+
+
+def _packed_layout(sizes: np.ndarray, n: int, m: int, page_width: float,
+                   page_height: Optional[float], gap: float,
+                   padding: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Justified rows: the n pages of a row share one height and fill the row width
+
+    Landscape and portrait pages then take only the width they need instead of a
+    uniform cell. Row heights are capped at the uniform cell height, and on a fixed page
+    size, rows of an output page are scaled down together when they do not fit.
+
+    Returns page_index, rects and the page height (computed when page_height is None).
+    """
+    count = len(sizes)
+    aspect = sizes[:, 0] / sizes[:, 1]
+    available_width = page_width - 2 * padding
+
+    # Rows of n pages
+    row_of = np.arange(count) // n
+    row_starts = np.arange(0, count, n)
+    row_count = np.diff(np.append(row_starts, count))
+    row_aspect = np.add.reduceat(aspect, row_starts)
+    max_row_height = (available_width - (n - 1) * gap) / (n * _representative_aspect(sizes))
+    row_height = np.minimum((available_width - (row_count - 1) * gap) / row_aspect, max_row_height)
+
+    # Output pages of m rows
+    rows = len(row_starts)
+    page_of_row = np.arange(rows) // m
+    page_row_starts = np.arange(0, rows, m)
+    rows_in_page = np.diff(np.append(page_row_starts, rows))
+    content_height = np.add.reduceat(row_height, page_row_starts) + (rows_in_page - 1) * gap
+
+    if page_height is None:
+        page_height = float(content_height.max()) + 2 * padding
+    else:
+        scale = np.minimum(1.0, (page_height - 2 * padding - (rows_in_page - 1) * gap)
+                           / (content_height - (rows_in_page - 1) * gap))
+        row_height = row_height * scale[page_of_row]
+
+    row_y = padding + _exclusive_cumsum(row_height + gap, page_row_starts, page_of_row)
+
+    # Pages within each row, rows centered horizontally
+    height = row_height[row_of]
+    width = aspect * height
+    row_width = np.add.reduceat(width, row_starts) + (row_count - 1) * gap
+    row_x = padding + (available_width - row_width) / 2
+
+    x0 = row_x[row_of] + _exclusive_cumsum(width + gap, row_starts, row_of)
+    y0 = row_y[row_of]
+    rects = np.column_stack((x0, y0, x0 + width, y0 + height))
+    return page_of_row[row_of], rects, page_height
+
+
+def compute_layout(
+    sizes: np.ndarray,
+    n: int,
+    m: int,
+    page_size: Optional[Tuple[float, float]] = None,
+    gap: float = 3,
+    padding: float = 10,
+    pack_rows: bool = False,
+) -> Layout:
+    """
+    Compute output page size and thumbnail rectangles for all source pages at once
+
+    Args:
+        sizes: (N, 2) source page sizes (width, height), see page_sizes
+        n: Number of grid columns
+        m: Number of grid rows per output page
+        page_size: Output page size (width, height) in points, None means auto-calculate
+            from the median page aspect ratio
+        gap: Spacing between thumbnails (points)
+        padding: Page margins (points)
+        pack_rows: Justify rows so pages of different shapes share rows efficiently,
+            instead of fitting every page into a uniform cell
+    """
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    output_pages = -(-len(sizes) // (n * m))
+
+    if pack_rows:
+        if page_size is None:
+            page_width = _auto_page_width(sizes, n, gap, padding)
+            page_index, rects, page_height = _packed_layout(sizes, n, m, page_width, None,
+                                                            gap, padding)
+            page_size = (page_width, page_height)
+        else:
+            page_index, rects, _ = _packed_layout(sizes, n, m, page_size[0], page_size[1],
+                                                  gap, padding)
+        return Layout(page_size, page_index, rects, output_pages)
+
+    if page_size is None:
+        effective_gap = gap * 0.5
+        effective_padding = padding * 0.8
+        page_size = (_auto_page_width(sizes, n, gap, padding),
+                     m * BASE_THUMB_HEIGHT + (m - 1) * effective_gap + 2 * effective_padding)
+    page_index, rects = _grid_layout(sizes, n, m, page_size, gap, padding)
+    return Layout(page_size, page_index, rects, output_pages)
+
+
+def to_page_cells(layout: Layout, pages: Optional[Sequence[int]] = None) -> List[PageCells]:
+    """
+    Group a layout into per-output-page cell lists for render_pages
+
+    Args:
+        layout: Result of compute_layout
+        pages: Source page index of every laid out page, when only some pages of the
+            document were laid out; None means all pages in order
+    """
+    # Source pages are assigned to output pages in order, so every page is a slice
+    indices = range(len(layout.rects)) if pages is None else pages
+    cells = list(zip(indices, map(tuple, layout.rects.tolist())))
+    bounds = np.searchsorted(layout.page_index, np.arange(layout.output_pages + 1)).tolist()
+    return [cells[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
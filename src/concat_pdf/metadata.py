@@ -0,0 +1,213 @@
+"""Document metadata index - page counts, sizes and rotations, scanned once per file version
+
+Kept free of PyMuPDF imports: a file that is already indexed is answered without loading
+PyMuPDF at all, which keeps the GUI responsive.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from .cache import _write_atomic, default_cache_dir
+
+# Bump when the stored format changes
+METADATA_VERSION = 1
+
+# Files whose metadata is kept in memory, and on disk
+MEMORY_ENTRIES = 256
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class DocumentInfo(NamedTuple):
+    """Page metadata of one PDF file"""
+    sizes: Tuple[Tuple[float, float], ...]  # Displayed (width, height) per page, rotation applied
+    rotations: Tuple[int, ...]  # /Rotate of every page, 0, 90, 180 or 270
+
+    @property
+    def page_count(self) -> int:
+        return len(self.sizes)
+
+
+def scan_document(doc) -> DocumentInfo:
+    """Read the metadata of every page of an open fitz.Document"""
+    sizes = []
+    rotations = []
+    for page in doc:
+        rect = page.rect
+        sizes.append((rect.width, rect.height))
+        rotations.append(page.rotation)
+    return DocumentInfo(tuple(sizes), tuple(rotations))
+
+
+class MetadataIndex:
+    """
+    Page counts, sizes and rotations of PDF files, each file version scanned once
+
+    Entries are keyed by the resolved path, size and modification time of a file, so an
+    edited file is scanned again while repeated lookups (the GUI's row calculation, the
+    layout, several runs of the command line tool) never reparse it. Recently used entries
+    are kept in memory; with a directory, entries are also stored there as small JSON
+    files and shared with other processes. At most max_entries files are kept on disk,
+    the least recently used ones are deleted first.
+
+    Args:
+        directory: Where entries are stored, None keeps them in memory only
+        max_entries: Largest number of files kept on disk
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = Path(directory) if directory is not None else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, DocumentInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._count = None  # Entries on disk, counted on first write
+
+    @staticmethod
+    def _stamp(path: Path) -> str:
+        path = Path(path).resolve()
+        stat = path.stat()
+        return f"{METADATA_VERSION}|{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def _entry_path(self, stamp: str) -> Path:
+        return self.directory / f"{hashlib.sha256(stamp.encode('utf-8')).hexdigest()}.json"
+
+    def lookup(self, path: Path) -> Optional[DocumentInfo]:
+        """Metadata of the current version of a file if it has been indexed, else None"""
+        stamp = self._stamp(path)
+        with self._lock:
+            info = self._memory.get(stamp)
+            if info is not None:
+                self._memory.move_to_end(stamp)
+                self.hits += 1
+                return info
+        if self.directory is None:
+            return None
+        entry_path = self._entry_path(stamp)
+        try:
+            data = json.loads(entry_path.read_text(encoding="utf-8"))
+            info = DocumentInfo(tuple(tuple(size) for size in data["sizes"]),
+                                tuple(data["rotations"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        try:
+            os.utime(entry_path)  # Marks the entry as recently used
+        except OSError:
+            pass
+        self._remember(stamp, info)
+        with self._lock:
+            self.hits += 1
+        return info
+
+    def info(self, path: Path, doc=None) -> DocumentInfo:
+        """
+        Metadata of a file, scanned and indexed if the file (or this version of it) is new
+
+        Args:
+            path: PDF file path
+            doc: The file, already opened with fitz.open, saves opening it again on a miss
+        """
+        info = self.lookup(path)
+        if info is not None:
+            return info
+        stamp = self._stamp(path)
+        if doc is not None:
+            info = scan_document(doc)
+        else:
+            import fitz
+            with fitz.open(path) as opened:
+                info = scan_document(opened)
+        with self._lock:
+            self.misses += 1
+        self._remember(stamp, info)
+        if self.directory is not None:
+            self._store(stamp, info)
+        return info
+
+    def page_counts(self, paths: Sequence[Path], scan: bool = True) -> list:
+        """
+        Page count of every file, e.g. for DocumentSet
+
+        Args:
+            paths: PDF file paths
+            scan: Scan and index files that are not indexed yet; False only opens them
+                for their page count, for when few of their pages are going to be used
+        """
+        counts = []
+        for path in paths:
+            info = self.lookup(path) if not scan else self.info(path)
+            if info is None:
+                import fitz
+                with fitz.open(path) as doc:
+                    counts.append(len(doc))
+            else:
+                counts.append(info.page_count)
+        return counts
+
+    def _remember(self, stamp: str, info: DocumentInfo) -> None:
+        with self._lock:
+            self._memory[stamp] = info
+            self._memory.move_to_end(stamp)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _store(self, stamp: str, info: DocumentInfo) -> None:
+        data = json.dumps(dict(sizes=info.sizes, rotations=info.rotations), separators=(",", ":"))
+        try:
+            _write_atomic(self._entry_path(stamp), data.encode("utf-8"))
+        except OSError:
+            return  # A read-only cache directory only costs the next run a scan
+        if self._count is None:
+            self._count = len(self._entries())
+        else:
+            self._count += 1
+        if self._count > self.max_entries:
+            self.trim()
+
+    def _entries(self) -> list:
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue  # Deleted by another process
+        return entries
+
+    def trim(self, max_entries: Optional[int] = None) -> int:
+        """
+        Delete the least recently used entries on disk down to 90% of max_entries
+
+        Returns the number of deleted entries.
+        """
+        if max_entries is None:
+            max_entries = self.max_entries
+        entries = sorted(self._entries())
+        excess = max(0, len(entries) - int(max_entries * 0.9))
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+        self._count = len(entries) - excess
+        return excess
+
+    def clear(self) -> None:
+        """Forget all entries, in memory and on disk"""
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            self.trim(0)
+
+
+# Shared by the GUI and the command line, created on first use
+_default_index: Optional[MetadataIndex] = None
+
+
+def default_metadata_index() -> MetadataIndex:
+    """The index of the GUI and the command line, stored in the user's cache directory"""
+    global _default_index
+    if _default_index is None:
+        _default_index = MetadataIndex(default_cache_dir() / "metadata")
+    return _default_index
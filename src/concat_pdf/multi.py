@@ -0,0 +1,169 @@
+"""Multiple input files - one sequence of source pages over many PDF documents"""
+
+import bisect
+import glob
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import fitz
+
+from .options import DEFAULT_MAX_OPEN
+
+
+def _natural_key(path: Path) -> list:
+    """Sort key putting chapter2.pdf before chapter10.pdf"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", str(path))]
+
+
+def expand_inputs(sources: Sequence[str]) -> List[Path]:
+    """
+    Expand input arguments to the ordered list of PDF files to concatenate
+
+    Plain file paths are kept in the given order (repeats included). Directories
+    contribute their *.pdf files and glob patterns their matches, both in natural
+    order. "@list.txt" reads one source per line from a list file, skipping blank lines
+    and lines starting with "#"; relative entries are relative to the list file.
+
+    Args:
+        sources: File paths, directories, glob patterns or @list files
+    """
+    paths = []
+    for source in sources:
+        source = str(source)
+        if source.startswith("@"):
+            list_path = Path(source[1:])
+            entries = [line.strip() for line in list_path.read_text(encoding="utf-8").splitlines()]
+            paths.extend(expand_inputs([str(list_path.parent / entry) for entry in entries
+                                        if entry and not entry.startswith("#")]))
+        elif Path(source).is_dir():
+            paths.extend(sorted((p for p in Path(source).iterdir()
+                                 if p.suffix.lower() == ".pdf" and p.is_file()), key=_natural_key))
+        elif glob.has_magic(source):
+            matches = [Path(match) for match in glob.glob(source, recursive=True)]
+            paths.extend(sorted((p for p in matches if p.is_file()), key=_natural_key))
+        else:
+            paths.append(Path(source))
+    return paths
+
+
+class DocumentSet:
+    """
+    The pages of several PDF files as one document
+
+    Supports the parts of the fitz.Document interface the renderers use on a source:
+    len(), indexing and iterating pages. Page indices run through all files in order.
+    At most max_open files are open at a time, the least recently used one is closed
+    when another is needed, so thousands of inputs do not exhaust file handles or
+    memory. Pages are usually visited in order, which opens every file about once.
+
+    A DocumentSet can be pickled for worker processes; only the file list and page
+    counts are sent, files are reopened on demand.
+
+    Args:
+        paths: Input PDF files, in order
+        max_open: Maximum number of files open at the same time
+        page_counts: Page count of every file, if already known; otherwise every file
+            is opened once to count its pages
+    """
+
+    def __init__(self, paths: Sequence[Path], max_open: int = DEFAULT_MAX_OPEN,
+                 page_counts: Optional[Sequence[int]] = None):
+        if not paths:
+            raise ValueError("No input files")
+        if max_open < 1:
+            raise ValueError(f"max_open must be at least 1: {max_open}")
+        self.paths = [Path(p) for p in paths]
+        self.max_open = max_open
+        self._open: "OrderedDict[int, fitz.Document]" = OrderedDict()
+        # PyMuPDF ids of documents closed since the last release_graftmaps call
+        self._closed_ids: List[int] = []
+
+        if page_counts is None:
+            page_counts = [len(self.document(number)) for number in range(len(self.paths))]
+        self.page_counts = list(page_counts)
+        # offsets[i] is the index of the first page of file i
+        self.offsets = [0]
+        for count in self.page_counts:
+            self.offsets.append(self.offsets[-1] + count)
+
+    def __getstate__(self) -> dict:
+        return dict(paths=self.paths, max_open=self.max_open, page_counts=self.page_counts)
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def locate(self, idx: int) -> Tuple[int, int]:
+        """(file number, page number within that file) of page idx"""
+        if not 0 <= idx < len(self):
+            raise IndexError(f"page {idx} not in document set of {len(self)} pages")
+        number = bisect.bisect_right(self.offsets, idx) - 1
+        return number, idx - self.offsets[number]
+
+    def document(self, number: int) -> fitz.Document:
+        """Open document of file number, closing the least recently used one if needed"""
+        doc = self._open.get(number)
+        if doc is not None:
+            self._open.move_to_end(number)
+            return doc
+        while len(self._open) >= self.max_open:
+            _, oldest = self._open.popitem(last=False)
+            self._closed_ids.append(oldest._graft_id)
+            oldest.close()
+        doc = fitz.open(self.paths[number])
+        self._open[number] = doc
+        return doc
+
+    def source(self, idx: int) -> Tuple[fitz.Document, int]:
+        """Document and page number holding page idx, e.g. for Page.show_pdf_page"""
+        number, pno = self.locate(idx)
+        return self.document(number), pno
+
+    def pages_by_file(self, pages: Sequence[int]) -> List[List[int]]:
+        """Split page indices (ascending) into per-file page numbers, one list per file"""
+        parts: List[List[int]] = [[] for _ in self.paths]
+        for idx in pages:
+            number, pno = self.locate(idx)
+            parts[number].append(pno)
+        return parts
+
+    def documents(self) -> Iterator[fitz.Document]:
+        """All files in order, each open while it is being used"""
+        for number in range(len(self.paths)):
+            yield self.document(number)
+
+    def __getitem__(self, idx: int) -> fitz.Page:
+        doc, pno = self.source(idx)
+        return doc[pno]
+
+    def __iter__(self) -> Iterator[fitz.Page]:
+        for doc in self.documents():
+            yield from doc
+
+    def release_graftmaps(self, output_doc: fitz.Document) -> None:
+        """
+        Drop output_doc's copy bookkeeping for files that have been closed
+
+        show_pdf_page keeps a graft map per source document in the output document,
+        which holds on to the source document's data. Calling this after every output
+        page keeps memory bounded by the open files.
+        """
+        for graft_id in self._closed_ids:
+            output_doc.Graftmaps.pop(graft_id, None)
+        self._closed_ids.clear()
+
+    def close(self) -> None:
+        for doc in self._open.values():
+            doc.close()
+        self._open.clear()
+
+
+def source_page(doc, idx: int) -> Tuple[fitz.Document, int]:
+    """Document and page number of source page idx, doc is a fitz.Document or DocumentSet"""
+    if isinstance(doc, DocumentSet):
+        return doc.source(idx)
+    return doc, idx
@@ -0,0 +1,53 @@
+"""Option values shared by the command line and the processing modules
+
+Kept free of PyMuPDF, NumPy and Pillow imports, so building the argument parser (and
+printing --help) stays fast.
+"""
+
+from pathlib import Path
+
+RENDER_MODES = ("vector", "raster")
+IMAGE_FORMATS = ("jpeg", "png", "bilevel")
+
+# Keyword arguments for Document.save, plus "rewrite_images" to recompress images first
+SAVE_PROFILES = {
+    # No cleanup at all, for drafts that are thrown away
+    "fast": dict(garbage=0, deflate=False),
+    # Drop unused objects and compress streams
+    "balanced": dict(garbage=1, deflate=True),
+    # Also merge duplicate objects (the historical default)
+    "standard": dict(garbage=4, deflate=True),
+    # Also pack objects into object streams and recompress images to the target DPI
+    "smallest": dict(garbage=4, deflate=True, use_objstms=1, rewrite_images=True),
+}
+
+DEFAULT_SAVE_PROFILE = "standard"
+
+# Image output file suffix: (Pillow format, largest width or height the format can store)
+SHEET_FORMATS = {
+    ".png": ("PNG", 2**31 - 1),
+    ".jpg": ("JPEG", 65535),
+    ".jpeg": ("JPEG", 65535),
+    ".webp": ("WEBP", 16383),
+}
+
+# Deep Zoom tile format: Pillow format
+TILE_FORMATS = {"jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+# Cell border line width (points) and color
+DEFAULT_BORDER_WIDTH = 0.5
+DEFAULT_BORDER_COLOR = (0.0, 0.0, 0.0)
+
+# Blank and near-duplicate page detection (see analysis.select_pages): ink fraction below
+# which a page is blank, largest fraction of differing ink pixels between near-duplicates
+DEFAULT_BLANK_COVERAGE = 0.002
+DEFAULT_DUPLICATE_DIFFERENCE = 0.1
+NEAR_DUPLICATE_MODES = (None, "skip", "collapse")
+
+# Source documents kept open at the same time with several input files
+DEFAULT_MAX_OPEN = 32
+
+
+def is_sheet_output(output_path: Path) -> bool:
+    """True if output_path names an image file rather than a PDF"""
+    return Path(output_path).suffix.lower() in SHEET_FORMATS
@@ -0,0 +1,167 @@
+"""Multi-process rendering of output pages"""
+
+import math
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+import fitz
+
+from .profiling import Profiler, profile_stage
+from .multi import DocumentSet
+from .progress import FileCancelToken, ProcessingCancelled, ProgressTracker
+from .render import PageCells, render_pages, report_pages
+
+
+def _warm_up() -> None:
+    """Worker initializer: load MuPDF's fonts and rendering state before the first job"""
+    # Also imports the processing modules, so the first job does not pay for that
+    from . import core
+    doc = fitz.open()
+    page = doc.new_page(width=100, height=100)
+    page.insert_text((10, 50), "warm")
+    page.get_pixmap(dpi=36)
+    doc.tobytes()
+    doc.close()
+
+
+def _render_chunk(
+    input_path: Union[str, DocumentSet],
+    part_path: str,
+    page_size: Tuple[float, float],
+    page_cells: Sequence[PageCells],
+    render_options: dict,
+    cancel_path: Optional[str] = None,
+    profile: bool = False,
+) -> Tuple[str, int, int, Optional[dict]]:
+    """
+    Worker: render a contiguous run of output pages into a partial PDF
+
+    The parent requests cancellation by creating the file at cancel_path.
+    Returns the part path, the worker's thumbnail cache hits and misses, and its
+    Profiler.state() when profile is set.
+    """
+    cache = render_options.get("cache")
+    start_hits, start_misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+    # A DocumentSet arrives without open files and opens them as needed
+    doc = input_path if isinstance(input_path, DocumentSet) else fitz.open(input_path)
+    part_doc = fitz.open()
+    tracker = None
+    if cancel_path is not None:
+        tracker = ProgressTracker(0, cancel=FileCancelToken(cancel_path))
+    profiler = Profiler() if profile else None
+    render_pages(part_doc, doc, page_size, page_cells, tracker=tracker, profiler=profiler,
+                 **render_options)
+    # Parts are merged and garbage collected by the parent, keep this save cheap
+    part_doc.save(part_path)
+    part_doc.close()
+    doc.close()
+
+    profile_state = profiler.state() if profiler is not None else None
+    if cache is None:
+        return part_path, 0, 0, profile_state
+    return part_path, cache.hits - start_hits, cache.misses - start_misses, profile_state
+
+
+def split_chunks(count: int, workers: int) -> list:
+    """
+    Split range(count) into contiguous (start, end) chunks for the given number of workers
+
+    A few chunks per worker keep all processes busy when some pages are slower than others.
+    """
+    chunk_count = min(count, workers * 4)
+    chunk_size = math.ceil(count / chunk_count)
+    return [(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+
+
+def render_parallel(
+    output_doc: fitz.Document,
+    input_path: Union[Path, DocumentSet],
+    page_size: Tuple[float, float],
+    page_cells: Sequence[PageCells],
+    render_options: dict,
+    workers: int,
+    executor: Optional[Executor] = None,
+    tracker: Optional[ProgressTracker] = None,
+    profiler: Optional[Profiler] = None,
+) -> None:
+    """
+    Render output pages in worker processes and append them to output_doc in order
+
+    Every worker opens its own copy of the input and writes a partial PDF, the parts are
+    then stitched together with insert_pdf, so the pages match the serial path.
+
+    Args:
+        output_doc: Document receiving the new pages
+        input_path: Input PDF file path, or the DocumentSet of several input files
+        page_size: Output page size (width, height) in points
+        page_cells: Cells of each output page, in order
+        render_options: Keyword arguments for render_pages
+        workers: Number of worker processes
+        executor: Pool to reuse across calls, None starts one for this call
+        tracker: Progress and cancellation; progress advances and finished pages are
+            reported as chunks finish, and workers stop at their next cell once
+            cancellation is requested
+        profiler: Receives the measurements of all workers, plus the time spent
+            stitching parts as "render.stitch"
+    """
+    chunks = split_chunks(len(page_cells), workers)
+
+    if executor is None:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(chunks)))
+    else:
+        pool = nullcontext(executor)
+
+    with tempfile.TemporaryDirectory(prefix="concat_pdf_") as tmp_dir:
+        cancel_token = None
+        if tracker is not None and tracker.cancel is not None:
+            cancel_token = FileCancelToken(str(Path(tmp_dir) / "cancel"))
+
+        with pool as executor:
+            futures = [
+                executor.submit(
+                    _render_chunk,
+                    input_path if isinstance(input_path, DocumentSet) else str(input_path),
+                    str(Path(tmp_dir) / f"part_{chunk_idx:05d}.pdf"),
+                    page_size,
+                    page_cells[start:end],
+                    render_options,
+                    cancel_token.path if cancel_token is not None else None,
+                    profiler is not None,
+                )
+                for chunk_idx, (start, end) in enumerate(chunks)
+            ]
+
+            # Stitch in submission order, waiting on each part as it is needed
+            cache = render_options.get("cache")
+            try:
+                for future, (start, end) in zip(futures, chunks):
+                    if tracker is not None:
+                        # Wait in short steps so a cancellation request is noticed promptly
+                        while not wait([future], timeout=0.2, return_when=FIRST_COMPLETED).done:
+                            tracker.check()
+                    part_path, hits, misses, profile_state = future.result()
+                    if cache is not None:
+                        cache.hits += hits
+                        cache.misses += misses
+                    if profile_state is not None:
+                        profiler.merge(profile_state)
+                    with profile_stage(profiler, "render.stitch"):
+                        part_doc = fitz.open(part_path)
+                        first = len(output_doc)
+                        output_doc.insert_pdf(part_doc)
+                        part_doc.close()
+                    report_pages(tracker, output_doc, first, len(output_doc))
+
+                    if tracker is not None:
+                        tracker.advance(sum(len(cells) for cells in page_cells[start:end]))
+                        tracker.check()
+            except ProcessingCancelled:
+                # Stop running workers at their next cell and drop the queued chunks
+                cancel_token.set()
+                for pending in futures:
+                    pending.cancel()
+                raise
@@ -0,0 +1,136 @@
+"""Stage timing and profiling of process_pdf runs"""
+
+import cProfile
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Optional
+
+# Number of slowest source pages listed in reports
+SLOWEST_PAGES = 10
+
+
+class Profiler:
+    """
+    Collects per-stage durations, per-source-page cost and counters of one run
+
+    Pass an instance to process_pdf (or use the --profile command line option), then
+    read summary(), report() or write_json() afterwards. Stages are named like
+    "render" or "render.draw"; dotted stages are parts of their parent stage. Stages
+    measured in worker processes are summed over all workers, so they can add up to
+    more than the parent's wall time.
+
+    Args:
+        cprofile: Also run cProfile during the run, see dump_stats
+    """
+
+    def __init__(self, cprofile: bool = False):
+        self.stages: Dict[str, float] = {}
+        self.calls: Counter = Counter()
+        self.page_costs: Dict[int, float] = {}
+        self.counters: Counter = Counter()
+        self.total = 0.0
+        self.cprofile = cProfile.Profile() if cprofile else None
+
+    @contextmanager
+    def session(self):
+        """Time (and optionally cProfile) a whole run"""
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total += time.perf_counter() - start
+            if self.cprofile is not None:
+                self.cprofile.disable()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Add the time spent in the with block to a stage, repeated stages accumulate"""
+        # Register on entry, so a stage is listed before the parts measured inside it
+        self.stages.setdefault(name, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.calls[name] += calls
+
+    def add_page(self, idx: int, seconds: float) -> None:
+        """Charge time to a source page (0-based index)"""
+        self.page_costs[idx] = self.page_costs.get(idx, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def state(self) -> dict:
+        """Picklable measurements, for sending from a worker process to merge()"""
+        return dict(stages=self.stages, calls=dict(self.calls), page_costs=self.page_costs,
+                    counters=dict(self.counters))
+
+    def merge(self, state: dict) -> None:
+        """Add measurements taken by another Profiler (see state)"""
+        for name, seconds in state["stages"].items():
+            self.add(name, seconds, state["calls"].get(name, 1))
+        for idx, seconds in state["page_costs"].items():
+            self.add_page(idx, seconds)
+        self.counters.update(state["counters"])
+
+    def report(self) -> dict:
+        """All measurements as a JSON-serializable dict"""
+        costs = sorted(self.page_costs.items(), key=lambda item: item[1], reverse=True)
+        page_total = sum(self.page_costs.values())
+        return {
+            "total_seconds": self.total,
+            "stages": {name: {"seconds": seconds, "calls": self.calls[name]}
+                       for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            # Page numbers are 1-based in reports
+            "pages": {
+                "count": len(costs),
+                "mean_seconds": page_total / len(costs) if costs else 0.0,
+                "slowest": [{"page": idx + 1, "seconds": seconds}
+                            for idx, seconds in costs[:SLOWEST_PAGES]],
+                "seconds": {str(idx + 1): seconds for idx, seconds in sorted(self.page_costs.items())},
+            },
+        }
+
+    def write_json(self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self.report(), indent=2) + "\n", encoding="utf-8")
+
+    def dump_stats(self, path: Path) -> None:
+        """Write cProfile statistics, readable with pstats or snakeviz"""
+        if self.cprofile is None:
+            raise ValueError("Profiler was created without cprofile=True")
+        self.cprofile.dump_stats(str(path))
+
+    def summary(self) -> str:
+        """Human-readable summary, as printed by the command line tool"""
+        lines = [f"Total: {self.total:.2f} s"]
+        for name, seconds in self.stages.items():
+            indent = "  " * (name.count(".") + 1)
+            share = f" ({seconds / self.total:.0%})" if self.total else ""
+            lines.append(f"{indent}{name}: {seconds:.3f} s{share}")
+        if self.counters:
+            lines.append("Counters: " + ", ".join(f"{name}={value}"
+                                                  for name, value in sorted(self.counters.items())))
+        if self.page_costs:
+            costs = sorted(self.page_costs.items(), key=lambda item: item[1], reverse=True)
+            mean = sum(self.page_costs.values()) / len(costs)
+            lines.append(f"Per page: mean {mean * 1000:.1f} ms, slowest "
+                         + ", ".join(f"p{idx + 1} {seconds * 1000:.1f} ms"
+                                     for idx, seconds in costs[:5]))
+        return "\n".join(lines)
+
+
+def profile_stage(profiler: Optional[Profiler], name: str):
+    """profiler.stage(name), or a no-op when profiling is off"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
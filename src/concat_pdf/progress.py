@@ -0,0 +1,72 @@
+"""Progress reporting and cancellation for long-running jobs"""
+
+import os
+from typing import Callable, Optional, Protocol
+
+
+class ProcessingCancelled(Exception):
+    """Raised inside process_pdf when its cancellation token is set"""
+
+
+class CancelToken(Protocol):
+    """Anything with an is_set() method, typically a threading.Event"""
+
+    def is_set(self) -> bool: ...
+
+
+class FileCancelToken:
+    """Cancellation token visible across processes: set once the file exists"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def set(self) -> None:
+        open(self.path, "a").close()
+
+    def is_set(self) -> bool:
+        return os.path.exists(self.path)
+
+
+# progress(done, total), counted in placed source pages
+ProgressCallback = Callable[[int, int], None]
+
+# page_callback(number, pdf): an output page, as a one-page PDF, as soon as it is complete
+PageCallback = Callable[[int, bytes], None]
+
+
+class ProgressTracker:
+    """
+    Counts placed cells, reports them to a callback and checks for cancellation
+
+    Args:
+        total: Number of cells in the whole job
+        callback: Called with (done, total) after every cell, None to disable
+        cancel: Token checked between cells, None to disable
+        page_callback: Receives every finished output page, None to disable
+    """
+
+    def __init__(self, total: int, callback: Optional[ProgressCallback] = None,
+                 cancel: Optional[CancelToken] = None,
+                 page_callback: Optional[PageCallback] = None):
+        self.total = total
+        self.done = 0
+        self.callback = callback
+        self.cancel = cancel
+        self.page_callback = page_callback
+        self.pages_finished = 0
+
+    def check(self) -> None:
+        """Raise ProcessingCancelled if cancellation was requested"""
+        if self.cancel is not None and self.cancel.is_set():
+            raise ProcessingCancelled("Processing cancelled")
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+        if self.callback is not None:
+            self.callback(self.done, self.total)
+
+    def page_finished(self, pdf: bytes) -> None:
+        """Pass on the next output page; pages finish in order, also across batches"""
+        if self.page_callback is not None:
+            self.page_callback(self.pages_finished, pdf)
+        self.pages_finished += 1
@@ -0,0 +1,328 @@
+"""Deep Zoom (DZI) image pyramid of the whole document as one zoomable grid"""
+
+import hashlib
+import io
+import json
+import math
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fitz
+import numpy as np
+from PIL import Image
+
+from .cache import _write_atomic
+from .layout import compute_layout, page_sizes, to_page_cells
+from .metadata import MetadataIndex
+from .options import DEFAULT_BORDER_WIDTH, TILE_FORMATS
+from .progress import ProgressCallback
+from .sheets import border_margin, overlapping_cells, render_region
+
+# Levels whose tiles hold at most this many cells are rendered from the source pages,
+# smaller levels are downsampled from the level below (rendering 10,000 tiny pages per
+# tile would cost more than merging four tiles)
+DIRECT_CELLS_PER_TILE = 16
+
+# Tiles per side of one unit of work when writing a whole pyramid; rendering a block of
+# tiles at once interprets a source page once instead of once per tile it touches
+BLOCK_TILES = 4
+
+
+class DeepZoomPyramid:
+    """
+    Deep Zoom pyramid of a document laid out as one grid, tiles generated on demand
+
+    The full resolution level shows every page at dpi. Level 0 is a single pixel and every
+    level doubles the size of the one before, as in the Deep Zoom format understood by
+    OpenSeadragon and similar viewers. get_tile() renders a tile the first time it is
+    requested and stores it under output_dir, so a viewer backend can serve only what is
+    visible; write_pyramid() generates everything up front.
+
+    Output files: output_dir/<name>.dzi and output_dir/<name>_files/<level>/<col>_<row>.<format>,
+    plus output_dir/<name>.settings.json recording what the tiles were made from. Tiles left
+    by a run with other settings or another input are deleted when the pyramid is opened.
+
+    Args:
+        input_path: Input PDF file path
+        output_dir: Directory receiving the descriptor and the tiles
+        n: Number of grid columns, None for a roughly square grid
+        dpi: Resolution of the most detailed level
+        tile_size: Tile width and height in pixels, without overlap
+        overlap: Pixels shared with each neighboring tile
+        tile_format: "jpeg", "png" or "webp"
+        image_quality: JPEG/WebP quality (1-100)
+        gap: Spacing between thumbnails (points)
+        padding: Grid margins (points)
+        pack_rows: Justified rows for documents with mixed page shapes
+        name: Base name of the output files, defaults to the input file name
+        metadata: Index of the page sizes (see metadata.MetadataIndex), None scans the pages
+        input_digest: SHA-256 of the input file, computed when None
+    """
+
+    def __init__(self, input_path: Path, output_dir: Path, n: Optional[int] = None,
+                 dpi: int = 72, tile_size: int = 256, overlap: int = 1,
+                 tile_format: str = "jpeg", image_quality: int = 85, gap: float = 3,
+                 padding: float = 10, pack_rows: bool = False, name: Optional[str] = None,
+                 metadata: Optional[MetadataIndex] = None, input_digest: Optional[str] = None):
+        if tile_format not in TILE_FORMATS:
+            raise ValueError(f"Unknown tile format: {tile_format}")
+        self.input_path = Path(input_path)
+        self.output_dir = Path(output_dir)
+        self.name = name or self.input_path.stem
+        self.dpi = dpi
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.tile_format = tile_format
+        self.image_quality = image_quality
+        self._lock = threading.Lock()
+
+        self.doc = fitz.open(self.input_path)
+        if len(self.doc) == 0:
+            self.doc.close()
+            raise ValueError(f"Input PDF has no pages: {self.input_path}")
+        if n is None:
+            n = math.ceil(math.sqrt(len(self.doc)))
+        self.n = n
+
+        # One grid page holding every source page
+        sizes = metadata.info(self.input_path, self.doc).sizes if metadata is not None else None
+        layout = compute_layout(page_sizes(self.doc, known=sizes), n, math.ceil(len(self.doc) / n),
+                                None, gap, padding, pack_rows)
+        self.page_size = layout.page_size
+        self.cells = to_page_cells(layout)[0]
+        self.rects = np.asarray(layout.rects, dtype=np.float64)  # Points
+
+        scale = dpi / 72
+        self.width = math.ceil(self.page_size[0] * scale)
+        self.height = math.ceil(self.page_size[1] * scale)
+        self.max_level = math.ceil(math.log2(max(self.width, self.height)))
+
+        # Lowest level still rendered from source pages
+        cell_area = float(np.median((self.rects[:, 2] - self.rects[:, 0])
+                                    * (self.rects[:, 3] - self.rects[:, 1]))) * scale ** 2
+        self.min_direct_level = self.max_level
+        while (self.min_direct_level > 0 and cell_area / 4 ** (self.max_level - self.min_direct_level + 1)
+               >= tile_size ** 2 / DIRECT_CELLS_PER_TILE):
+            self.min_direct_level -= 1
+
+        self.input_digest = input_digest or _file_digest(self.input_path)
+        self.settings = {"input": self.input_digest, "n": n, "dpi": dpi, "gap": gap,
+                         "padding": padding, "pack_rows": pack_rows, "tile_size": tile_size,
+                         "overlap": overlap, "format": tile_format, "quality": image_quality}
+        self._invalidate_stale_tiles()
+
+    @property
+    def descriptor_path(self) -> Path:
+        return self.output_dir / f"{self.name}.dzi"
+
+    @property
+    def settings_path(self) -> Path:
+        return self.output_dir / f"{self.name}.settings.json"
+
+    def _invalidate_stale_tiles(self) -> None:
+        """Delete the tiles and descriptor of a previous run that used other settings"""
+        try:
+            previous = json.loads(self.settings_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous = None
+        if previous == self.settings:
+            return
+        shutil.rmtree(self.output_dir / f"{self.name}_files", ignore_errors=True)
+        self.descriptor_path.unlink(missing_ok=True)
+        _write_atomic(self.settings_path, json.dumps(self.settings, indent=2).encode("utf-8"))
+
+    def level_scale(self, level: int) -> float:
+        """Pixels per point at a level"""
+        return self.dpi / 72 / 2 ** (self.max_level - level)
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        factor = 2 ** (self.max_level - level)
+        return math.ceil(self.width / factor), math.ceil(self.height / factor)
+
+    def tile_count(self, level: int) -> Tuple[int, int]:
+        """Number of tile (columns, rows) at a level"""
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def tile_region(self, level: int, col: int, row: int) -> fitz.IRect:
+        """Pixel rectangle of a tile on its level, including the overlap"""
+        width, height = self.level_size(level)
+        x0 = col * self.tile_size - (self.overlap if col > 0 else 0)
+        y0 = row * self.tile_size - (self.overlap if row > 0 else 0)
+        x1 = min((col + 1) * self.tile_size + self.overlap, width)
+        y1 = min((row + 1) * self.tile_size + self.overlap, height)
+        return fitz.IRect(x0, y0, x1, y1)
+
+    def tile_path(self, level: int, col: int, row: int) -> Path:
+        return self.output_dir / f"{self.name}_files" / str(level) / f"{col}_{row}.{self.tile_format}"
+
+    def write_descriptor(self) -> Path:
+        """Write the .dzi file viewers open"""
+        xml = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+               f'TileSize="{self.tile_size}" Overlap="{self.overlap}" Format="{self.tile_format}">\n'
+               f'  <Size Width="{self.width}" Height="{self.height}"/>\n'
+               '</Image>\n')
+        _write_atomic(self.descriptor_path, xml.encode("utf-8"))
+        return self.descriptor_path
+
+    def _save_tile(self, level: int, col: int, row: int, image: Image.Image) -> None:
+        options = {}
+        if self.tile_format != "png":
+            options["quality"] = self.image_quality
+        buffer = io.BytesIO()
+        image.save(buffer, TILE_FORMATS[self.tile_format], **options)
+        # Atomic, concurrent requests for the same tile may both render it
+        _write_atomic(self.tile_path(level, col, row), buffer.getvalue())
+
+    def _render(self, level: int, region: fitz.IRect) -> np.ndarray:
+        """Render a pixel region of a direct level from the source pages"""
+        scale = self.level_scale(level)
+        margin = border_margin(DEFAULT_BORDER_WIDTH, scale)
+        cells = overlapping_cells(self.cells, self.rects * scale, region, margin)
+        # Source page access is not thread-safe
+        with self._lock:
+            return render_region(self.doc, cells, scale, region)
+
+    def _compose(self, level: int, region: fitz.IRect) -> Image.Image:
+        """Downsample a pixel region of a level from the tiles of the level below"""
+        child_width, child_height = self.level_size(level + 1)
+        child = fitz.IRect(2 * region.x0, 2 * region.y0,
+                           min(2 * region.x1, child_width), min(2 * region.y1, child_height))
+        canvas = Image.new("RGB", (child.width, child.height), "white")
+        first_col, first_row = child.x0 // self.tile_size, child.y0 // self.tile_size
+        last_col, last_row = (child.x1 - 1) // self.tile_size, (child.y1 - 1) // self.tile_size
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                tile_region = self.tile_region(level + 1, col, row)
+                with Image.open(self.get_tile(level + 1, col, row)) as tile:
+                    canvas.paste(tile.convert("RGB"), (tile_region.x0 - child.x0,
+                                                      tile_region.y0 - child.y0))
+        return canvas.resize((region.width, region.height), Image.BOX)
+
+    def get_tile(self, level: int, col: int, row: int) -> Path:
+        """Path of a tile, rendering (and storing) it first if it does not exist yet"""
+        path = self.tile_path(level, col, row)
+        if path.exists():
+            return path
+        cols, rows = self.tile_count(level)
+        if not (0 <= level <= self.max_level and 0 <= col < cols and 0 <= row < rows):
+            raise ValueError(f"No tile {col}_{row} on level {level}")
+
+        region = self.tile_region(level, col, row)
+        if level >= self.min_direct_level:
+            image = Image.fromarray(self._render(level, region))
+        else:
+            image = self._compose(level, region)
+        self._save_tile(level, col, row, image)
+        return path
+
+    def render_block(self, level: int, block_col: int, block_row: int) -> int:
+        """
+        Generate the missing tiles of one BLOCK_TILES × BLOCK_TILES block
+
+        Direct levels render the whole block in one pass and cut it into tiles.
+        Returns the number of tiles in the block.
+        """
+        cols, rows = self.tile_count(level)
+        tiles = [(col, row)
+                 for row in range(block_row * BLOCK_TILES, min((block_row + 1) * BLOCK_TILES, rows))
+                 for col in range(block_col * BLOCK_TILES, min((block_col + 1) * BLOCK_TILES, cols))]
+        missing = [(col, row) for col, row in tiles if not self.tile_path(level, col, row).exists()]
+        if not missing:
+            return len(tiles)
+
+        if level < self.min_direct_level:
+            for col, row in missing:
+                self.get_tile(level, col, row)
+            return len(tiles)
+
+        regions = {tile: self.tile_region(level, *tile) for tile in missing}
+        block = fitz.IRect(min(r.x0 for r in regions.values()), min(r.y0 for r in regions.values()),
+                           max(r.x1 for r in regions.values()), max(r.y1 for r in regions.values()))
+        canvas = self._render(level, block)
+        for (col, row), region in regions.items():
+            pixels = canvas[region.y0 - block.y0:region.y1 - block.y0,
+                            region.x0 - block.x0:region.x1 - block.x0]
+            self._save_tile(level, col, row, Image.fromarray(pixels))
+        return len(tiles)
+
+    def block_count(self, level: int) -> Tuple[int, int]:
+        cols, rows = self.tile_count(level)
+        return math.ceil(cols / BLOCK_TILES), math.ceil(rows / BLOCK_TILES)
+
+    def close(self) -> None:
+        self.doc.close()
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Pyramids opened by this worker process, keyed by their constructor arguments
+_worker_pyramids: Dict[tuple, DeepZoomPyramid] = {}
+
+
+def _render_blocks(options: dict, level: int, blocks: List[Tuple[int, int]]) -> int:
+    """Worker: render blocks of one level, reusing the pyramid across calls"""
+    key = tuple(sorted((k, str(v)) for k, v in options.items()))
+    pyramid = _worker_pyramids.get(key)
+    if pyramid is None:
+        pyramid = _worker_pyramids[key] = DeepZoomPyramid(**options)
+    return sum(pyramid.render_block(level, col, row) for col, row in blocks)
+
+
+def write_pyramid(input_path: Path, output_dir: Path, workers: int = 1,
+                  progress: Optional[ProgressCallback] = None, **options) -> Path:
+    """
+    Generate every tile of a Deep Zoom pyramid
+
+    Levels are written from the most detailed one down, each level split into blocks of
+    tiles that are rendered in parallel. Existing tiles are kept, so an interrupted run
+    resumes where it stopped, unless the settings or the input changed since.
+
+    Args:
+        input_path: Input PDF file path
+        output_dir: Directory receiving the descriptor and the tiles
+        workers: Worker processes
+        progress: Called with (tiles done, total tiles)
+        options: DeepZoomPyramid arguments (n, dpi, tile_size, overlap, tile_format, ...)
+
+    Returns the path of the .dzi descriptor.
+    """
+    options = dict(options, input_path=input_path, output_dir=output_dir)
+    pyramid = DeepZoomPyramid(**options)
+    options.pop("metadata", None)  # Workers lay out from the open document
+    options["input_digest"] = pyramid.input_digest
+    total = sum(cols * rows for cols, rows in map(pyramid.tile_count, range(pyramid.max_level + 1)))
+    done = 0
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for level in range(pyramid.max_level, -1, -1):
+            block_cols, block_rows = pyramid.block_count(level)
+            blocks = [(col, row) for row in range(block_rows) for col in range(block_cols)]
+            if pool is None:
+                results = (pyramid.render_block(level, col, row) for col, row in blocks)
+            else:
+                # A few blocks per task keep the per-task overhead low
+                step = max(1, math.ceil(len(blocks) / (workers * 4)))
+                tasks = [blocks[i:i + step] for i in range(0, len(blocks), step)]
+                results = pool.map(_render_blocks, [options] * len(tasks), [level] * len(tasks), tasks)
+            for count in results:
+                done += count
+                if progress is not None:
+                    progress(done, total)
+        return pyramid.write_descriptor()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        pyramid.close()
+
@@ -0,0 +1,57 @@
+"""Command line of the Deep Zoom pyramid, kept free of PyMuPDF, NumPy and Pillow imports
+so that --help and argument errors are fast (the work happens in pyramid.py)"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from .metadata import default_metadata_index
+from .options import TILE_FORMATS
+
+
+def pyramid_main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="concat_pdf pyramid",
+        description="PDF Thumbnail Grid Tool - Deep Zoom (DZI) tile pyramid of a whole document",
+    )
+    parser.add_argument("input", type=Path, help="Input PDF file path")
+    parser.add_argument("output_dir", type=Path, help="Output directory for the .dzi file and tiles")
+    parser.add_argument("-n", "--columns", type=int, default=None,
+                       help="Number of grid columns (default: roughly square grid)")
+    parser.add_argument("--dpi", type=int, default=72,
+                       help="Resolution of the most detailed zoom level (default: 72)")
+    parser.add_argument("--tile-size", type=int, default=256, help="Tile size in pixels (default: 256)")
+    parser.add_argument("--overlap", type=int, default=1, help="Tile overlap in pixels (default: 1)")
+    parser.add_argument("--tile-format", type=str, default="jpeg", choices=list(TILE_FORMATS),
+                       help="Tile image format (default: jpeg)")
+    parser.add_argument("--image-quality", type=int, default=85,
+                       help="JPEG/WebP quality, 1-100 (default: 85)")
+    parser.add_argument("--gap", type=float, default=3, help="Spacing between thumbnails (points)")
+    parser.add_argument("--padding", type=float, default=10, help="Grid margins (points)")
+    parser.add_argument("--pack-rows", action="store_true",
+                       help="Justify rows so mixed portrait/landscape pages share rows efficiently")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                       help="Worker processes (default: number of CPUs)")
+
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    last_report = [0.0]
+
+    def on_progress(done, total):
+        now = time.perf_counter()
+        if done == total or now - last_report[0] >= 1:
+            last_report[0] = now
+            print(f"Tiles: {done}/{total}")
+
+    from .pyramid import write_pyramid
+
+    path = write_pyramid(args.input, args.output_dir, workers=args.workers, progress=on_progress,
+                         n=args.columns, dpi=args.dpi, tile_size=args.tile_size,
+                         overlap=args.overlap, tile_format=args.tile_format,
+                         image_quality=args.image_quality, gap=args.gap, padding=args.padding,
+                         pack_rows=args.pack_rows, metadata=default_metadata_index())
+    print(f"Successfully generated pyramid: {path} ({time.perf_counter() - start:.1f} s)")
+    return 0
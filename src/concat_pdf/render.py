@@ -0,0 +1,256 @@
+"""Drawing of source pages into grid cells"""
+
+import io
+import time
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple, Union
+
+import fitz
+from PIL import Image
+
+from .cache import ThumbnailCache
+from .multi import DocumentSet, source_page
+from .options import DEFAULT_BORDER_COLOR, DEFAULT_BORDER_WIDTH, IMAGE_FORMATS, RENDER_MODES
+from .profiling import Profiler
+from .progress import ProgressTracker
+
+
+def render_page_image(
+    src_page: fitz.Page,
+    dpi: int,
+    image_format: str = "jpeg",
+    image_quality: int = 85,
+) -> bytes:
+    """
+    Render a source page to compressed image bytes at the given DPI
+
+    Args:
+        src_page: Source PDF page
+        dpi: Rendering resolution of the source page
+        image_format: "jpeg", "png" or "bilevel" (1-bit PNG, best for scanned text)
+        image_quality: JPEG quality (1-100), ignored by the lossless formats
+
+    Returns:
+        Encoded image data, ready for page.insert_image(stream=...)
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {image_format}")
+    if not 1 <= image_quality <= 100:
+        raise ValueError(f"Image quality must be between 1 and 100: {image_quality}")
+
+    if image_format == "bilevel":
+        pix = src_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        # Threshold to 1 bit per pixel, MuPDF keeps BitsPerComponent 1 when embedding
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        img = img.point(lambda v: 255 if v >= 128 else 0, mode="1")
+        buffer = io.BytesIO()
+        img.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
+
+    pix = src_page.get_pixmap(dpi=dpi, alpha=False)
+    if image_format == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=image_quality)
+    return pix.tobytes("png")
+
+
+def cached_page_image(
+    doc: Union[fitz.Document, DocumentSet],
+    idx: int,
+    dpi: int,
+    image_format: str = "jpeg",
+    image_quality: int = 85,
+    cache: Optional[ThumbnailCache] = None,
+    source_digest: Union[str, Sequence[str], None] = None,
+) -> bytes:
+    """
+    render_page_image through the thumbnail cache
+
+    Args:
+        doc: Source document or DocumentSet
+        idx: Source page index
+        dpi, image_format, image_quality: See render_page_image
+        cache: Thumbnail cache, None renders every time
+        source_digest: Content hash of the source file (ThumbnailCache.file_digest), for a
+            DocumentSet one hash per file
+    """
+    if cache is None or source_digest is None:
+        return render_page_image(doc[idx], dpi, image_format, image_quality)
+
+    if isinstance(doc, DocumentSet):
+        # Keyed per file, so a file keeps its thumbnails when other inputs change
+        number, pno = doc.locate(idx)
+        key = cache.make_key(source_digest[number], pno, dpi, image_format, image_quality)
+    else:
+        key = cache.make_key(source_digest, idx, dpi, image_format, image_quality)
+    image_data = cache.get(key)
+    if image_data is None:
+        image_data = render_page_image(doc[idx], dpi, image_format, image_quality)
+        cache.put(key, image_data)
+    return image_data
+
+
+# One output page: list of (source page index, cell rectangle as (x0, y0, x1, y1))
+PageCells = List[Tuple[int, Tuple[float, float, float, float]]]
+
+# RGB color with components from 0 to 1, as PyMuPDF drawing methods take it
+Color = Tuple[float, float, float]
+
+
+def parse_color(color: Union[str, Sequence[float]]) -> Color:
+    """
+    RGB components (0-1) of a color name ("black", "gray50"), "#rrggbb" or an RGB sequence
+
+    Raises ValueError for unknown names and malformed values.
+    """
+    if isinstance(color, str):
+        name = color.strip().lower()
+        if name.startswith("#") and len(name) == 7:
+            try:
+                return tuple(int(name[i:i + 2], 16) / 255 for i in (1, 3, 5))
+            except ValueError:
+                pass
+        elif name.upper() in fitz.utils.getColorList():
+            return tuple(fitz.utils.getColor(name))
+        raise ValueError(f"Unknown color: {color}")
+    rgb = tuple(float(c) for c in color)
+    if len(rgb) != 3 or not all(0 <= c <= 1 for c in rgb):
+        raise ValueError(f"Color must be three components between 0 and 1: {color}")
+    return rgb
+
+
+def draw_borders(page: fitz.Page, rects: Sequence[fitz.Rect], width: float = DEFAULT_BORDER_WIDTH,
+                 color: Color = DEFAULT_BORDER_COLOR) -> None:
+    """
+    Stroke the outlines of rects as a single drawing on page
+
+    Every Page.draw_rect call appends its own content stream with its own graphics state,
+    one Shape for the whole page writes one stream with one stroke of all rectangles.
+    """
+    if not rects or width <= 0:
+        return
+    shape = page.new_shape()
+    for rect in rects:
+        shape.draw_rect(rect)
+    shape.finish(color=color, width=width)
+    shape.commit()
+
+
+def report_pages(tracker: Optional[ProgressTracker], output_doc: fitz.Document,
+                 start: int, end: int) -> None:
+    """Hand output pages start to end - 1 to the tracker's page callback, as one-page PDFs"""
+    if tracker is None or tracker.page_callback is None:
+        return
+    for pno in range(start, end):
+        page_doc = fitz.open()
+        page_doc.insert_pdf(output_doc, from_page=pno, to_page=pno)
+        tracker.page_finished(page_doc.tobytes(garbage=1, deflate=True))
+        page_doc.close()
+
+
+def render_pages(
+    output_doc: fitz.Document,
+    doc: Union[fitz.Document, DocumentSet],
+    page_size: Tuple[float, float],
+    page_cells: Sequence[PageCells],
+    render_mode: str = "vector",
+    dpi: int = 150,
+    image_format: str = "jpeg",
+    image_quality: int = 85,
+    cache: Optional[ThumbnailCache] = None,
+    source_digest: Union[str, Sequence[str], None] = None,
+    tracker: Optional[ProgressTracker] = None,
+    canonical: Optional[Sequence[int]] = None,
+    profiler: Optional[Profiler] = None,
+    border_width: float = DEFAULT_BORDER_WIDTH,
+    border_color: Color = DEFAULT_BORDER_COLOR,
+) -> None:
+    """
+    Append grid pages to output_doc
+
+    Args:
+        output_doc: Document receiving the new pages
+        doc: Source document, or a DocumentSet of several input files
+        page_size: Output page size (width, height) in points
+        page_cells: Cells of each output page, in order
+        render_mode: "vector" or "raster"
+        dpi: Raster rendering resolution
+        image_format: Raster image encoding
+        image_quality: JPEG quality for raster mode
+        cache: Thumbnail cache for raster mode
+        source_digest: Content hash of the source file (one per file for a DocumentSet),
+            required to use the cache
+        tracker: Progress and cancellation, checked before every cell; receives every
+            finished output page when it has a page callback
+        canonical: Index of the first identical page for every source page (see
+            dedup.canonical_pages); identical pages then share one XObject or image
+        profiler: Records drawing time per source page, border time per output page and
+            the number of XObjects and images created
+        border_width: Line width of the cell borders (points), 0 draws none
+        border_color: Border color as RGB components (see parse_color)
+    """
+    # Rendered images of pages that occur more than once, raster mode only
+    shared_images = {}
+    if canonical is not None and render_mode == "raster":
+        repeats = Counter(canonical[idx] for cells in page_cells for idx, _ in cells)
+        shared_images = {idx: None for idx, count in repeats.items() if count > 1}
+    shown_pages = set()
+
+    for cells in page_cells:
+        # Create new page
+        page = output_doc.new_page(width=page_size[0], height=page_size[1])
+        # Overlays are collected and drawn once all cells are placed
+        border_rects = []
+
+        for idx, rect in cells:
+            if tracker is not None:
+                tracker.check()
+
+            img_rect = fitz.Rect(rect)
+            source_idx = idx
+            if canonical is not None:
+                idx = canonical[idx]
+            if profiler is not None:
+                start = time.perf_counter()
+
+            if render_mode == "raster":
+                # Embed a rendered image, output size no longer depends on source content
+                image_data = shared_images.get(idx)
+                if image_data is None:
+                    image_data = cached_page_image(doc, idx, dpi, image_format, image_quality,
+                                                   cache, source_digest)
+                    if idx in shared_images:
+                        shared_images[idx] = image_data
+                # Identical image data is embedded once and referenced by every copy
+                page.insert_image(img_rect, stream=image_data)
+            else:
+                # Draw page directly to new position (more efficient and maintains quality)
+                # PyMuPDF reuses the XObject of a page it has already shown in output_doc
+                src_doc, pno = source_page(doc, idx)
+                page.show_pdf_page(img_rect, src_doc, pno)
+
+            border_rects.append(img_rect)
+
+            if profiler is not None:
+                end = time.perf_counter()
+                profiler.add("render.draw", end - start)
+                profiler.add_page(source_idx, end - start)
+                if render_mode == "raster":
+                    profiler.count("images_inserted")
+                else:
+                    # A small wrapper XObject per cell, plus the page XObject on first use
+                    profiler.count("xobjects_created", 1 if idx in shown_pages else 2)
+                    shown_pages.add(idx)
+
+            if tracker is not None:
+                tracker.advance()
+
+        if profiler is not None:
+            start = time.perf_counter()
+        draw_borders(page, border_rects, border_width, border_color)
+        if profiler is not None:
+            profiler.add("render.border", time.perf_counter() - start)
+
+        report_pages(tracker, output_doc, page.number, page.number + 1)
+
+        if isinstance(doc, DocumentSet):
+            doc.release_graftmaps(output_doc)
@@ -0,0 +1,66 @@
+"""Named save/compression profiles for the output PDF"""
+
+from pathlib import Path
+
+import fitz
+
+from .options import DEFAULT_SAVE_PROFILE, SAVE_PROFILES
+from .sources import Target, is_path, write_document
+
+# JPEG quality used when the smallest profile recompresses images
+REWRITE_IMAGE_QUALITY = 75
+
+
+def save_options(profile: str, incremental: bool = False, appendable: bool = False,
+                 merged: bool = False) -> dict:
+    """
+    Document.save keyword arguments for a profile
+
+    Args:
+        profile: Name of a SAVE_PROFILES entry
+        incremental: Append to the file the document was opened from
+        appendable: Keep the file suitable for later incremental saves; like incremental
+            saves this keeps the compression settings but skips garbage collection and
+            object streams
+        merged: Most pages were copied from a file saved with the same profile, their
+            duplicates are already merged; skips the (slow) duplicate merging pass
+    """
+    if profile not in SAVE_PROFILES:
+        raise ValueError(f"Unknown save profile: {profile}")
+
+    options = {k: v for k, v in SAVE_PROFILES[profile].items() if k != "rewrite_images"}
+    if incremental or appendable:
+        options.pop("garbage", None)
+        options.pop("use_objstms", None)
+    if merged and options.get("garbage", 0) > 2:
+        options["garbage"] = 2
+    if incremental:
+        options.update(incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+    return options
+
+
+def save_document(doc: fitz.Document, output_path: Target, profile: str = DEFAULT_SAVE_PROFILE,
+                  dpi: int = 150, merged: bool = False) -> int:
+    """
+    Save a document with the given profile
+
+    Args:
+        doc: Document to save
+        output_path: Output PDF file path, or a writable binary file object
+        profile: Name of a SAVE_PROFILES entry
+        dpi: Target resolution when the profile recompresses images
+        merged: See save_options
+
+    Returns the size of the saved file in bytes.
+    """
+    options = save_options(profile, merged=merged)
+
+    # Document.rewrite_images needs PyMuPDF 1.24.11 or newer
+    if SAVE_PROFILES[profile].get("rewrite_images") and hasattr(doc, "rewrite_images"):
+        doc.rewrite_images(dpi_threshold=dpi + dpi // 2, dpi_target=dpi,
+                           quality=REWRITE_IMAGE_QUALITY)
+
+    if not is_path(output_path):
+        return write_document(doc, output_path, **options)
+    doc.save(output_path, **options)
+    return Path(output_path).stat().st_size
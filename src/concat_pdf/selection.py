@@ -0,0 +1,83 @@
+"""Page selection - page ranges and sampling, so large inputs are only partly processed
+
+Free of heavy imports, the command line checks range expressions before loading PyMuPDF.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# "5", "1-50", "200-" (to the last page) or "-20" (from the first page)
+_RANGE = re.compile(r"^(\d*)\s*-\s*(\d*)$|^(\d+)$")
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    Parse a page range expression such as "1-50,100,200-"
+
+    Pages are numbered from 1. "200-" runs to the last page, "-20" starts at the first.
+
+    Returns (first, last) page number pairs, last is None for open ranges.
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        match = _RANGE.match(part)
+        if not part or not match or match.group(0) == "-":
+            raise ValueError(f"Invalid page range: {part!r} (expected e.g. 1-50,100,200-)")
+        if match.group(3) is not None:
+            first = last = int(match.group(3))
+        else:
+            first = int(match.group(1)) if match.group(1) else 1
+            last = int(match.group(2)) if match.group(2) else None
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: {part!r}")
+        ranges.append((first, last))
+    return ranges
+
+
+def select_page_indices(
+    total_pages: int,
+    page_ranges: Optional[str] = None,
+    stride: int = 1,
+    sample: Optional[int] = None,
+) -> Optional[List[int]]:
+    """
+    0-based indices of the selected pages, in document order
+
+    The steps apply one after the other: page_ranges picks pages (each at most once),
+    stride keeps every stride-th of them starting with the first, and sample keeps that
+    many evenly spaced pages of the rest, the first and last included.
+
+    Args:
+        total_pages: Pages in the document
+        page_ranges: Range expression, see parse_page_ranges; None means all pages
+        stride: Keep every stride-th page
+        sample: Number of evenly spaced pages to keep, None keeps all
+
+    Returns None when every page is selected.
+    """
+    if stride < 1:
+        raise ValueError(f"Stride must be at least 1: {stride}")
+    if sample is not None and sample < 1:
+        raise ValueError(f"Sample size must be at least 1: {sample}")
+
+    pages = range(total_pages)
+    if page_ranges is not None:
+        selected = set()
+        for first, last in parse_page_ranges(page_ranges):
+            if first > total_pages:
+                raise ValueError(f"Page {first} is out of range, the input has {total_pages} pages")
+            last = total_pages if last is None else min(last, total_pages)
+            selected.update(range(first - 1, last))
+        pages = sorted(selected)
+    pages = pages[::stride]
+    if sample is not None and sample < len(pages):
+        if sample == 1:
+            pages = pages[:1]
+        else:
+            # Integer spacing, exact for any document size
+            pages = [pages[i * (len(pages) - 1) // (sample - 1)] for i in range(sample)]
+
+    if len(pages) == total_pages:
+        return None
+    return list(pages)
@@ -0,0 +1,485 @@
+"""HTTP thumbnail service - asyncio server with a bounded job queue and warm worker processes"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from . import PAGE_SIZES
+from .options import IMAGE_FORMATS, RENDER_MODES, SAVE_PROFILES
+from .profiling import Profiler
+from .selection import parse_page_ranges
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_MAX_BODY_MB = 256
+# Finished async jobs are kept this long (seconds) and at most this many at once
+DEFAULT_RESULT_TTL = 600
+MAX_FINISHED_JOBS = 256
+# Time allowed for a client to send the request line and headers
+HEADER_TIMEOUT = 30
+# Window for the pages per second gauge (seconds)
+RATE_WINDOW = 60
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Query parameters accepted by the render endpoints, with their types
+OPTION_TYPES = {
+    "n": int, "m": int, "dpi": int, "gap": float, "padding": float, "image_quality": int,
+    "render_mode": str, "image_format": str, "orientation": str, "save_profile": str,
+    "page_size": str, "pack_rows": bool, "dedup_pages": bool, "downsample_images": bool,
+    "border": bool, "border_width": float, "border_color": str,
+    "skip_blank": bool, "near_duplicates": str, "blank_coverage": float,
+    "duplicate_difference": float, "page_ranges": str, "page_stride": int, "sample_pages": int,
+}
+OPTION_CHOICES = {
+    "render_mode": RENDER_MODES, "image_format": IMAGE_FORMATS,
+    "orientation": ("portrait", "landscape"), "save_profile": tuple(SAVE_PROFILES),
+    "page_size": tuple(PAGE_SIZES), "near_duplicates": ("skip", "collapse"),
+}
+
+
+def parse_options(query: str) -> dict:
+    """
+    process_pdf keyword arguments from a query string such as "n=5&m=4&render_mode=raster"
+
+    Raises ValueError for unknown parameters and invalid values.
+    """
+    options = {}
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name not in OPTION_TYPES:
+            raise ValueError(f"Unknown parameter: {name}")
+        kind = OPTION_TYPES[name]
+        if kind is bool:
+            options[name] = value.lower() in ("", "1", "true", "yes", "on")
+        else:
+            try:
+                options[name] = kind(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for {name}: {value!r}") from None
+        if name in OPTION_CHOICES and options[name] not in OPTION_CHOICES[name]:
+            raise ValueError(f"{name} must be one of {', '.join(OPTION_CHOICES[name])}")
+
+    if "n" not in options:
+        raise ValueError("Missing parameter: n (number of grid columns)")
+    for name in ("n", "m", "dpi", "page_stride", "sample_pages"):
+        if name in options and options[name] < 1:
+            raise ValueError(f"{name} must be at least 1")
+    if not 1 <= options.get("image_quality", 85) <= 100:
+        raise ValueError("image_quality must be between 1 and 100")
+    # The same checks as the command line, so mistakes are reported before queueing
+    if "page_ranges" in options:
+        try:
+            parse_page_ranges(options["page_ranges"])
+        except ValueError as e:
+            raise ValueError(f"page_ranges: {e}") from None
+    if "border_color" in options:
+        from .render import parse_color  # Loads PyMuPDF for its color names
+        try:
+            parse_color(options["border_color"])
+        except ValueError as e:
+            raise ValueError(f"border_color: {e}") from None
+    if "page_size" in options:
+        options["page_size"] = PAGE_SIZES[options["page_size"]]
+    return options
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _render_job(data: bytes, options: dict) -> Tuple[Optional[bytes], int, float, Optional[str]]:
+    """Worker: build one grid PDF, returning (output, source pages, seconds, error or None)"""
+    from .core import process_pdf_bytes
+    start = time.perf_counter()
+    profiler = Profiler()
+    try:
+        # process_pdf reports progress on stdout, which is of no use here
+        with contextlib.redirect_stdout(io.StringIO()):
+            output = process_pdf_bytes(data, profiler=profiler, **options)
+    except Exception as e:
+        return None, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    return output, profiler.counters["source_pages"], time.perf_counter() - start, None
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, help_text: str) -> List[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{le="{bound:g}"}} {count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.total:.6f}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class Job:
+    """One render request, queued until a worker is free"""
+
+    def __init__(self, data: bytes, options: dict):
+        self.id = uuid.uuid4().hex
+        self.data: Optional[bytes] = data
+        self.options = options
+        self.status = "queued"  # queued, running, done or failed
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[bytes] = None
+        self.error: Optional[str] = None
+        self.pages = 0
+        self.done = asyncio.Event()
+
+    def describe(self) -> dict:
+        """Status as returned by GET /jobs/<id>"""
+        info = {"id": self.id, "status": self.status, "pages": self.pages}
+        if self.finished is not None:
+            info["seconds"] = round(self.finished - self.created, 3)
+        if self.status == "done":
+            info["result"] = f"/jobs/{self.id}/result"
+            info["bytes"] = len(self.result)
+        if self.error is not None:
+            info["error"] = self.error
+        return info
+
+
+class ThumbnailService:
+    """
+    Job queue, worker pool and metrics behind the HTTP endpoints
+
+    Jobs wait in a queue of at most queue_size entries and are taken by one dispatcher
+    task per worker process, so no more jobs run than there are workers. When the
+    queue is full, new requests are rejected (HTTP 429) instead of piling up.
+
+    Args:
+        workers: Worker processes (default: number of CPUs)
+        queue_size: Jobs that may wait for a free worker
+        max_body: Largest accepted upload in bytes
+        result_ttl: Seconds a finished async job is kept for polling
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 max_body: int = DEFAULT_MAX_BODY_MB * 1024 * 1024,
+                 result_ttl: float = DEFAULT_RESULT_TTL):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_body = max_body
+        self.result_ttl = result_ttl
+        self.queue: Optional[asyncio.Queue] = None
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()  # Async jobs, oldest first
+        self.running = 0
+        self._dispatchers: List[asyncio.Task] = []
+        self._restart_lock: Optional[asyncio.Lock] = None
+
+        # Metrics
+        self.jobs_total: Dict[str, int] = {"done": 0, "failed": 0, "rejected": 0}
+        self.pages_total = 0
+        self.latency = Histogram()  # Request to result, queueing included
+        self.render_time = Histogram()  # Time spent in the worker
+        self.queue_wait = Histogram()
+        self._recent_pages: deque = deque()  # (finish time, pages) within RATE_WINDOW
+
+    async def start(self) -> None:
+        """Start the worker processes and wait until all of them are warmed up"""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._restart_lock = asyncio.Lock()
+        self.pool = await self._start_pool()
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def _start_pool(self) -> ProcessPoolExecutor:
+        from .parallel import _warm_up  # Loads PyMuPDF, kept out of 'serve --help'
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        loop = asyncio.get_running_loop()
+        # Concurrent submissions make the pool start all of its processes now
+        await asyncio.gather(*(loop.run_in_executor(pool, _worker_pid) for _ in range(self.workers)))
+        return pool
+
+    async def close(self) -> None:
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, data: bytes, options: dict, keep: bool) -> Job:
+        """
+        Queue a job, raises asyncio.QueueFull when the queue is full
+
+        Args:
+            keep: Remember the job for polling (async endpoint)
+        """
+        job = Job(data, options)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.jobs_total["rejected"] += 1
+            raise
+        if keep:
+            self._prune()
+            self.jobs[job.id] = job
+        return job
+
+    def _prune(self) -> None:
+        """Forget finished async jobs past their TTL, and the oldest ones beyond the limit"""
+        now = time.monotonic()
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for i, job in enumerate(finished):
+            if i < excess or now - job.finished > self.result_ttl:
+                del self.jobs[job.id]
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job.started = time.monotonic()
+            self.queue_wait.observe(job.started - job.created)
+            self.running += 1
+            pool = self.pool
+            try:
+                data, job.data = job.data, None
+                output, pages, seconds, error = await loop.run_in_executor(
+                    pool, _render_job, data, job.options)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory), fail the job and start fresh workers
+                output, pages, seconds, error = None, 0, 0.0, "Worker process crashed"
+                await self._restart_pool(pool)
+            finally:
+                self.running -= 1
+
+            job.finished = time.monotonic()
+            job.pages = pages
+            if error is None:
+                job.status, job.result = "done", output
+                self.pages_total += pages
+                self._recent_pages.append((job.finished, pages))
+                self.render_time.observe(seconds)
+            else:
+                job.status, job.error = "failed", error
+            self.jobs_total[job.status] += 1
+            self.latency.observe(job.finished - job.created)
+            job.done.set()
+
+    async def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken pool, once: every dispatcher that used it sees the same error"""
+        async with self._restart_lock:
+            if self.pool is not broken:
+                return  # Another dispatcher already replaced it
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = await self._start_pool()
+
+    def pages_per_second(self) -> float:
+        now = time.monotonic()
+        while self._recent_pages and now - self._recent_pages[0][0] > RATE_WINDOW:
+            self._recent_pages.popleft()
+        return sum(pages for _, pages in self._recent_pages) / RATE_WINDOW
+
+    def metrics(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            "# HELP concat_pdf_queue_depth Jobs waiting for a worker",
+            "# TYPE concat_pdf_queue_depth gauge",
+            f"concat_pdf_queue_depth {self.queue.qsize()}",
+            "# HELP concat_pdf_queue_capacity Maximum number of waiting jobs",
+            "# TYPE concat_pdf_queue_capacity gauge",
+            f"concat_pdf_queue_capacity {self.queue_size}",
+            "# HELP concat_pdf_jobs_running Jobs being rendered",
+            "# TYPE concat_pdf_jobs_running gauge",
+            f"concat_pdf_jobs_running {self.running}",
+            "# HELP concat_pdf_workers Worker processes",
+            "# TYPE concat_pdf_workers gauge",
+            f"concat_pdf_workers {self.workers}",
+            "# HELP concat_pdf_jobs_total Finished and rejected jobs",
+            "# TYPE concat_pdf_jobs_total counter",
+        ]
+        lines += [f'concat_pdf_jobs_total{{status="{status}"}} {count}'
+                  for status, count in self.jobs_total.items()]
+        lines += [
+            "# HELP concat_pdf_pages_total Source pages rendered",
+            "# TYPE concat_pdf_pages_total counter",
+            f"concat_pdf_pages_total {self.pages_total}",
+            f"# HELP concat_pdf_pages_per_second Source pages rendered per second, last {RATE_WINDOW} s",
+            "# TYPE concat_pdf_pages_per_second gauge",
+            f"concat_pdf_pages_per_second {self.pages_per_second():.3f}",
+        ]
+        lines += self.latency.lines("concat_pdf_job_latency_seconds",
+                                    "Time from request to finished job, queueing included")
+        lines += self.queue_wait.lines("concat_pdf_queue_wait_seconds",
+                                       "Time jobs waited for a worker")
+        lines += self.render_time.lines("concat_pdf_render_seconds",
+                                        "Time spent rendering in a worker")
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one HTTP request per connection"""
+        try:
+            status, headers, body = await self._route(reader)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        except asyncio.LimitOverrunError:
+            status, headers, body = _text(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large")
+
+        head = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Length: {len(body)}",
+                "Connection: close"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, reader: asyncio.StreamReader) -> Tuple[HTTPStatus, dict, bytes]:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return _text(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+
+        if method == "GET" and parts in (["health"], ["healthz"]):
+            return _text(HTTPStatus.OK, "ok")
+        if method == "GET" and parts == ["metrics"]:
+            return (HTTPStatus.OK, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+                    self.metrics().encode("utf-8"))
+
+        if method == "POST" and parts in (["render"], ["jobs"]):
+            if "content-length" not in headers:
+                return _text(HTTPStatus.LENGTH_REQUIRED, "Content-Length is required")
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                length = -1
+            if length < 0:
+                return _text(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+            if length > self.max_body:
+                return _text(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                             f"Upload exceeds {self.max_body} bytes")
+            data = await reader.readexactly(length)
+            try:
+                options = parse_options(url.query)
+            except ValueError as e:
+                return _text(HTTPStatus.BAD_REQUEST, str(e))
+            if not data:
+                return _text(HTTPStatus.BAD_REQUEST, "Empty request body, send the PDF")
+            try:
+                job = self.submit(data, options, keep=parts == ["jobs"])
+            except asyncio.QueueFull:
+                return (HTTPStatus.TOO_MANY_REQUESTS, {"Retry-After": "1",
+                        "Content-Type": "text/plain; charset=utf-8"}, b"Job queue is full\n")
+
+            if parts == ["jobs"]:
+                return _json(HTTPStatus.ACCEPTED, job.describe(), {"Location": f"/jobs/{job.id}"})
+            await job.done.wait()
+            if job.status == "failed":
+                return _text(HTTPStatus.UNPROCESSABLE_ENTITY, job.error)
+            return (HTTPStatus.OK, {"Content-Type": "application/pdf", "X-Source-Pages": str(job.pages)},
+                    job.result)
+
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            self._prune()
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return _text(HTTPStatus.NOT_FOUND, "Unknown or expired job")
+            if method == "GET" and len(parts) == 2:
+                return _json(HTTPStatus.OK, job.describe())
+            if method == "GET" and parts[2:] == ["result"]:
+                if job.status == "done":
+                    return HTTPStatus.OK, {"Content-Type": "application/pdf"}, job.result
+                if job.status == "failed":
+                    return _json(HTTPStatus.UNPROCESSABLE_ENTITY, job.describe())
+                return _json(HTTPStatus.CONFLICT, job.describe())
+            if method == "DELETE" and len(parts) == 2:
+                if job.finished is None:
+                    return _json(HTTPStatus.CONFLICT, job.describe())
+                del self.jobs[job.id]
+                return _text(HTTPStatus.OK, "deleted")
+
+        return _text(HTTPStatus.NOT_FOUND, "Not found")
+
+
+def _text(status: HTTPStatus, message: str) -> Tuple[HTTPStatus, dict, bytes]:
+    return status, {"Content-Type": "text/plain; charset=utf-8"}, (message + "\n").encode("utf-8")
+
+
+def _json(status: HTTPStatus, value: dict, headers: Optional[dict] = None) -> Tuple[HTTPStatus, dict, bytes]:
+    return (status, {"Content-Type": "application/json", **(headers or {})},
+            json.dumps(value).encode("utf-8"))
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **service_options) -> None:
+    """Run the HTTP service until cancelled, see ThumbnailService for the options"""
+    service = ThumbnailService(**service_options)
+    await service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Serving on http://{host}:{port} with {service.workers} worker(s), "
+          f"queue size {service.queue_size}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def serve_main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="concat_pdf serve",
+        description="PDF Thumbnail Grid Tool - HTTP thumbnail service",
+        epilog="POST a PDF to /render?n=5&m=4 for the grid PDF, or to /jobs?n=5 to poll "
+               "/jobs/<id> and fetch /jobs/<id>/result; metrics at /metrics",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Listen address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                       help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                       help=f"Jobs waiting for a worker before requests get 429 (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY_MB, metavar="MB",
+                       help=f"Largest accepted upload (default: {DEFAULT_MAX_BODY_MB} MB)")
+    parser.add_argument("--result-ttl", type=float, default=DEFAULT_RESULT_TTL, metavar="SECONDS",
+                       help=f"How long finished async jobs are kept (default: {DEFAULT_RESULT_TTL})")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, queue_size=args.queue_size,
+                          max_body=args.max_body * 1024 * 1024, result_ttl=args.result_ttl))
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,230 @@
+"""Direct image output - grid pages as PNG/JPEG/WebP contact sheets, without an intermediate PDF"""
+
+import math
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import fitz
+import numpy as np
+from PIL import Image
+
+from .options import DEFAULT_BORDER_COLOR, DEFAULT_BORDER_WIDTH, SHEET_FORMATS, is_sheet_output
+from .profiling import Profiler, profile_stage
+from .progress import ProgressTracker
+from .render import Color, PageCells
+
+
+def sheet_paths(output_path: Path, output_pages: int, tiles: Tuple[int, int] = (1, 1)) -> List[List[Path]]:
+    """
+    Output file names, one list of tile paths (row by row) per grid page
+
+    A single untiled page is written to output_path itself, otherwise the page number
+    and the tile row/column are appended: sheet_0002.png, sheet_0002_r000_c001.png
+    """
+    output_path = Path(output_path)
+    rows, cols = tiles
+    paths = []
+    for page in range(output_pages):
+        stem = output_path.stem + (f"_{page + 1:04d}" if output_pages > 1 else "")
+        if rows * cols == 1:
+            paths.append([output_path.with_name(stem + output_path.suffix)])
+        else:
+            paths.append([output_path.with_name(f"{stem}_r{row:03d}_c{col:03d}{output_path.suffix}")
+                          for row in range(rows) for col in range(cols)])
+    return paths
+
+
+def _fill(canvas: np.ndarray, x0: int, y0: int, x1: int, y1: int,
+          value: Union[int, np.ndarray] = 0) -> None:
+    """Fill a pixel rectangle, clipped to the canvas"""
+    height, width = canvas.shape[:2]
+    x0, y0 = max(x0, 0), max(y0, 0)
+    x1, y1 = min(x1, width), min(y1, height)
+    if x0 < x1 and y0 < y1:
+        canvas[y0:y1, x0:x1] = value
+
+
+def overlapping_cells(cells: PageCells, rects: np.ndarray, region: fitz.IRect,
+                      margin: float = 0) -> PageCells:
+    """
+    Cells whose pixel rectangle, grown by margin, overlaps region
+
+    Args:
+        cells: Cells of a grid page
+        rects: (N, 4) pixel rectangles of the cells
+        region: Pixel rectangle
+        margin: Extra pixels around each cell, e.g. the border width
+    """
+    overlap = ((rects[:, 0] - margin < region.x1) & (rects[:, 2] + margin > region.x0)
+               & (rects[:, 1] - margin < region.y1) & (rects[:, 3] + margin > region.y0))
+    return [cells[i] for i in np.flatnonzero(overlap)]
+
+
+def border_margin(border_width: float, scale: float) -> int:
+    """Border width in pixels, at least one pixel unless borders are off"""
+    return max(1, round(border_width * scale)) if border_width > 0 else 0
+
+
+def render_region(
+    doc: fitz.Document,
+    cells: PageCells,
+    scale: float,
+    region: fitz.IRect,
+    tracker: Optional[ProgressTracker] = None,
+    profiler: Optional[Profiler] = None,
+    border_width: float = DEFAULT_BORDER_WIDTH,
+    border_color: Color = DEFAULT_BORDER_COLOR,
+) -> np.ndarray:
+    """
+    Render the part of one grid page inside region into an RGB array
+
+    Each cell is rendered straight at its final size and position, clipped to the
+    region, so every pixel is rendered exactly once even when a cell spans several tiles.
+
+    Args:
+        doc: Source document
+        cells: Cells overlapping the region, rectangles in points
+        scale: Pixels per point (dpi / 72)
+        region: Pixel rectangle of the grid page to render
+        tracker: Cancellation, checked before every cell
+        profiler: Records drawing time per source page
+        border_width: Cell border width (points), 0 draws none
+        border_color: Border color as RGB components (0-1)
+    """
+    canvas = np.full((region.height, region.width, 3), 255, dtype=np.uint8)
+    border = border_margin(border_width, scale)
+    half = border // 2
+    border_value = np.array([round(c * 255) for c in border_color], dtype=np.uint8)
+
+    for idx, rect in cells:
+        if tracker is not None:
+            tracker.check()
+        if profiler is not None:
+            start = time.perf_counter()
+
+        cell = fitz.Rect(rect) * scale  # Pixel coordinates on the grid page
+        visible = cell & fitz.Rect(region)
+        page = doc[idx]
+        page_rect = page.rect
+        # Source page -> region pixels, then clip to the visible part of the cell
+        matrix = fitz.Matrix(cell.width / page_rect.width, 0, 0, cell.height / page_rect.height,
+                             cell.x0 - region.x0, cell.y0 - region.y0)
+        if not visible.is_empty:  # Otherwise only the border reaches into the region
+            clip = None
+            if visible != cell:
+                clip = fitz.Rect(visible.x0 - region.x0, visible.y0 - region.y0,
+                                 visible.x1 - region.x0, visible.y1 - region.y0) * ~matrix
+            pix = page.get_pixmap(matrix=matrix, clip=clip, alpha=False, colorspace=fitz.csRGB)
+            samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, 3)
+
+            # Paste, dropping the rounding fringe outside the region
+            x0, y0 = max(pix.x, 0), max(pix.y, 0)
+            x1, y1 = min(pix.x + pix.width, region.width), min(pix.y + pix.height, region.height)
+            if x0 < x1 and y0 < y1:
+                canvas[y0:y1, x0:x1] = samples[y0 - pix.y:y1 - pix.y, x0 - pix.x:x1 - pix.x]
+
+        # Border, centered on the cell edge like the PDF stroke
+        if border:
+            bx0, by0 = round(cell.x0) - region.x0 - half, round(cell.y0) - region.y0 - half
+            bx1, by1 = round(cell.x1) - region.x0 - half, round(cell.y1) - region.y0 - half
+            _fill(canvas, bx0, by0, bx1 + border, by0 + border, border_value)
+            _fill(canvas, bx0, by1, bx1 + border, by1 + border, border_value)
+            _fill(canvas, bx0, by0, bx0 + border, by1 + border, border_value)
+            _fill(canvas, bx1, by0, bx1 + border, by1 + border, border_value)
+
+        if profiler is not None:
+            elapsed = time.perf_counter() - start
+            profiler.add("render.draw", elapsed)
+            profiler.add_page(idx, elapsed)
+
+    return canvas
+
+
+def render_sheets(
+    doc: fitz.Document,
+    output_path: Path,
+    page_size: Tuple[float, float],
+    page_cells: Sequence[PageCells],
+    dpi: int = 150,
+    image_quality: int = 85,
+    tile_size: Optional[int] = None,
+    tracker: Optional[ProgressTracker] = None,
+    profiler: Optional[Profiler] = None,
+    border_width: float = DEFAULT_BORDER_WIDTH,
+    border_color: Color = DEFAULT_BORDER_COLOR,
+) -> List[Path]:
+    """
+    Write grid pages as images
+
+    Args:
+        doc: Source document
+        output_path: Image file path, the suffix (.png, .jpg, .jpeg, .webp) picks the format
+        page_size: Grid page size (width, height) in points
+        page_cells: Cells of each grid page, in order
+        dpi: Output resolution
+        image_quality: JPEG/WebP quality (1-100)
+        tile_size: Split every grid page into tiles of at most tile_size × tile_size
+            pixels, rendered and written one at a time so memory stays bounded by the
+            tile size; None writes each grid page as one image
+        tracker: Progress and cancellation
+        profiler: Stage timing, encoding is recorded as "save"
+        border_width, border_color: Cell borders, see render_region
+
+    Returns the paths of all written files. If rendering fails or is cancelled, the
+    files written so far are deleted.
+    """
+    suffix = Path(output_path).suffix.lower()
+    if suffix not in SHEET_FORMATS:
+        raise ValueError(f"Unsupported image output format: {suffix}")
+    image_format, max_side = SHEET_FORMATS[suffix]
+
+    scale = dpi / 72
+    width, height = math.ceil(page_size[0] * scale), math.ceil(page_size[1] * scale)
+    tile_width = min(tile_size, width) if tile_size else width
+    tile_height = min(tile_size, height) if tile_size else height
+    if max(tile_width, tile_height) > max_side:
+        raise ValueError(f"{image_format} images are limited to {max_side} pixels, the grid page "
+                         f"is {width} x {height}; lower the DPI or use a tile size")
+    tiles = (math.ceil(height / tile_height), math.ceil(width / tile_width))
+
+    margin = border_margin(border_width, scale)  # Borders reach this far outside a cell
+    save_options = {}
+    if image_format in ("JPEG", "WEBP"):
+        save_options["quality"] = image_quality
+
+    written = []
+    try:
+        for cells, paths in zip(page_cells, sheet_paths(output_path, len(page_cells), tiles)):
+            # Cell rectangles in pixels, to pick the cells of every tile without a Python loop
+            rects = np.array([rect for _, rect in cells], dtype=np.float64).reshape(-1, 4) * scale
+            # Pixel holding the bottom-right corner, a cell counts as done with that tile
+            last_x = np.ceil(rects[:, 2]).astype(np.int64) - 1
+            last_y = np.ceil(rects[:, 3]).astype(np.int64) - 1
+
+            for tile, path in enumerate(paths):
+                row, col = divmod(tile, tiles[1])
+                x0, y0 = col * tile_width, row * tile_height
+                region = fitz.IRect(x0, y0, min(x0 + tile_width, width), min(y0 + tile_height, height))
+                tile_cells = overlapping_cells(cells, rects, region, margin)
+                with profile_stage(profiler, "render"):
+                    canvas = render_region(doc, tile_cells, scale, region, tracker, profiler,
+                                           border_width, border_color)
+
+                with profile_stage(profiler, "save"):
+                    Image.fromarray(canvas).save(path, image_format, dpi=(dpi, dpi), **save_options)
+                written.append(path)
+
+                if tracker is not None:
+                    tracker.advance(int(np.count_nonzero(
+                        (last_x >= region.x0) & (last_x < region.x1)
+                        & (last_y >= region.y0) & (last_y < region.y1))))
+    except BaseException:
+        for path in written:
+            path.unlink(missing_ok=True)
+        raise
+
+    if profiler is not None:
+        profiler.count("bytes_written", sum(path.stat().st_size for path in written))
+        profiler.count("images_written", len(written))
+    return written
@@ -0,0 +1,79 @@
+"""In-memory input and output - bytes, buffers and file-like objects instead of file paths"""
+
+import hashlib
+import io
+import mmap
+import os
+import stat
+from typing import BinaryIO, Union
+
+import fitz
+
+# Anything process_pdf accepts as input: a file path, a buffer or a binary file object
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap, BinaryIO]
+
+# Anything process_pdf accepts as output: a file path or a writable binary file object
+Target = Union[str, os.PathLike, BinaryIO]
+
+
+def is_path(obj) -> bool:
+    """True if obj names a file, False for buffers and file objects"""
+    return isinstance(obj, (str, os.PathLike))
+
+
+def source_name(source: Source) -> str:
+    """Short description of a source for messages"""
+    if is_path(source):
+        return str(source)
+    name = getattr(source, "name", None)
+    return f"<{name}>" if isinstance(name, str) else f"<{type(source).__name__}>"
+
+
+def source_buffer(source: Source) -> Union[bytes, memoryview]:
+    """
+    Contents of an in-memory source, without copying them where possible
+
+    bytes, bytearray, memoryview and mmap objects are used as they are; BytesIO objects
+    through their internal buffer; file objects on a regular file are memory-mapped. Only
+    other streams (pipes, sockets, stdin fed by another process) are read into memory.
+    File objects are read from their current position.
+    """
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        # PyMuPDF copies a bytearray to bytes, but uses a memoryview in place
+        return memoryview(source).cast("B")
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()[source.tell():]
+
+    try:
+        fd = source.fileno()
+        is_regular_file = stat.S_ISREG(os.fstat(fd).st_mode) and os.fstat(fd).st_size > 0
+    except (AttributeError, OSError, ValueError):
+        is_regular_file = False
+    if is_regular_file:
+        # The mapping stays alive as long as the returned view
+        return memoryview(mmap.mmap(fd, 0, access=mmap.ACCESS_READ))[source.tell():]
+    return source.read()
+
+
+def buffer_digest(buffer: Union[bytes, memoryview]) -> str:
+    """SHA-256 of in-memory content, the counterpart of ThumbnailCache.file_digest"""
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def write_document(doc: fitz.Document, target: BinaryIO, **save_options) -> int:
+    """
+    Save a document to a writable binary file object, returns the number of bytes written
+
+    Document.save treats any object with a name attribute (open files, sys.stdout) as
+    that file name and reopens it, and seeks while writing, which pipes do not allow.
+    Only BytesIO is saved to directly, other targets get the serialized document.
+    """
+    if isinstance(target, io.BytesIO):
+        start = target.tell()
+        doc.save(target, **save_options)
+        return target.tell() - start
+    data = doc.tobytes(**save_options)
+    target.write(data)
+    return len(data)
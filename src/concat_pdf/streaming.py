@@ -0,0 +1,101 @@
+"""Bounded-memory output - write grid pages to disk in batches"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+import fitz
+
+from .images import ImageDownsampler
+from .multi import DocumentSet
+from .parallel import render_parallel
+from .profiling import Profiler, profile_stage
+from .progress import ProgressTracker
+from .render import PageCells, render_pages
+from .saving import DEFAULT_SAVE_PROFILE, save_options
+
+
+def render_streaming(
+    output_path: Path,
+    doc: fitz.Document,
+    input_path: Union[Path, DocumentSet],
+    page_size: Tuple[float, float],
+    page_cells: Sequence[PageCells],
+    render_options: dict,
+    batch_pages: int,
+    workers: int = 1,
+    save_profile: str = DEFAULT_SAVE_PROFILE,
+    tracker: Optional[ProgressTracker] = None,
+    profiler: Optional[Profiler] = None,
+    downsampler: Optional[ImageDownsampler] = None,
+) -> None:
+    """
+    Render output pages batch by batch, appending each batch to output_path
+
+    The first batch is saved normally, later batches reopen the file, add their pages and
+    are written with an incremental save, so only one batch of output pages is ever held
+    in memory. Objects shared between batches (fonts, repeated images) are copied once per
+    batch and there is no final garbage collection pass, which makes the file somewhat
+    larger than a non-streaming run. Only the stream compression settings of the save
+    profile apply.
+
+    Args:
+        output_path: Output PDF file path
+        doc: Source document
+        input_path: Input PDF file path or DocumentSet, opened by worker processes
+        page_size: Output page size (width, height) in points
+        page_cells: Cells of each output page, in order
+        render_options: Keyword arguments for render_pages
+        batch_pages: Output pages per batch
+        workers: Number of worker processes, the pool is shared by all batches
+        save_profile: Name of a SAVE_PROFILES entry
+        tracker: Progress and cancellation
+        profiler: Stage timing, batches add up in the "render" and "save" stages
+        downsampler: Downsamples the images of each batch before it is saved; images
+            repeated in later batches reuse the resampled data
+
+    If rendering fails or is cancelled after the first batch was written, the partial
+    output file is deleted.
+    """
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    else:
+        pool = nullcontext()
+
+    written = False
+    output_doc = None
+    try:
+        with pool as executor:
+            for start in range(0, len(page_cells), batch_pages):
+                batch = page_cells[start:start + batch_pages]
+                output_doc = fitz.open() if start == 0 else fitz.open(output_path)
+
+                with profile_stage(profiler, "render"):
+                    if workers > 1 and len(batch) > 1:
+                        render_parallel(output_doc, input_path, page_size, batch, render_options,
+                                        workers, executor=executor, tracker=tracker,
+                                        profiler=profiler)
+                    else:
+                        render_pages(output_doc, doc, page_size, batch, tracker=tracker,
+                                     profiler=profiler, **render_options)
+
+                if downsampler is not None:
+                    with profile_stage(profiler, "downsample"):
+                        replaced = downsampler.downsample(output_doc, len(output_doc) - len(batch))
+                    if profiler is not None:
+                        profiler.count("images_downsampled", replaced)
+
+                with profile_stage(profiler, "save"):
+                    if start == 0:
+                        output_doc.save(output_path, **save_options(save_profile, appendable=True))
+                        written = True
+                    else:
+                        output_doc.save(output_path, **save_options(save_profile, incremental=True))
+                    output_doc.close()
+    except BaseException:
+        if output_doc is not None and not output_doc.is_closed:
+            output_doc.close()
+        if written:
+            Path(output_path).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,352 @@
+"""Watch-folder mode - process PDF files as they arrive in a directory"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import add_layout_arguments, layout_options
+from .batch import _process_one, output_path_for
+from .cache import _write_atomic
+
+# Seconds a file's size and modification time must stay unchanged before it is processed
+DEFAULT_SETTLE = 2.0
+# Directory rescan interval in polling mode, and the safety rescan interval with inotify
+DEFAULT_POLL_INTERVAL = 2.0
+INOTIFY_RESCAN_INTERVAL = 60.0
+# Main loop tick, also the resolution of the settle check
+TICK = 0.25
+STATE_VERSION = 1
+
+# inotify(7) constants
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class _Inotify:
+    """Minimal inotify binding through ctypes, reporting changed file names in one directory"""
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CREATE | _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        """Names changed within timeout seconds, and whether events were lost (overflow)"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return [], False
+        names, overflow = [], False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, event_mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if event_mask & _IN_Q_OVERFLOW:
+                    overflow = True
+                elif name:
+                    names.append(os.fsdecode(name))
+        return names, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _open_inotify(directory: Path) -> Optional[_Inotify]:
+    """inotify watch on directory, None where inotify is not available (non-Linux)"""
+    try:
+        return _Inotify(directory)
+    except (OSError, AttributeError):
+        return None
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns) of a file, None if it is gone"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Watcher:
+    """
+    Process PDF files arriving in a directory through a persistent worker pool
+
+    A file is picked up once its size and modification time have been stable for
+    settle seconds, so half-written scans are never read. Outputs are written to a
+    temporary name and renamed. Every finished (or failed) input is recorded with its
+    size and modification time in a JSON state file, so after a restart only new or
+    changed files are processed. When a worker crashes, the files that were running
+    with it are processed again one at a time, so only the file that crashes workers
+    is recorded as failed.
+
+    Args:
+        directory: Directory to watch (not recursive)
+        out_dir: Directory receiving the output files, outside of directory
+        jobs: Files processed at the same time (worker processes); a file is never
+            processed by two workers at once, changes during processing are picked
+            up after the running job
+        settle: Seconds without changes before a file is processed
+        poll_interval: Rescan interval when inotify is unavailable or disabled
+        state_path: State file (default: out_dir/.concat_pdf_watch.json)
+        suffix: Appended to the input file name stem to form the output name
+        use_inotify: Set False to always poll, e.g. on network shares where inotify
+            does not see changes made by other machines
+        **options: Keyword arguments for process_pdf
+    """
+
+    def __init__(self, directory: Path, out_dir: Path, jobs: Optional[int] = None,
+                 settle: float = DEFAULT_SETTLE, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 state_path: Optional[Path] = None, suffix: str = "_thumbnails",
+                 use_inotify: bool = True, **options):
+        self.directory = Path(directory).resolve()
+        self.out_dir = Path(out_dir).resolve()
+        if self.out_dir == self.directory or self.directory in self.out_dir.parents:
+            # Outputs would land among (or below) the watched inputs
+            raise ValueError(f"Output directory {self.out_dir} must not be inside the watched "
+                             f"directory {self.directory}")
+        self.jobs = jobs or os.cpu_count() or 1
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.state_path = Path(state_path) if state_path else self.out_dir / ".concat_pdf_watch.json"
+        self.suffix = suffix
+        self.use_inotify = use_inotify
+        self.options = options
+
+        self.state: Dict[str, dict] = self._load_state()
+        self.settling: Dict[Path, Tuple[Tuple[int, int], float]] = {}  # path -> (stamp, since)
+        self.ready: deque = deque()
+        self.running: Dict[Future, Tuple[Path, Tuple[int, int]]] = {}
+        self.changed_while_running: set = set()
+        self.pool_broken = False
+        self.crashed_with: set = set()  # Files running when the current pool broke
+        self.suspects: set = set()  # Files to run alone, they may have crashed a worker
+
+    def _load_state(self) -> Dict[str, dict]:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if state.get("version") != STATE_VERSION:
+            return {}
+        return state.get("files", {})
+
+    def _save_state(self) -> None:
+        data = json.dumps({"version": STATE_VERSION, "files": self.state}, indent=1)
+        _write_atomic(self.state_path, data.encode("utf-8"))
+
+    def _is_candidate(self, path: Path) -> bool:
+        return (path.suffix.lower() == ".pdf" and path.parent == self.directory
+                and not path.name.startswith("."))
+
+    def note(self, path: Path) -> None:
+        """Start (or restart) the settle timer of a new or changed file"""
+        if not self._is_candidate(path):
+            return
+        stamp = _stamp(path)
+        if stamp is None:
+            self.settling.pop(path, None)
+            return
+        if any(running_path == path for running_path, _ in self.running.values()):
+            self.changed_while_running.add(path)
+            return
+        if path in self.ready:
+            return
+        record = self.state.get(str(path))
+        if record is not None and (record["size"], record["mtime_ns"]) == stamp:
+            return  # Finished earlier with this exact content
+        previous = self.settling.get(path)
+        if previous is None or previous[0] != stamp:
+            self.settling[path] = (stamp, time.monotonic())
+
+    def scan(self) -> None:
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                self.note(self.directory / entry.name)
+
+    def _check_settled(self) -> None:
+        now = time.monotonic()
+        for path, (stamp, since) in list(self.settling.items()):
+            current = _stamp(path)
+            if current is None:
+                del self.settling[path]
+            elif current != stamp:
+                self.settling[path] = (current, now)
+            elif now - since >= self.settle:
+                del self.settling[path]
+                self.ready.append(path)
+
+    def _submit(self, pool: ProcessPoolExecutor) -> None:
+        while self.ready and len(self.running) < self.jobs and not self.pool_broken:
+            if self.running and (self.ready[0] in self.suspects or any(
+                    running_path in self.suspects for running_path, _ in self.running.values())):
+                break  # Suspects run alone
+            path = self.ready.popleft()
+            stamp = _stamp(path)
+            if stamp is None:
+                self.suspects.discard(path)
+                continue
+            output_path = output_path_for(path, self.out_dir, self.suffix)
+            future = pool.submit(_process_one, path, output_path, self.options)
+            self.running[future] = (path, stamp)
+            print(f"Processing {path.name}")
+
+    def _collect(self, futures) -> None:
+        for future in futures:
+            path, stamp = self.running.pop(future)
+            try:
+                seconds, error = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory) and took every running job with it
+                if not self.pool_broken:
+                    self.pool_broken = True
+                    self.crashed_with = {path} | {p for p, _ in self.running.values()}
+                if len(self.crashed_with) > 1:
+                    # Which file crashed it is unknown, run each again on its own
+                    self.suspects.add(path)
+                    self.ready.appendleft(path)
+                    self.changed_while_running.discard(path)
+                    print(f"{path.name}: worker process crashed, retrying on its own")
+                    continue
+                # Ran alone, so it is the culprit; recorded as failed so a file that
+                # crashes workers is not retried forever
+                seconds, error = 0.0, "worker process crashed"
+            self.suspects.discard(path)
+            status = "done" if error is None else f"failed: {error}"
+            print(f"{path.name}: {status} ({seconds:.2f}s)")
+            # Failed files are recorded too, they are retried once they change
+            self.state[str(path)] = {
+                "size": stamp[0], "mtime_ns": stamp[1], "status": status,
+                "output": str(output_path_for(path, self.out_dir, self.suffix)),
+                "seconds": round(seconds, 3), "finished": time.time(),
+            }
+            self._save_state()
+            if path in self.changed_while_running:
+                self.changed_while_running.discard(path)
+                self.note(path)
+
+    def idle(self) -> bool:
+        return not (self.settling or self.ready or self.running)
+
+    def run(self, stop: Optional[threading.Event] = None, once: bool = False) -> None:
+        """
+        Watch until stop is set (or KeyboardInterrupt)
+
+        Args:
+            stop: Event ending the loop, running jobs are finished first
+            once: Process the files present at start (after they settle), then return
+        """
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        inotify = _open_inotify(self.directory) if self.use_inotify and not once else None
+        rescan_interval = INOTIFY_RESCAN_INTERVAL if inotify is not None else self.poll_interval
+        if not once:
+            mode = "inotify" if inotify is not None else f"polling every {self.poll_interval:g}s"
+            print(f"Watching {self.directory} ({mode}), outputs in {self.out_dir}")
+
+        pool = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            self.scan()
+            last_scan = time.monotonic()
+            while not (stop is not None and stop.is_set()):
+                if self.running:
+                    done, _ = wait(list(self.running), timeout=0 if inotify else TICK,
+                                   return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                if inotify is not None:
+                    names, overflow = inotify.read(TICK)
+                    for name in names:
+                        self.note(self.directory / name)
+                    if overflow:
+                        last_scan = 0  # Events were lost, rescan now
+                elif not self.running:
+                    time.sleep(TICK)
+
+                if not once and time.monotonic() - last_scan >= rescan_interval:
+                    self.scan()
+                    last_scan = time.monotonic()
+                self._check_settled()
+                if self.pool_broken and not self.running:
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(max_workers=self.jobs)
+                    self.pool_broken = False
+                    self.crashed_with = set()
+                self._submit(pool)
+                if once and self.idle():
+                    break
+        finally:
+            if self.running:
+                print(f"Waiting for {len(self.running)} running job(s)")
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Interrupted jobs are not recorded and run again after a restart
+            self._collect([future for future in list(self.running) if future.done()
+                           and not future.cancelled() and future.exception() is None])
+            if inotify is not None:
+                inotify.close()
+
+
+def watch_main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="concat_pdf watch",
+        description="PDF Thumbnail Grid Tool - Process PDF files as they arrive in a directory",
+    )
+    parser.add_argument("directory", type=Path, help="Directory to watch")
+    parser.add_argument("--out-dir", type=Path, required=True, help="Output directory")
+    add_layout_arguments(parser)
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                       help="Files processed at the same time (default: number of CPUs)")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE, metavar="SECONDS",
+                       help=f"Wait until a file has not changed for SECONDS (default: {DEFAULT_SETTLE:g})")
+    parser.add_argument("--poll", action="store_true",
+                       help="Poll the directory instead of using inotify (e.g. network shares)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                       metavar="SECONDS", help=f"Polling interval (default: {DEFAULT_POLL_INTERVAL:g})")
+    parser.add_argument("--state", type=Path, default=None,
+                       help="State file of finished inputs (default: <out-dir>/.concat_pdf_watch.json)")
+    parser.add_argument("--suffix", type=str, default="_thumbnails",
+                       help="Output file name suffix (default: _thumbnails)")
+    parser.add_argument("--once", action="store_true",
+                       help="Process the files present now and exit, e.g. from cron")
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        parser.error(f"not a directory: {args.directory}")
+
+    try:
+        watcher = Watcher(args.directory, args.out_dir, jobs=args.jobs, settle=args.settle,
+                          poll_interval=args.poll_interval, state_path=args.state,
+                          suffix=args.suffix, use_inotify=not args.poll, **layout_options(args))
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("Stopped")
+    return 0
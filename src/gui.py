@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import time
 import sys
 from pathlib import Path
 from typing import Optional
@@ -8,14 +9,31 @@ import webbrowser
 
 # Import core functionality
 sys.path.insert(0, str(Path(__file__).parent))
-from concat_pdf import process_pdf
+# Light imports only, PyMuPDF is loaded in the background once the window is up
+from concat_pdf import (DEFAULT_SAVE_PROFILE, SAVE_PROFILES, ProcessingCancelled, Profiler,
+                        ThumbnailCache, default_metadata_index, parse_page_ranges,
+                        select_page_indices)
+
+
+def preload_core():
+    """Import the processing modules so the first Generate click does not wait for them"""
+    import concat_pdf.core
+
+
+def format_duration(seconds):
+    """Format seconds as m:ss or h:mm:ss"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
 
 
 class PDFThumbnailApp:
     def __init__(self, root):
         self.root = root
         self.root.title("PDF Thumbnail Grid Tool v0.9.9")
-        self.root.geometry("700x600")
+        self.root.geometry("700x660")
         self.root.resizable(False, False)
 
         # Set application icon (if available)
@@ -33,8 +51,24 @@ class PDFThumbnailApp:
         self.dpi = tk.IntVar(value=150)
         self.gap = tk.DoubleVar(value=3)
         self.padding = tk.DoubleVar(value=10)
+        self.render_mode = tk.StringVar(value="vector")
+        self.image_format = tk.StringVar(value="jpeg")
+        self.use_cache = tk.BooleanVar(value=True)
+        self.save_profile = tk.StringVar(value=DEFAULT_SAVE_PROFILE)
+        self.pack_rows = tk.BooleanVar(value=False)
+        self.draw_border = tk.BooleanVar(value=True)
+        self.downsample_images = tk.BooleanVar(value=False)
+        self.skip_blank = tk.BooleanVar(value=False)
+        self.skip_near_duplicates = tk.BooleanVar(value=False)
+        self.page_ranges = tk.StringVar(value="")  # Empty means all pages
+        self.page_stride = tk.IntVar(value=1)
+        self.sample_pages = tk.IntVar(value=0)  # 0 means no sampling
+        self.show_timings = tk.BooleanVar(value=False)
 
         self.processing = False
+        self.cancel_event = None
+        self.last_progress_update = 0.0
+        self.profiler = None
 
         self.create_widgets()
 
@@ -94,6 +128,31 @@ class PDFThumbnailApp:
                                    command=self.auto_calculate_rows)
         auto_calc_btn.grid(row=0, column=5)
 
+        pack_check = ttk.Checkbutton(grid_frame, text="Pack mixed page sizes into rows",
+                                     variable=self.pack_rows)
+        pack_check.grid(row=1, column=1, columnspan=5, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+
+        blank_check = ttk.Checkbutton(grid_frame, text="Skip blank pages", variable=self.skip_blank)
+        blank_check.grid(row=2, column=1, columnspan=2, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+
+        similar_check = ttk.Checkbutton(grid_frame, text="Skip near-duplicate pages",
+                                        variable=self.skip_near_duplicates)
+        similar_check.grid(row=2, column=3, columnspan=3, sticky=tk.W, pady=(5, 0))
+
+        # Page selection, e.g. a quick overview of a long document
+        selection_frame = ttk.Frame(grid_frame)
+        selection_frame.grid(row=3, column=1, columnspan=5, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+        ttk.Label(selection_frame, text="Pages:").grid(row=0, column=0, padx=(0, 5))
+        ttk.Entry(selection_frame, textvariable=self.page_ranges, width=14).grid(row=0, column=1)
+        ttk.Label(selection_frame, text="Every:").grid(row=0, column=2, padx=(15, 5))
+        ttk.Spinbox(selection_frame, from_=1, to=1000, width=5,
+                    textvariable=self.page_stride).grid(row=0, column=3)
+        ttk.Label(selection_frame, text="Sample:").grid(row=0, column=4, padx=(15, 5))
+        ttk.Spinbox(selection_frame, from_=0, to=10000, width=6,
+                    textvariable=self.sample_pages).grid(row=0, column=5)
+        ttk.Label(selection_frame, text="(empty / 0 = all)", foreground='gray').grid(
+            row=0, column=6, padx=(10, 0))
+
         # Page size is automatically calculated to fit the content
 
         # Quality settings
@@ -116,6 +175,36 @@ class PDFThumbnailApp:
                                   textvariable=self.padding, increment=1)
         padding_spin.grid(row=0, column=6)
 
+        ttk.Label(quality_frame, text="Render Mode:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
+        render_combo = ttk.Combobox(quality_frame, textvariable=self.render_mode, width=8,
+                                    values=["vector", "raster"], state='readonly')
+        render_combo.grid(row=1, column=1, columnspan=2, sticky=tk.W, padx=(20, 0), pady=(10, 0))
+
+        ttk.Label(quality_frame, text="Image:").grid(row=1, column=3, padx=(0, 5), pady=(10, 0))
+        format_combo = ttk.Combobox(quality_frame, textvariable=self.image_format, width=8,
+                                    values=["jpeg", "png", "bilevel"], state='readonly')
+        format_combo.grid(row=1, column=4, columnspan=2, sticky=tk.W, pady=(10, 0))
+
+        cache_check = ttk.Checkbutton(quality_frame, text="Cache thumbnails", variable=self.use_cache)
+        cache_check.grid(row=1, column=6, sticky=tk.W, pady=(10, 0))
+
+        ttk.Label(quality_frame, text="Save Profile:").grid(row=2, column=0, sticky=tk.W, pady=(10, 0))
+        profile_combo = ttk.Combobox(quality_frame, textvariable=self.save_profile, width=8,
+                                     values=list(SAVE_PROFILES), state='readonly')
+        profile_combo.grid(row=2, column=1, columnspan=2, sticky=tk.W, padx=(20, 0), pady=(10, 0))
+
+        border_check = ttk.Checkbutton(quality_frame, text="Borders", variable=self.draw_border)
+        border_check.grid(row=2, column=3, columnspan=2, sticky=tk.W, pady=(10, 0))
+
+        timings_check = ttk.Checkbutton(quality_frame, text="Show timing summary",
+                                        variable=self.show_timings)
+        timings_check.grid(row=2, column=5, columnspan=2, sticky=tk.W, pady=(10, 0))
+
+        downsample_check = ttk.Checkbutton(quality_frame,
+                                           text="Downsample embedded images to DPI (vector mode)",
+                                           variable=self.downsample_images)
+        downsample_check.grid(row=3, column=1, columnspan=6, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+
         # Action area
         action_frame = ttk.LabelFrame(main_frame, text="Actions", padding="10")
         action_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -143,6 +232,10 @@ class PDFThumbnailApp:
                                   command=self.open_output_file, state='disabled')
         self.open_btn.grid(row=0, column=1, padx=(0, 10))
 
+        self.cancel_btn = ttk.Button(button_frame, text="Cancel",
+                                     command=self.cancel_processing, state='disabled')
+        self.cancel_btn.grid(row=0, column=2, padx=(0, 10))
+
         # Preset configurations
         preset_frame = ttk.Frame(main_frame)
         preset_frame.grid(row=4, column=0, columnspan=3, pady=(10, 0))
@@ -173,7 +266,8 @@ class PDFThumbnailApp:
         filename = filedialog.asksaveasfilename(
             title="Save Output File",
             defaultextension=".pdf",
-            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
+            filetypes=[("PDF files", "*.pdf"), ("PNG images", "*.png"), ("JPEG images", "*.jpg"),
+                       ("WebP images", "*.webp"), ("All files", "*.*")]
         )
         if filename:
             self.output_path.set(filename)
@@ -186,22 +280,29 @@ class PDFThumbnailApp:
             return
 
         try:
-            import fitz
-            doc = fitz.open(input_file)
-            total_pages = len(doc)
-            doc.close()
+            # Indexed files are answered without opening them, and the layout reuses the scan
+            total_pages = default_metadata_index().info(Path(input_file)).page_count
+            pages = select_page_indices(total_pages, **self.page_selection())
+            if pages is not None:
+                total_pages = len(pages)
 
             cols = self.columns.get()
             rows = (total_pages + cols - 1) // cols
             self.rows.set(rows)
 
             messagebox.showinfo("Auto Calculate",
-                              f"File has {total_pages} pages\n"
+                              f"{total_pages} pages selected\n"
                               f"{cols} thumbnails per row\n"
                               f"Need {rows} rows")
         except Exception as e:
             messagebox.showerror("Error", f"Cannot read PDF file: {str(e)}")
 
+    def page_selection(self):
+        """Page range, stride and sample settings as select_page_indices keyword arguments"""
+        return dict(page_ranges=self.page_ranges.get().strip() or None,
+                    stride=self.page_stride.get(),
+                    sample=self.sample_pages.get() or None)
+
     def apply_preset(self, columns, rows):
         """Apply preset configuration"""
         self.columns.set(columns)
@@ -230,6 +331,17 @@ class PDFThumbnailApp:
             messagebox.showwarning("Warning", "DPI must be greater than 0")
             return False
 
+        if self.page_stride.get() <= 0 or self.sample_pages.get() < 0:
+            messagebox.showwarning("Warning", "Every must be at least 1 and Sample not negative")
+            return False
+
+        if self.page_ranges.get().strip():
+            try:
+                parse_page_ranges(self.page_ranges.get())
+            except ValueError as e:
+                messagebox.showwarning("Warning", str(e))
+                return False
+
         return True
 
     def start_processing(self):
@@ -245,17 +357,52 @@ class PDFThumbnailApp:
         self.processing = True
         self.process_btn.config(state='disabled')
         self.open_btn.config(state='disabled')
+        self.cancel_btn.config(state='normal')
         self.progress_var.set(0)
-        self.status_label.config(text="Processing...")
+        self.status_label.config(text="Reading PDF file...")
 
         # Process in new thread
-        threading.Thread(target=self.process_pdf_thread, daemon=True).start()
-
-    def process_pdf_thread(self):
+        self.cancel_event = threading.Event()
+        self.profiler = Profiler() if self.show_timings.get() else None
+        threading.Thread(target=self.process_pdf_thread, args=(self.cancel_event,),
+                         daemon=True).start()
+
+    def cancel_processing(self):
+        """Ask the processing thread to stop at the next page"""
+        if self.processing and self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state='disabled')
+            self.status_label.config(text="Cancelling...")
+
+    def make_progress_callback(self):
+        """Progress callback showing pages/sec and ETA, throttled to 10 updates per second"""
+        start_time = time.monotonic()
+        self.last_progress_update = 0.0
+
+        def on_progress(done, total):
+            now = time.monotonic()
+            if done < total and now - self.last_progress_update < 0.1:
+                return
+            self.last_progress_update = now
+
+            if done >= total:
+                # The final save is not measured, keep a little room on the bar for it
+                self.update_progress(95, f"Saving output file ({total} pages placed)...")
+                return
+
+            elapsed = now - start_time
+            rate = done / elapsed if elapsed > 0 else 0.0
+            eta = format_duration((total - done) / rate) if rate > 0 else "--:--"
+            self.update_progress(done * 95 / total,
+                                 f"Page {done}/{total} - {rate:.1f} pages/s - ETA {eta}")
+
+        return on_progress
+
+    def process_pdf_thread(self, cancel_event):
         """PDF processing thread function"""
         try:
-            # Simulate progress update
-            self.update_progress(10, "Reading PDF file...")
+            from concat_pdf.core import process_pdf
+            selection = self.page_selection()
 
             # Call core processing function
             # Page size is automatically calculated to fit the content
@@ -268,7 +415,23 @@ class PDFThumbnailApp:
                 orientation="landscape",  # Not used when page_size is None
                 dpi=self.dpi.get(),
                 gap=self.gap.get(),
-                padding=self.padding.get()
+                padding=self.padding.get(),
+                pack_rows=self.pack_rows.get(),
+                border=self.draw_border.get(),
+                skip_blank=self.skip_blank.get(),
+                near_duplicates="skip" if self.skip_near_duplicates.get() else None,
+                page_ranges=selection["page_ranges"],
+                page_stride=selection["stride"],
+                sample_pages=selection["sample"],
+                render_mode=self.render_mode.get(),
+                image_format=self.image_format.get(),
+                cache=ThumbnailCache() if self.use_cache.get() else None,
+                save_profile=self.save_profile.get(),
+                downsample_images=self.downsample_images.get(),
+                metadata=default_metadata_index(),
+                progress=self.make_progress_callback(),
+                cancel=cancel_event,
+                profiler=self.profiler
             )
 
             self.update_progress(100, "Processing complete!")
@@ -276,6 +439,10 @@ class PDFThumbnailApp:
             # Show completion message
             self.root.after(0, lambda: self.on_processing_complete(True))
 
+        except ProcessingCancelled:
+            self.update_progress(0, "Cancelled")
+            self.root.after(0, lambda: self.on_processing_complete(False, cancelled=True))
+
         except Exception as e:
             error_msg = f"Processing failed: {str(e)}"
             self.root.after(0, lambda: self.on_processing_complete(False, error_msg))
@@ -287,14 +454,21 @@ class PDFThumbnailApp:
             self.status_label.config(text=text)
         ))
 
-    def on_processing_complete(self, success, error_msg=None):
+    def on_processing_complete(self, success, error_msg=None, cancelled=False):
         """Callback after processing completion"""
         self.processing = False
+        self.cancel_event = None
         self.process_btn.config(state='normal')
+        self.cancel_btn.config(state='disabled')
 
-        if success:
+        if cancelled:
+            self.status_label.config(text="Cancelled")
+        elif success:
             self.open_btn.config(state='normal')
-            messagebox.showinfo("Success", "PDF thumbnail grid completed!")
+            message = "PDF thumbnail grid completed!"
+            if self.profiler is not None:
+                message += "\n\n" + self.profiler.summary()
+            messagebox.showinfo("Success", message)
         else:
             messagebox.showerror("Error", error_msg)
             self.status_label.config(text="Processing failed")
@@ -344,6 +518,7 @@ def main():
 
     # Create app
     app = PDFThumbnailApp(root)
+    root.after_idle(lambda: threading.Thread(target=preload_core, daemon=True).start())
 
     # Set up drag and drop (requires additional implementation)
     root.mainloop()
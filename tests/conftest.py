@@ -0,0 +1,39 @@
+"""Shared fixtures - small generated PDFs, no files from outside the test run"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import fitz
+
+
+def make_pdf(path: Path, pages: int, sizes=None, label: str = "Page") -> Path:
+    """A PDF with a numbered text line on every page, sizes as (width, height) per page"""
+    doc = fitz.open()
+    for idx in range(pages):
+        width, height = sizes[idx] if sizes else (595, 842)
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((36, 72), f"{label} {idx + 1}", fontsize=24)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keep the user's cache directory out of every test"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user_cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "user_cache"))
+    return tmp_path / "user_cache"
+
+
+@pytest.fixture
+def pdf_factory(tmp_path):
+    def factory(name: str = "input.pdf", pages: int = 10, sizes=None, label: str = "Page") -> Path:
+        return make_pdf(tmp_path / name, pages, sizes, label)
+    return factory
@@ -0,0 +1,89 @@
+"""asyncio API - results, early exit and cancellation"""
+
+import asyncio
+
+import fitz
+
+from concat_pdf.aio import GridPage, GridRenderer
+
+
+def run(coroutine, timeout: float = 60):
+    """Run a coroutine, a hang fails the test instead of blocking the run"""
+    return asyncio.run(asyncio.wait_for(coroutine, timeout))
+
+
+def test_render_grid_bytes(pdf_factory):
+    input_path = pdf_factory(pages=10)
+
+    async def main():
+        async with GridRenderer(max_jobs=1) as renderer:
+            return await renderer.render_grid_bytes(input_path, 2, m=2)
+
+    with fitz.open(stream=run(main()), filetype="pdf") as doc:
+        assert len(doc) == 3
+        assert "Page 10" in doc[2].get_text()
+
+
+def test_iter_pages_yields_every_page_in_order(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=6)
+    output_path = tmp_path / "out.pdf"
+
+    async def main():
+        async with GridRenderer(max_jobs=1) as renderer:
+            return [page async for page in renderer.iter_pages(input_path, 1, m=2,
+                                                                 output_path=output_path)]
+
+    pages = run(main())
+    assert [page.number for page in pages] == [0, 1, 2]
+    assert all(isinstance(page, GridPage) for page in pages)
+    with fitz.open(stream=pages[1].pdf, filetype="pdf") as doc:
+        assert len(doc) == 1 and "Page 3" in doc[0].get_text()
+    with fitz.open(output_path) as doc:
+        assert len(doc) == 3
+
+
+def test_leaving_the_page_loop_early_stops_the_job(pdf_factory):
+    # Far more pages than max_pending, so the worker waits for the consumer
+    input_path = pdf_factory(pages=40)
+
+    async def main():
+        renderer = GridRenderer(max_jobs=1)
+        # Leaving the renderer right after the loop, before the page generator is finalized
+        async with renderer:
+            async for page in renderer.iter_pages(input_path, 1, m=1, max_pending=1):
+                break
+        # The renderer starts new workers for later jobs
+        output = await renderer.render_grid_bytes(input_path, 10)
+        await renderer.close()
+        return page.number, output
+
+    number, output = run(main())
+    assert number == 0
+    assert output.startswith(b"%PDF")
+
+
+def test_cancelling_the_task_removes_the_partial_output(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=200)
+    output_path = tmp_path / "out.pdf"
+
+    async def main():
+        async with GridRenderer(max_jobs=1) as renderer:
+            pages = []
+
+            async def consume():
+                async for page in renderer.iter_pages(input_path, 1, m=1, max_pending=1,
+                                                      output_path=output_path,
+                                                      render_mode="raster"):
+                    pages.append(page)
+            task = asyncio.create_task(consume())
+            while not pages:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return task.cancelled(), len(pages)
+
+    cancelled, received = run(main())
+    assert cancelled
+    assert received < 200
+    assert not output_path.exists()
+    assert list(tmp_path.glob("out.pdf*")) == []
@@ -0,0 +1,78 @@
+"""Batch mode - input collection, output names, skipping and failures"""
+
+from pathlib import Path
+
+import fitz
+import pytest
+
+from concat_pdf.batch import batch_main, collect_inputs, output_paths, run_batch
+
+from conftest import make_pdf
+
+
+def test_collect_inputs(tmp_path):
+    make_pdf(tmp_path / "a.pdf", 1)
+    make_pdf(tmp_path / "B.PDF", 1)
+    make_pdf(tmp_path / "sub" / "c.pdf", 1)
+    (tmp_path / "notes.txt").write_text("not a pdf")
+
+    assert [p.name for p in collect_inputs([str(tmp_path)])] == ["B.PDF", "a.pdf"]
+    # Directories and patterns naming the same file yield it once
+    found = collect_inputs([str(tmp_path / "**" / "*.pdf"), str(tmp_path / "a.pdf")])
+    assert [p.name for p in found] == ["a.pdf", "c.pdf"]
+
+
+def test_output_paths_keep_plain_names(tmp_path):
+    inputs = [tmp_path / "one.pdf", tmp_path / "two.pdf"]
+    assert output_paths(inputs, tmp_path / "out", "_thumbnails") == {
+        inputs[0]: tmp_path / "out" / "one_thumbnails.pdf",
+        inputs[1]: tmp_path / "out" / "two_thumbnails.pdf",
+    }
+
+
+def test_output_paths_of_inputs_sharing_a_name(tmp_path):
+    inputs = [tmp_path / "a" / "doc.pdf", tmp_path / "b" / "c" / "doc.pdf",
+              tmp_path / "b" / "Doc.pdf", tmp_path / "other.pdf"]
+    outputs = output_paths(inputs, Path("out"), "_t")
+    assert {path.name for path in outputs.values()} == {
+        "a_doc_t.pdf", "b_c_doc_t.pdf", "b_Doc_t.pdf", "other_t.pdf"}
+
+
+def test_output_paths_that_still_collide_are_an_error(tmp_path):
+    inputs = [tmp_path / "a" / "doc.pdf", tmp_path / "b" / "doc.pdf", tmp_path / "a_doc.pdf"]
+    with pytest.raises(ValueError, match="would both be written"):
+        output_paths(inputs, tmp_path / "out", "")
+
+
+def test_run_batch_processes_skips_and_reports_failures(tmp_path, capsys):
+    first = make_pdf(tmp_path / "in" / "a" / "doc.pdf", 4)
+    second = make_pdf(tmp_path / "in" / "b" / "doc.pdf", 6)
+    broken = tmp_path / "in" / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    out_dir = tmp_path / "out"
+
+    results = run_batch([first, second, broken], out_dir, jobs=2, n=2, m=2)
+    status = {path: result for path, result, _ in results}
+    assert status[first] == status[second] == "done"
+    assert status[broken].startswith("failed: ")
+    with fitz.open(out_dir / "a_doc_thumbnails.pdf") as doc:
+        assert len(doc) == 1
+    with fitz.open(out_dir / "b_doc_thumbnails.pdf") as doc:
+        assert len(doc) == 2
+    assert sorted(p.name for p in out_dir.iterdir()) == ["a_doc_thumbnails.pdf", "b_doc_thumbnails.pdf"]
+
+    # Up-to-date outputs are skipped, unless forced
+    results = run_batch([first, second], out_dir, jobs=2, n=2, m=2)
+    assert [result for _, result, _ in results] == ["skipped", "skipped"]
+    results = run_batch([first], out_dir, jobs=1, force=True, n=2, m=2)
+    assert [result for _, result, _ in results] == ["done"]
+
+
+def test_batch_main_exit_code(tmp_path, capsys):
+    make_pdf(tmp_path / "in" / "good.pdf", 2)
+    assert batch_main([str(tmp_path / "in"), "--out-dir", str(tmp_path / "out"), "-n", "2"]) == 0
+    assert "1 done, 0 skipped, 0 failed" in capsys.readouterr().out
+
+    (tmp_path / "in" / "bad.pdf").write_bytes(b"not a pdf")
+    assert batch_main([str(tmp_path / "in"), "--out-dir", str(tmp_path / "out"), "-n", "2"]) == 1
+    assert "0 done, 1 skipped, 1 failed" in capsys.readouterr().out
@@ -0,0 +1,83 @@
+"""Thumbnail cache - keys, hits, LRU eviction and reuse across runs"""
+
+import os
+
+import fitz
+
+from concat_pdf import process_pdf
+from concat_pdf.cache import ThumbnailCache
+
+from conftest import make_pdf
+
+
+def test_keys_depend_on_content_page_and_settings():
+    key = ThumbnailCache.make_key("a" * 64, 0, 150, "jpeg")
+    assert key == ThumbnailCache.make_key("a" * 64, 0, 150, "jpeg")
+    assert key != ThumbnailCache.make_key("b" * 64, 0, 150, "jpeg")
+    assert key != ThumbnailCache.make_key("a" * 64, 1, 150, "jpeg")
+    assert key != ThumbnailCache.make_key("a" * 64, 0, 300, "jpeg")
+
+
+def test_get_and_put_count_hits_and_misses(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache")
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, b"thumbnail")
+    assert cache.get("ab" * 32) == b"thumbnail"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats() == "1 hits, 1 misses"
+
+
+def test_file_digest_follows_the_content(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache")
+    path = make_pdf(tmp_path / "input.pdf", 2)
+    digest = cache.file_digest(path)
+    assert len(digest) == 64
+    # Remembered, a renamed copy has the same digest
+    assert cache.file_digest(path) == digest
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(path.read_bytes())
+    assert cache.file_digest(copy) == digest
+
+    make_pdf(path, 3)
+    assert cache.file_digest(path) != digest
+
+
+def test_trim_evicts_least_recently_used_first(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", max_bytes=10_000)
+    keys = [f"{i:02x}" * 32 for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.put(key, b"x" * 1000)
+        path = cache._entry_path(key)
+        os.utime(path, (1_000_000 + age, 1_000_000 + age))
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+
+    assert cache.trim(2500) == 2
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[3]) is not None
+    assert cache.total_size() == 2000
+
+
+def test_put_over_budget_trims_to_ninety_percent(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", max_bytes=5000)
+    for i in range(10):
+        cache.put(f"{i:02x}" * 32, b"x" * 1000)
+        assert cache.total_size() <= 5000
+    assert cache.get(f"{9:02x}" * 32) is not None
+
+    cache.clear()
+    assert cache.total_size() == 0
+
+
+def test_raster_run_reuses_cached_pages(pdf_factory, tmp_path, capsys):
+    input_path = pdf_factory(pages=6)
+    cache = ThumbnailCache(tmp_path / "cache")
+    options = dict(render_mode="raster", cache=cache, save_profile="fast")
+
+    process_pdf(input_path, tmp_path / "first.pdf", 3, 2, **options)
+    assert "Thumbnail cache: 0 hits, 6 misses" in capsys.readouterr().out
+    process_pdf(input_path, tmp_path / "second.pdf", 3, 2, **options)
+    assert "Thumbnail cache: 6 hits, 0 misses" in capsys.readouterr().out
+
+    with fitz.open(tmp_path / "first.pdf") as first, fitz.open(tmp_path / "second.pdf") as second:
+        assert first[0].get_pixmap(dpi=36).samples == second[0].get_pixmap(dpi=36).samples
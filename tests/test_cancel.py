@@ -0,0 +1,89 @@
+"""Cancellation - processing stops and leaves no output behind"""
+
+import tempfile
+import threading
+
+import fitz
+import pytest
+
+from concat_pdf import process_pdf
+from concat_pdf.progress import FileCancelToken, ProcessingCancelled
+
+
+def cancel_after(pages: int):
+    """A cancellation token and a progress callback setting it once pages are placed"""
+    cancel = threading.Event()
+
+    def progress(done, total):
+        if done >= pages:
+            cancel.set()
+    return cancel, progress
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"render_mode": "raster"},
+    {"stream_batch": 1},
+    {"workers": 2},
+], ids=["vector", "raster", "streaming", "parallel"])
+def test_cancelled_run_leaves_no_output(pdf_factory, tmp_path, monkeypatch, options):
+    input_path = pdf_factory(pages=24)
+    output_path = tmp_path / "out" / "result.pdf"
+    output_path.parent.mkdir()
+    # Temporary directories of the parallel path land here, to check they are removed
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    cancel, progress = cancel_after(5)
+
+    with pytest.raises(ProcessingCancelled):
+        process_pdf(input_path, output_path, 2, 2, cancel=cancel, progress=progress, **options)
+
+    assert list(output_path.parent.iterdir()) == []
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+def test_cancelled_incremental_run_keeps_the_previous_output(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=12)
+    output_path = tmp_path / "out.pdf"
+    process_pdf(input_path, output_path, 2, 2, incremental=True)
+    previous = output_path.read_bytes()
+
+    cancel, progress = cancel_after(1)
+    with pytest.raises(ProcessingCancelled):
+        process_pdf(input_path, output_path, 2, 2, border=False, incremental=True,
+                    cancel=cancel, progress=progress)
+
+    assert output_path.read_bytes() == previous
+    assert not (tmp_path / "out.pdf.part").exists()
+
+
+@pytest.mark.parametrize("options", [{}, {"stream_batch": 1}], ids=["whole", "streaming"])
+def test_cancelled_run_closes_its_documents(pdf_factory, tmp_path, monkeypatch, options):
+    input_path = pdf_factory(pages=24)
+    cancel, progress = cancel_after(10)
+    opened = []
+    original_open = fitz.open
+
+    def tracking_open(*args, **kwargs):
+        doc = original_open(*args, **kwargs)
+        opened.append(doc)
+        return doc
+
+    monkeypatch.setattr(fitz, "open", tracking_open)
+    with pytest.raises(ProcessingCancelled):
+        process_pdf(input_path, tmp_path / "out.pdf", 2, 2, cancel=cancel, progress=progress,
+                    **options)
+    assert not (tmp_path / "out.pdf").exists()
+    assert len(opened) >= 2 and all(doc.is_closed for doc in opened)
+
+
+def test_file_token_set_before_the_start(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=4)
+    token = FileCancelToken(str(tmp_path / "cancel"))
+    assert not token.is_set()
+    token.set()
+    assert token.is_set()
+
+    with pytest.raises(ProcessingCancelled):
+        process_pdf(input_path, tmp_path / "out.pdf", 2, cancel=token)
+    assert not (tmp_path / "out.pdf").exists()
@@ -0,0 +1,125 @@
+"""Incremental regeneration - manifest reuse and invalidation"""
+
+import os
+
+import fitz
+
+from concat_pdf import process_pdf
+from concat_pdf.incremental import load_manifest, manifest_path, reusable_pages
+
+from conftest import make_pdf
+
+
+def run(capsys, input_path, output_path, **options) -> str:
+    """Incremental run with a 2×2 grid, returns the "Incremental: ..." line"""
+    process_pdf(input_path, output_path, 2, 2, incremental=True, save_profile="fast", **options)
+    lines = capsys.readouterr().out.splitlines()
+    return next(line for line in lines if line.startswith("Incremental:"))
+
+
+def output_text(path) -> list:
+    with fitz.open(path) as doc:
+        return [page.get_text() for page in doc]
+
+
+def test_unchanged_input_reuses_every_page(pdf_factory, tmp_path, capsys):
+    input_path = pdf_factory(pages=10)
+    output_path = tmp_path / "out.pdf"
+
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 0 of 3 output pages"
+    manifest = load_manifest(output_path)
+    assert manifest is not None and len(manifest["pages"]) == 3
+    assert manifest_path(output_path).name == "out.pdf.manifest.json"
+    first = output_text(output_path)
+
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 3 of 3 output pages"
+    assert output_text(output_path) == first
+    assert not output_path.with_name("out.pdf.part").exists()
+
+
+def test_changed_page_rebuilds_only_its_output_page(pdf_factory, tmp_path, capsys):
+    input_path = pdf_factory(pages=10)
+    output_path = tmp_path / "out.pdf"
+    run(capsys, input_path, output_path)
+
+    # Page 6 sits on the second output page
+    with fitz.open(input_path) as doc:
+        doc[5].insert_text((36, 200), "edited", fontsize=24)
+        doc.saveIncr()
+
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 2 of 3 output pages"
+    text = output_text(output_path)
+    assert "edited" in text[1]
+    assert "edited" not in text[0] + text[2]
+
+
+def test_changed_settings_invalidate_the_manifest(pdf_factory, tmp_path, capsys):
+    input_path = pdf_factory(pages=10)
+    output_path = tmp_path / "out.pdf"
+    run(capsys, input_path, output_path)
+
+    assert run(capsys, input_path, output_path, border=False) == "Incremental: reusing 0 of 3 output pages"
+    assert run(capsys, input_path, output_path, border=False) == "Incremental: reusing 3 of 3 output pages"
+
+
+def test_inserted_page_shifts_later_cells(tmp_path, capsys):
+    input_path = make_pdf(tmp_path / "input.pdf", 10)
+    output_path = tmp_path / "out.pdf"
+    run(capsys, input_path, output_path)
+
+    # One more page at the end: the first two output pages keep their cells
+    make_pdf(input_path, 11)
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 2 of 3 output pages"
+
+    # One more page at the front moves every page to another cell
+    with fitz.open(input_path) as doc:
+        doc.insert_page(0, "Cover", fontsize=24)
+        doc.save(tmp_path / "shifted.pdf")
+    os.replace(tmp_path / "shifted.pdf", input_path)
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 0 of 3 output pages"
+
+
+def test_replaced_output_makes_the_manifest_stale(pdf_factory, tmp_path, capsys):
+    input_path = pdf_factory(pages=10)
+    output_path = tmp_path / "out.pdf"
+    run(capsys, input_path, output_path)
+
+    # Another tool rewrote the output, same content but a new modification time
+    stat = output_path.stat()
+    os.utime(output_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_manifest(output_path) is None
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 0 of 3 output pages"
+
+
+def test_missing_or_corrupt_manifest(pdf_factory, tmp_path, capsys):
+    input_path = pdf_factory(pages=4)
+    output_path = tmp_path / "out.pdf"
+    assert load_manifest(output_path) is None
+
+    run(capsys, input_path, output_path)
+    manifest_path(output_path).write_text("{not json", encoding="utf-8")
+    assert load_manifest(output_path) is None
+    assert run(capsys, input_path, output_path) == "Incremental: reusing 0 of 1 output pages"
+
+
+def test_reusable_pages_compares_cells_and_fingerprints():
+    cells = [[(0, (10.0, 10.0, 100.0, 150.0)), (1, (110.0, 10.0, 200.0, 150.0))],
+             [(2, (10.0, 10.0, 100.0, 150.0))]]
+    manifest = {
+        "settings": {"dpi": 150},
+        "page_size": [210.0, 160.0],
+        "fingerprints": ["a" * 32, "b" * 32, "c" * 32],
+        "pages": [[[0, 10.0, 10.0, 100.0, 150.0], [1, 110.0, 10.0, 200.0, 150.0]],
+                  [[2, 10.0, 10.0, 100.0, 150.0]]],
+    }
+    fingerprints = ["a" * 64, "b" * 64, "c" * 64]
+
+    assert reusable_pages(manifest, {"dpi": 150}, fingerprints, (210, 160), cells) == [True, True]
+    assert reusable_pages(None, {"dpi": 150}, fingerprints, (210, 160), cells) == [False, False]
+    assert reusable_pages(manifest, {"dpi": 300}, fingerprints, (210, 160), cells) == [False, False]
+    assert reusable_pages(manifest, {"dpi": 150}, fingerprints, (211, 160), cells) == [False, False]
+    changed = ["a" * 64, "x" * 64, "c" * 64]
+    assert reusable_pages(manifest, {"dpi": 150}, changed, (210, 160), cells) == [False, True]
+    # Float noise below the stored precision does not count as a change
+    moved = [cells[0], [(2, (10.0, 10.0, 100.0, 150.0001))]]
+    assert reusable_pages(manifest, {"dpi": 150}, fingerprints, (210, 160), moved) == [True, True]
@@ -0,0 +1,85 @@
+"""Vectorized layout against the original page-by-page cell computation"""
+
+import math
+
+import numpy as np
+import pytest
+
+from concat_pdf.layout import compute_layout, to_page_cells
+
+
+def baseline_rects(sizes, n, m, page_size, gap, padding):
+    """Cell rectangles as the original per-page loop of process_pdf computed them"""
+    thumbnail_width = (page_size[0] - 2 * padding - (n - 1) * gap) / n
+    thumbnail_height = (page_size[1] - 2 * padding - (m - 1) * gap) / m
+    rects = []
+    for idx, (width, height) in enumerate(sizes):
+        grid_idx = idx % (n * m)
+        row, col = grid_idx // n, grid_idx % n
+        x = padding + col * (thumbnail_width + gap)
+        y = padding + row * (thumbnail_height + gap)
+        aspect_ratio = width / height
+        if aspect_ratio > thumbnail_width / thumbnail_height:
+            fit_width, fit_height = thumbnail_width, thumbnail_width / aspect_ratio
+            rects.append((x, y + (thumbnail_height - fit_height) / 2,
+                          x + fit_width, y + (thumbnail_height - fit_height) / 2 + fit_height))
+        else:
+            fit_height, fit_width = thumbnail_height, thumbnail_height * aspect_ratio
+            rects.append((x + (thumbnail_width - fit_width) / 2, y,
+                          x + (thumbnail_width - fit_width) / 2 + fit_width, y + fit_height))
+    return np.array(rects)
+
+
+MIXED_SIZES = [(595, 842), (842, 595), (612, 792), (300, 900), (1000, 200), (595, 842), (420, 595)]
+
+
+@pytest.mark.parametrize("n, m", [(1, 1), (3, 2), (4, 4), (5, 1)])
+@pytest.mark.parametrize("page_size", [(842, 595), (595, 842), (1500, 400)])
+def test_grid_matches_baseline(n, m, page_size):
+    sizes = MIXED_SIZES * 4
+    layout = compute_layout(sizes, n, m, page_size, gap=3, padding=10)
+
+    assert layout.page_size == page_size
+    assert layout.output_pages == math.ceil(len(sizes) / (n * m))
+    np.testing.assert_allclose(layout.rects, baseline_rects(sizes, n, m, page_size, 3, 10))
+    np.testing.assert_array_equal(layout.page_index, np.arange(len(sizes)) // (n * m))
+
+
+def test_auto_page_size_matches_baseline_for_uniform_pages():
+    sizes = [(595, 842)] * 9
+    layout = compute_layout(sizes, 3, 3, gap=3, padding=10)
+
+    # The original sized the page from the first page's aspect ratio with compact spacing
+    thumb_width = 300 * 595 / 842
+    expected = (3 * thumb_width + 2 * 1.5 + 2 * 8, 3 * 300 + 2 * 1.5 + 2 * 8)
+    assert layout.page_size == pytest.approx(expected)
+    np.testing.assert_allclose(layout.rects, baseline_rects(sizes, 3, 3, layout.page_size, 3, 10))
+
+
+def test_page_cells_follow_output_pages_and_selection():
+    sizes = [(595, 842)] * 7
+    layout = compute_layout(sizes, 2, 2, (842, 595))
+    selection = [0, 2, 3, 5, 8, 9, 12]
+
+    cells = to_page_cells(layout, selection)
+
+    assert [len(page) for page in cells] == [4, 3]
+    assert [idx for page in cells for idx, _ in page] == selection
+    assert cells[1][0][1] == pytest.approx(tuple(layout.rects[4]))
+
+
+def test_packed_rows_fill_the_width_without_overlap():
+    sizes = MIXED_SIZES * 2
+    layout = compute_layout(sizes, 3, 2, (842, 595), gap=3, padding=10, pack_rows=True)
+
+    rects = layout.rects
+    assert np.all(rects[:, 0] >= 10 - 1e-9) and np.all(rects[:, 2] <= 842 - 10 + 1e-9)
+    assert np.all(rects[:, 3] <= 595 - 10 + 1e-9)
+    # Pages keep their aspect ratio
+    sizes = np.array(sizes, dtype=float)
+    np.testing.assert_allclose((rects[:, 2] - rects[:, 0]) / (rects[:, 3] - rects[:, 1]),
+                               sizes[:, 0] / sizes[:, 1])
+    # Neighbours in a row are separated by the gap
+    for start in range(0, len(sizes), 3):
+        row = rects[start:start + 3]
+        np.testing.assert_allclose(row[1:, 0] - row[:-1, 2], 3)
@@ -0,0 +1,120 @@
+"""Document metadata index"""
+
+import os
+
+import pytest
+
+import concat_pdf.metadata as metadata
+from concat_pdf import DocumentInfo, MetadataIndex, process_pdf
+
+from conftest import make_pdf
+
+SIZES = [(595, 842), (842, 595), (300, 400)]
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Records every page-by-page scan of a document"""
+    calls = []
+    original = metadata.scan_document
+
+    def scan(doc):
+        calls.append(doc.name)
+        return original(doc)
+    monkeypatch.setattr(metadata, "scan_document", scan)
+    return calls
+
+
+def test_info_reads_sizes_and_rotations(pdf_factory, scans):
+    path = pdf_factory(pages=3, sizes=SIZES)
+    index = MetadataIndex()
+
+    info = index.info(path)
+
+    assert info == DocumentInfo(((595, 842), (842, 595), (300, 400)), (0, 0, 0))
+    assert info.page_count == 3
+    assert index.info(path) is info
+    assert (index.hits, index.misses, len(scans)) == (1, 1, 1)
+
+
+def test_lookup_does_not_scan(pdf_factory, scans):
+    path = pdf_factory(pages=3)
+    index = MetadataIndex()
+
+    assert index.lookup(path) is None
+    assert index.page_counts([path], scan=False) == [3]
+    assert index.lookup(path) is None
+    assert scans == []
+
+
+def test_entries_are_shared_on_disk(pdf_factory, tmp_path, scans):
+    path = pdf_factory(pages=3, sizes=SIZES)
+    directory = tmp_path / "index"
+    MetadataIndex(directory).info(path)
+
+    # A new index (another process) finds the stored entry
+    other = MetadataIndex(directory)
+    assert other.lookup(path).sizes == ((595, 842), (842, 595), (300, 400))
+    assert len(scans) == 1
+    assert len(list(directory.glob("*.json"))) == 1
+
+
+def test_changed_file_is_scanned_again(pdf_factory, tmp_path, scans):
+    path = pdf_factory(pages=3)
+    index = MetadataIndex(tmp_path / "index")
+    assert index.info(path).page_count == 3
+
+    make_pdf(path, 5)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert index.lookup(path) is None
+    assert index.info(path).page_count == 5
+    assert len(scans) == 2
+
+
+def test_trim_keeps_the_most_recently_used(pdf_factory, tmp_path):
+    index = MetadataIndex(tmp_path / "index", max_entries=1000)
+    paths = [pdf_factory(f"file{idx}.pdf", pages=1) for idx in range(5)]
+    for age, path in enumerate(paths):
+        index.info(path)
+        entry = index._entry_path(index._stamp(path))
+        os.utime(entry, (1_000_000 + age, 1_000_000 + age))
+
+    assert index.trim(4) == 2  # Down to 90% of 4 entries
+    fresh = MetadataIndex(tmp_path / "index")
+    assert [fresh.lookup(path) is not None for path in paths] == [False, False, True, True, True]
+
+    index.clear()
+    assert list((tmp_path / "index").glob("*.json")) == []
+    assert index.lookup(paths[-1]) is None
+
+
+def test_process_pdf_keeps_its_index_in_memory(pdf_factory, tmp_path, isolated_cache):
+    path = pdf_factory(pages=4)
+
+    process_pdf(path, tmp_path / "out.pdf", 2)
+
+    assert not (isolated_cache / "concat_pdf" / "metadata").exists()
+
+
+def test_process_pdf_uses_the_given_index(tmp_path, scans):
+    paths = [make_pdf(tmp_path / f"part{idx}.pdf", 3, SIZES) for idx in range(3)]
+    index = MetadataIndex(tmp_path / "index")
+
+    process_pdf(paths, tmp_path / "out.pdf", 3, workers=1, metadata=index)
+    assert len(scans) == 3
+    process_pdf(paths, tmp_path / "out.pdf", 3, workers=1, metadata=index)
+    assert len(scans) == 3
+    assert len(list((tmp_path / "index").glob("*.json"))) == 3
+
+
+def test_selection_does_not_scan_unindexed_files(tmp_path, scans):
+    paths = [make_pdf(tmp_path / f"part{idx}.pdf", 4) for idx in range(3)]
+    index = MetadataIndex()
+
+    process_pdf(paths, tmp_path / "out.pdf", 2, sample_pages=3, metadata=index)
+    process_pdf(paths[0], tmp_path / "out.pdf", 2, page_ranges="1-2", metadata=index)
+
+    assert scans == []
+    assert all(index.lookup(path) is None for path in paths)
@@ -0,0 +1,34 @@
+"""Parallel rendering - worker output matches the serial output"""
+
+import fitz
+import pytest
+
+from concat_pdf import process_pdf
+
+
+def rendered(path) -> list:
+    """Text and pixels of every output page"""
+    with fitz.open(path) as doc:
+        return [(page.rect, page.get_text(), page.get_pixmap(dpi=30).samples) for page in doc]
+
+
+@pytest.mark.parametrize("render_mode", ["vector", "raster"])
+def test_workers_match_serial_output(pdf_factory, tmp_path, render_mode):
+    input_path = pdf_factory(pages=23)
+    options = dict(render_mode=render_mode, save_profile="fast")
+
+    process_pdf(input_path, tmp_path / "serial.pdf", 3, 2, workers=1, **options)
+    process_pdf(input_path, tmp_path / "parallel.pdf", 3, 2, workers=3, **options)
+
+    serial = rendered(tmp_path / "serial.pdf")
+    assert len(serial) == 4
+    assert rendered(tmp_path / "parallel.pdf") == serial
+
+
+def test_more_workers_than_output_pages(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=5)
+
+    process_pdf(input_path, tmp_path / "serial.pdf", 2, 2, workers=1)
+    process_pdf(input_path, tmp_path / "parallel.pdf", 2, 2, workers=8)
+
+    assert rendered(tmp_path / "parallel.pdf") == rendered(tmp_path / "serial.pdf")
@@ -0,0 +1,94 @@
+"""Deep Zoom pyramid - tiles, resuming and invalidation"""
+
+import fitz
+import pytest
+
+from concat_pdf.pyramid import DeepZoomPyramid, write_pyramid
+
+from conftest import make_pdf
+
+
+def tile_files(output_dir) -> dict:
+    return {path.relative_to(output_dir).as_posix(): path.stat().st_mtime_ns
+            for path in (output_dir / "input_files").rglob("*.jpeg")}
+
+
+def test_write_pyramid_writes_every_tile(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=9)
+    output_dir = tmp_path / "tiles"
+
+    descriptor = write_pyramid(input_path, output_dir, n=3, dpi=36, tile_size=64)
+
+    assert descriptor == output_dir / "input.dzi"
+    assert 'TileSize="64"' in descriptor.read_text(encoding="utf-8")
+    pyramid = DeepZoomPyramid(input_path, output_dir, n=3, dpi=36, tile_size=64)
+    try:
+        expected = sum(cols * rows for cols, rows in map(pyramid.tile_count,
+                                                         range(pyramid.max_level + 1)))
+        assert pyramid.get_tile(0, 0, 0).exists()
+    finally:
+        pyramid.close()
+    assert len(tile_files(output_dir)) == expected
+
+
+def test_unchanged_settings_keep_the_tiles(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=9)
+    output_dir = tmp_path / "tiles"
+    write_pyramid(input_path, output_dir, n=3, dpi=36, tile_size=64)
+    first = tile_files(output_dir)
+
+    write_pyramid(input_path, output_dir, n=3, dpi=36, tile_size=64)
+    assert tile_files(output_dir) == first
+
+
+def test_changed_settings_delete_the_old_tiles(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=9)
+    output_dir = tmp_path / "tiles"
+    write_pyramid(input_path, output_dir, n=3, dpi=36, tile_size=64)
+    stale = output_dir / "input_files" / "99" / "0_0.jpeg"
+    stale.parent.mkdir()
+    stale.write_bytes(b"stale")
+
+    descriptor = write_pyramid(input_path, output_dir, n=1, dpi=36, tile_size=64)
+    assert not stale.exists()
+    # One column of nine pages is taller than wide
+    assert '<Size Width="' in descriptor.read_text(encoding="utf-8")
+    with fitz.open(input_path) as doc:
+        page_width = doc[0].rect.width
+    pyramid = DeepZoomPyramid(input_path, output_dir, n=1, dpi=36, tile_size=64)
+    try:
+        assert pyramid.width < 2 * page_width and pyramid.height > pyramid.width
+        assert pyramid.get_tile(pyramid.max_level, 0, 0).exists()
+    finally:
+        pyramid.close()
+
+
+def test_changed_input_deletes_the_old_tiles(tmp_path):
+    input_path = make_pdf(tmp_path / "input.pdf", 4)
+    output_dir = tmp_path / "tiles"
+    write_pyramid(input_path, output_dir, n=2, dpi=36, tile_size=64)
+    tile = output_dir / "input_files" / "0" / "0_0.jpeg"
+    tile.write_bytes(b"stale")
+
+    make_pdf(input_path, 4, label="Sheet")
+    write_pyramid(input_path, output_dir, n=2, dpi=36, tile_size=64)
+    assert tile.read_bytes() != b"stale"
+
+
+def test_failed_run_closes_the_document(pdf_factory, tmp_path, monkeypatch):
+    input_path = pdf_factory(pages=4)
+    opened = []
+    original_init = DeepZoomPyramid.__init__
+
+    def init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        opened.append(self)
+
+    def render_block(self, level, col, row):
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(DeepZoomPyramid, "__init__", init)
+    monkeypatch.setattr(DeepZoomPyramid, "render_block", render_block)
+    with pytest.raises(RuntimeError, match="render failed"):
+        write_pyramid(input_path, tmp_path / "tiles", n=2, dpi=36, tile_size=64)
+    assert len(opened) == 1 and opened[0].doc.is_closed
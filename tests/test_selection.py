@@ -0,0 +1,92 @@
+"""Page ranges, stride and sampling"""
+
+import fitz
+import pytest
+
+from concat_pdf import process_pdf
+from concat_pdf.selection import parse_page_ranges, select_page_indices
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges("1-50,100,200-") == [(1, 50), (100, 100), (200, None)]
+    assert parse_page_ranges(" -3 , 7 ") == [(1, 3), (7, 7)]
+
+
+@pytest.mark.parametrize("spec", ["", ",", "-", "0", "5-2", "a-b", "1-2-3", "1,,2"])
+def test_parse_page_ranges_rejects_malformed(spec):
+    with pytest.raises(ValueError):
+        parse_page_ranges(spec)
+
+
+def test_everything_selected_is_none():
+    assert select_page_indices(10) is None
+    assert select_page_indices(10, "1-") is None
+    assert select_page_indices(10, "1-5,3-10") is None
+    assert select_page_indices(10, sample=10) is None
+
+
+def test_empty_document():
+    assert select_page_indices(0) is None
+    with pytest.raises(ValueError, match="out of range"):
+        select_page_indices(0, "1")
+
+
+def test_ranges_are_clipped_merged_and_sorted():
+    assert select_page_indices(10, "8-20") == [7, 8, 9]
+    assert select_page_indices(10, "9,2-3,3") == [1, 2, 8]
+    assert select_page_indices(10, "-2,9-") == [0, 1, 8, 9]
+
+
+def test_out_of_range_start_is_an_error():
+    with pytest.raises(ValueError, match="Page 11 is out of range, the input has 10 pages"):
+        select_page_indices(10, "11-")
+
+
+def test_reversed_range_is_an_error():
+    with pytest.raises(ValueError, match="Invalid page range"):
+        select_page_indices(10, "7-3")
+
+
+def test_stride():
+    assert select_page_indices(10, stride=3) == [0, 3, 6, 9]
+    assert select_page_indices(10, "2-9", stride=2) == [1, 3, 5, 7]
+    assert select_page_indices(1, stride=5) is None
+    with pytest.raises(ValueError):
+        select_page_indices(10, stride=0)
+
+
+def test_sample_keeps_first_and_last():
+    assert select_page_indices(100, sample=5) == [0, 24, 49, 74, 99]
+    assert select_page_indices(100, sample=1) == [0]
+    assert select_page_indices(10, "1-9", stride=2, sample=3) == [0, 4, 8]
+    with pytest.raises(ValueError):
+        select_page_indices(10, sample=0)
+
+
+def test_process_pdf_places_only_selected_pages(pdf_factory, tmp_path):
+    input_path = pdf_factory(pages=12)
+    output_path = tmp_path / "out.pdf"
+
+    process_pdf(input_path, output_path, 2, 2, page_ranges="2-12", page_stride=3)
+
+    with fitz.open(output_path) as doc:
+        text = " ".join(page.get_text() for page in doc)
+        assert len(doc) == 1
+    for kept in ("Page 2", "Page 5", "Page 8", "Page 11"):
+        assert kept in text
+    for skipped in ("Page 1\n", "Page 3", "Page 12"):
+        assert skipped not in text
+
+
+# A document without pages, PyMuPDF refuses to save one
+EMPTY_PDF = (b"%PDF-1.4\n1 0 obj <</Type /Catalog /Pages 2 0 R>> endobj\n"
+             b"2 0 obj <</Type /Pages /Kids [] /Count 0>> endobj\n"
+             b"trailer <</Root 1 0 R>>\n%%EOF\n")
+
+
+def test_process_pdf_rejects_empty_input(tmp_path):
+    with pytest.raises(ValueError, match="no pages"):
+        process_pdf(EMPTY_PDF, tmp_path / "out.pdf", 2)
+    with pytest.raises(ValueError, match="No input files"):
+        process_pdf([], tmp_path / "out.pdf", 2)
+    assert not (tmp_path / "out.pdf").exists()
@@ -0,0 +1,161 @@
+"""HTTP service - status codes of the endpoints, over a real socket"""
+
+import asyncio
+import json
+
+import fitz
+import pytest
+
+from concat_pdf.serve import ThumbnailService, parse_options
+
+from conftest import make_pdf
+
+
+def run(coroutine, timeout: float = 60):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout))
+
+
+async def request(port: int, method: str, path: str, body: bytes = b"", headers=None):
+    """Send one request, returns (status, headers, body)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {path} HTTP/1.1", "Host: test"]
+    if headers is None:
+        headers = {"Content-Length": str(len(body))} if method == "POST" else {}
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in header_lines)
+    return int(status_line.split()[1]), response_headers, payload
+
+
+async def with_service(scenario, **service_options):
+    """Run scenario(service, port) against a started service"""
+    service = ThumbnailService(workers=1, **service_options)
+    await service.start()
+    server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+    try:
+        return await scenario(service, server.sockets[0].getsockname()[1])
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes(tmp_path_factory):
+    return make_pdf(tmp_path_factory.mktemp("serve") / "input.pdf", 6).read_bytes()
+
+
+def test_parse_options():
+    assert parse_options("n=3&m=2&render_mode=raster&border") == {
+        "n": 3, "m": 2, "render_mode": "raster", "border": True}
+    for query, message in [("m=2", "Missing parameter: n"), ("n=0", "at least 1"),
+                           ("n=2&x=1", "Unknown parameter"), ("n=two", "Invalid value"),
+                           ("n=2&render_mode=svg", "render_mode must be one of"),
+                           ("n=2&page_ranges=5-2", "page_ranges")]:
+        with pytest.raises(ValueError, match=message):
+            parse_options(query)
+
+
+def test_render_and_health(pdf_bytes):
+    async def scenario(service, port):
+        health = await request(port, "GET", "/health")
+        render = await request(port, "POST", "/render?n=2&m=2", pdf_bytes)
+        failed = await request(port, "POST", "/render?n=2", b"not a pdf")
+        metrics = await request(port, "GET", "/metrics")
+        missing = await request(port, "GET", "/nothing")
+        return health, render, failed, metrics, missing
+
+    health, render, failed, metrics, missing = run(with_service(scenario))
+    assert health[0] == 200 and health[2] == b"ok\n"
+    assert render[0] == 200
+    assert render[1]["Content-Type"] == "application/pdf" and render[1]["X-Source-Pages"] == "6"
+    with fitz.open(stream=render[2], filetype="pdf") as doc:
+        assert len(doc) == 2
+    assert failed[0] == 422
+    assert metrics[0] == 200
+    assert missing[0] == 404
+
+
+@pytest.mark.parametrize("path, body, headers, status", [
+    ("/render?n=2", b"%PDF", {}, 411),
+    ("/render?n=2", b"", {"Content-Length": "abc"}, 400),
+    ("/render?n=2", b"", {"Content-Length": "-5"}, 400),
+    ("/render?n=2", b"x" * 2000, None, 413),
+    ("/render?m=2", b"%PDF", None, 400),
+    ("/render?n=2", b"", None, 400),
+], ids=["no-length", "bad-length", "negative-length", "too-large", "bad-options", "empty-body"])
+def test_rejected_uploads(path, body, headers, status):
+    async def scenario(service, port):
+        return await request(port, "POST", path, body, headers)
+
+    assert run(with_service(scenario, max_body=1000))[0] == status
+
+
+def test_malformed_request_line():
+    async def scenario(service, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"NONSENSE\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        return response
+
+    assert run(with_service(scenario)).startswith(b"HTTP/1.1 400 ")
+
+
+def test_full_queue_is_rejected(pdf_bytes):
+    async def scenario(service, port):
+        # Stop the dispatcher so queued jobs stay queued
+        for task in service._dispatchers:
+            task.cancel()
+        await asyncio.gather(*service._dispatchers, return_exceptions=True)
+        first = await request(port, "POST", "/jobs?n=2", pdf_bytes)
+        second = await request(port, "POST", "/jobs?n=2", pdf_bytes)
+        return first, second, service.jobs_total["rejected"]
+
+    first, second, rejected = run(with_service(scenario, queue_size=1))
+    assert first[0] == 202
+    assert second[0] == 429 and second[1]["Retry-After"] == "1"
+    assert rejected == 1
+
+
+def test_async_job_lifecycle(pdf_bytes):
+    async def scenario(service, port):
+        submitted = await request(port, "POST", "/jobs?n=3", pdf_bytes)
+        job = json.loads(submitted[2])
+        await service.jobs[job["id"]].done.wait()
+        status = await request(port, "GET", f"/jobs/{job['id']}")
+        result = await request(port, "GET", f"/jobs/{job['id']}/result")
+        deleted = await request(port, "DELETE", f"/jobs/{job['id']}")
+        gone = await request(port, "GET", f"/jobs/{job['id']}")
+
+        failed = json.loads((await request(port, "POST", "/jobs?n=3", b"not a pdf"))[2])
+        await service.jobs[failed["id"]].done.wait()
+        failed_result = await request(port, "GET", f"/jobs/{failed['id']}/result")
+        return submitted, status, result, deleted, gone, failed_result
+
+    submitted, status, result, deleted, gone, failed_result = run(with_service(scenario))
+    job = json.loads(submitted[2])
+    assert submitted[0] == 202 and submitted[1]["Location"] == f"/jobs/{job['id']}"
+    assert status[0] == 200 and json.loads(status[2])["status"] == "done"
+    assert result[0] == 200 and result[2].startswith(b"%PDF")
+    assert deleted[0] == 200
+    assert gone[0] == 404
+    assert failed_result[0] == 422 and json.loads(failed_result[2])["status"] == "failed"
+
+
+def test_unfinished_job_result_is_a_conflict(pdf_bytes):
+    async def scenario(service, port):
+        for task in service._dispatchers:
+            task.cancel()
+        await asyncio.gather(*service._dispatchers, return_exceptions=True)
+        job = json.loads((await request(port, "POST", "/jobs?n=2", pdf_bytes))[2])
+        result = await request(port, "GET", f"/jobs/{job['id']}/result")
+        deleted = await request(port, "DELETE", f"/jobs/{job['id']}")
+        return result[0], deleted[0]
+
+    assert run(with_service(scenario)) == (409, 409)
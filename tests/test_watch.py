@@ -0,0 +1,107 @@
+"""Watch-folder mode - settling, state across restarts and failures"""
+
+import json
+import os
+
+import fitz
+import pytest
+
+from concat_pdf import watch
+from concat_pdf.batch import _process_one
+from concat_pdf.watch import Watcher
+
+from conftest import make_pdf
+
+
+def watch_once(tmp_path, **options) -> Watcher:
+    watcher = Watcher(tmp_path / "in", tmp_path / "out", jobs=2, settle=0, n=2, **options)
+    watcher.run(once=True)
+    return watcher
+
+
+def statuses(watcher) -> dict:
+    return {os.path.basename(path): record["status"] for path, record in watcher.state.items()}
+
+
+def test_output_directory_inside_the_watched_directory(tmp_path):
+    with pytest.raises(ValueError, match="must not be inside"):
+        Watcher(tmp_path, tmp_path / "out")
+    with pytest.raises(ValueError, match="must not be inside"):
+        Watcher(tmp_path, tmp_path)
+
+
+def test_processes_new_files_once(tmp_path, capsys):
+    make_pdf(tmp_path / "in" / "a.pdf", 4)
+    make_pdf(tmp_path / "in" / "b.pdf", 2)
+    (tmp_path / "in" / "notes.txt").write_text("not a pdf")
+    (tmp_path / "in" / ".hidden.pdf").write_bytes(b"partial upload")
+
+    watcher = watch_once(tmp_path)
+    assert statuses(watcher) == {"a.pdf": "done", "b.pdf": "done"}
+    with fitz.open(tmp_path / "out" / "a_thumbnails.pdf") as doc:
+        assert len(doc) == 1 and "Page 4" in doc[0].get_text()
+    state = json.loads((tmp_path / "out" / ".concat_pdf_watch.json").read_text(encoding="utf-8"))
+    assert len(state["files"]) == 2
+
+    # A restart finds both files finished
+    capsys.readouterr()
+    watcher = watch_once(tmp_path)
+    assert "Processing" not in capsys.readouterr().out
+
+    # A changed file is processed again, the other one is not
+    make_pdf(tmp_path / "in" / "b.pdf", 3)
+    watch_once(tmp_path)
+    assert capsys.readouterr().out.splitlines()[0] == "Processing b.pdf"
+
+
+def test_failed_file_is_retried_once_changed(tmp_path, capsys):
+    broken = tmp_path / "in" / "broken.pdf"
+    broken.parent.mkdir()
+    broken.write_bytes(b"not a pdf")
+
+    watcher = watch_once(tmp_path)
+    assert statuses(watcher)["broken.pdf"].startswith("failed: ")
+    assert list((tmp_path / "out").glob("*.pdf*")) == []
+
+    capsys.readouterr()
+    watch_once(tmp_path)
+    assert "Processing" not in capsys.readouterr().out
+
+    make_pdf(broken, 2)
+    assert statuses(watch_once(tmp_path)) == {"broken.pdf": "done"}
+
+
+def test_unsettled_file_waits(tmp_path):
+    make_pdf(tmp_path / "in" / "a.pdf", 2)
+    watcher = Watcher(tmp_path / "in", tmp_path / "out", settle=60, n=2)
+    watcher.scan()
+    watcher._check_settled()
+    assert list(watcher.settling) == [tmp_path / "in" / "a.pdf"]
+    assert not watcher.ready
+
+    # Any change restarts the timer
+    watcher.settling[tmp_path / "in" / "a.pdf"] = ((0, 0), 0.0)
+    watcher._check_settled()
+    assert watcher.settling[tmp_path / "in" / "a.pdf"][1] > 0.0
+
+
+def crashing_process_one(input_path, output_path, options):
+    """Worker stand-in: files named crash*.pdf kill the worker process"""
+    if input_path.name.startswith("crash"):
+        os._exit(1)
+    return _process_one(input_path, output_path, options)
+
+
+def test_worker_crash_fails_only_the_culprit(tmp_path, monkeypatch, capsys):
+    # Workers are forked, so they see the patched function
+    monkeypatch.setattr(watch, "_process_one", crashing_process_one)
+    for name in ("a.pdf", "b.pdf", "crash.pdf", "c.pdf"):
+        make_pdf(tmp_path / "in" / name, 2)
+
+    watcher = Watcher(tmp_path / "in", tmp_path / "out", jobs=4, settle=0, n=2)
+    watcher.run(once=True)
+
+    assert statuses(watcher) == {"a.pdf": "done", "b.pdf": "done", "c.pdf": "done",
+                                 "crash.pdf": "failed: worker process crashed"}
+    assert not watcher.suspects
+    assert "retrying on its own" in capsys.readouterr().out